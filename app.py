@@ -2,15 +2,20 @@ import streamlit as st
 from dotenv import load_dotenv
 import pandas as pd
 import plotly.graph_objects as go
-import pandas_ta as ta
 import ast 
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Kendi modüllerimiz
 from src.tools.database import TradeMemory
-from src.graph.workflow import create_graph
+from src.backtest.outcomes import evaluate_outcomes
+from src.graph.workflow import NODE_LABELS, create_graph, describe_update, stream_graph
+from src.agents.registry import get_registry, reset_registry
+from src.graph.state import create_initial_state
 from src.tools.scanner import MarketScanner
-from src.tools.market_data import MarketDataLoader
+from src.tools.market_data import MarketDataContext, MarketDataLoader
+from src.tools.indicators import IndicatorSet, get_indicator_cache
 
 # .env yükle
 load_dotenv()
@@ -47,14 +52,136 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# --- Önbellek Katmanı ---
+# Kaynaklar (graf, ajanlar, veritabanı, veri yükleyici) süreç boyunca bir kez kurulur (st.cache_resource).
+# Veriler hisse + periyot anahtarıyla TTL'li önbellekte tutulur; yan menüden elle temizlenebilir.
+ANALYSIS_TTL = 60        # Aynı hisse için tekrar "Analiz Et" bu süre içinde önbellekten döner
+PRICE_TTL = 5 * 60       # Fiyat frame'i ve grafik indikatörleri
+SCAN_TTL = 15 * 60       # Son taramanın lider tablosu
+RECENT_ANALYSES_MAX = 32 # Bellekte tutulan en fazla tek hisse analizi
+
+@st.cache_resource
+def get_graph():
+    # Derlenmiş graf ve ajanlar (LLM istemcisi, arama aracı) her tıklamada yeniden kurulmaz
+    return create_graph(agents=get_registry())
+
+@st.cache_resource
+def get_memory():
+    # Tek bağlantı tüm oturumlarca paylaşılır (TradeMemory thread-safe); şema kontrolü süreç başına bir kez yapılır
+    return TradeMemory()
+
+@st.cache_resource
+def get_loader():
+    # Parquet deposu ve temel veri önbelleği tüm analiz ve taramalarca paylaşılır
+    return MarketDataLoader()
+
+@st.cache_resource
+def get_scan_cache():
+    # {"leaderboard": [...], "failed": {...}, "at": zaman}; SCAN_TTL dolana kadar tekrar taranmaz
+    return {}
+
+@st.cache_data(ttl=PRICE_TTL, show_spinner=False)
+def load_price_history(ticker, period="1y", interval="1d"):
+    return get_loader().get_stock_price_history(ticker, period=period, interval=interval)
+
+@st.cache_data(ttl=PRICE_TTL, show_spinner=False)
+def load_chart_indicators(ticker, period="1y", interval="1d"):
+    # Analiz koşusunun hesapladığı seriler paylaşılan IndicatorCache'ten gelir
+    indicators = IndicatorSet(load_price_history(ticker, period, interval), ticker=ticker, interval=interval)
+    return indicators.sma(50), indicators.sma(200)
+
+class RecentAnalyses:
+    """
+    Son tek hisse analizleri: {ticker: {"result", "analyzed_at", "save_error"}}.
+    Tüm oturumlar paylaşır, bu yüzden erişim kilitlidir. ANALYSIS_TTL'den eski kayıtlar her okuma/yazmada
+    silinir; RECENT_ANALYSES_MAX aşılırsa en eskiler atılır.
+    """
+
+    def __init__(self, ttl=ANALYSIS_TTL, max_entries=RECENT_ANALYSES_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        expired = [ticker for ticker, run in self._runs.items() if now - run["analyzed_at"] >= self.ttl]
+        for ticker in expired:
+            del self._runs[ticker]
+        # Sözlük ekleme sırasını korur; en eski kayıtlar baştadır
+        while len(self._runs) > self.max_entries:
+            del self._runs[next(iter(self._runs))]
+
+    def get(self, ticker):
+        with self._lock:
+            self._prune(time.time())
+            return self._runs.get(ticker)
+
+    def put(self, ticker, run):
+        with self._lock:
+            self._runs.pop(ticker, None)
+            self._runs[ticker] = run
+            self._prune(time.time())
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+@st.cache_resource
+def get_recent_analyses():
+    return RecentAnalyses()
+
+def run_analysis(ticker, on_node=None, on_report_chunk=None):
+    """
+    Tek hisse analizi (akışlı). Son ANALYSIS_TTL saniyedeki sonuç varsa graf hiç çalışmaz;
+    yeni sonuç veritabanına bir kez yazılır. on_node / on_report_chunk sadece gerçek koşuda çağrılır.
+    """
+    recent = get_recent_analyses()
+    run = recent.get(ticker)
+    if run:
+        return run
+
+    context = MarketDataContext(ticker, loader=get_loader(), price_history=load_price_history(ticker))
+    result = stream_graph(get_graph(), create_initial_state(ticker, market_data=context),
+                          on_node=on_node, on_report_chunk=on_report_chunk)
+
+    save_error = None
+    try:
+        get_memory().save_many([analysis_record(ticker, result)])
+    except Exception as e:
+        save_error = str(e)
+    run = {"result": result, "analyzed_at": time.time(), "save_error": save_error}
+    recent.put(ticker, run)
+    return run
+
+def node_progress_writer(container):
+    """Biten her node için st.status içine süre ve özet satırı yazan callback."""
+    def on_node(node, update, elapsed):
+        container.write(f"✅ **{NODE_LABELS.get(node, node)}** ({elapsed:.1f} sn): {describe_update(node, update)}")
+    return on_node
+
+def report_streamer(placeholder):
+    """Konsensüs raporunu parçalar geldikçe placeholder'a yazan callback."""
+    parts = []
+    def on_chunk(chunk):
+        parts.append(chunk)
+        placeholder.markdown("".join(parts) + " ▌")
+    return on_chunk
+
+def render_report_latency(llm_latency):
+    timings = (llm_latency or {}).get("consensus_node")
+    if timings and "total" in timings:
+        source = " · önbellekten" if timings.get("cached") else ""
+        st.caption(f"⏱️ İlk token: {timings['ttft']:.2f} sn · Toplam: {timings['total']:.2f} sn{source}")
+
 # --- Grafik Fonksiyonu ---
-def plot_chart(ticker, df, quant_data=None):
+def plot_chart(ticker, df, quant_data=None, sma_50=None, sma_200=None):
+    # df analiz koşusuyla paylaşılan frame; ona kolon eklemiyoruz, SMA'lar ayrı seri olarak gelir.
     fig = go.Figure()
     fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], name='Fiyat'))
-    if 'SMA_50' in df.columns:
-        fig.add_trace(go.Scatter(x=df.index, y=df['SMA_50'], line=dict(color='orange', width=1), name='SMA 50'))
-    if 'SMA_200' in df.columns:
-        fig.add_trace(go.Scatter(x=df.index, y=df['SMA_200'], line=dict(color='red', width=2), name='SMA 200'))
+    if sma_50 is not None:
+        fig.add_trace(go.Scatter(x=df.index, y=sma_50, line=dict(color='orange', width=1), name='SMA 50'))
+    if sma_200 is not None:
+        fig.add_trace(go.Scatter(x=df.index, y=sma_200, line=dict(color='red', width=2), name='SMA 200'))
     
     if quant_data:
         try:
@@ -68,34 +195,35 @@ def plot_chart(ticker, df, quant_data=None):
     return fig
 
 # --- Rapor Temizleme ---
-def render_report(final_rep):
-    text_content = ""
+def report_text(final_rep):
     if isinstance(final_rep, list) and len(final_rep) > 0:
         first_item = final_rep[0]
         if isinstance(first_item, dict) and 'text' in first_item:
-            text_content = first_item['text']
-        else:
-            text_content = str(first_item)
-    else:
-        text_content = str(final_rep)
-    st.markdown(text_content)
+            return first_item['text']
+        return str(first_item)
+    return str(final_rep)
+
+def render_report(final_rep):
+    st.markdown(report_text(final_rep))
 
 # --- Veritabanı Kayıt Yardımcısı ---
-def save_to_db(ticker, result):
+def analysis_record(ticker, result):
+    q_data = result.get("quant_data", {})
+    return {
+        "ticker": ticker,
+        "signal": q_data.get("signal", "N/A"),
+        # QuantAgent giriş fiyatını current_price olarak raporlar
+        "entry": q_data.get("entry_price") or q_data.get("current_price", 0),
+        "target": q_data.get("take_profit", 0),
+        "stop": q_data.get("stop_loss", 0),
+        "risk": "Alpha/High Risk",
+        # Model çıktısı parça listesi olarak da gelebilir; veritabanına düz metin yazılır
+        "full_report": report_text(result.get("final_report", "No Report")),
+    }
+
+def save_to_db(records):
     try:
-        memory = TradeMemory()
-        q_data = result.get("quant_data", {})
-        signal = q_data.get("signal", "N/A")
-        
-        memory.save_analysis(
-            ticker=ticker,
-            signal=signal,
-            entry=q_data.get("entry_price", 0),
-            target=q_data.get("take_profit", 0),
-            stop=q_data.get("stop_loss", 0),
-            risk="Alpha/High Risk",
-            full_report=result.get("final_report", "No Report")
-        )
+        get_memory().save_many(records)
     except Exception as e:
         st.error(f"DB Kayıt Hatası: {e}")
 
@@ -106,6 +234,24 @@ mode = st.sidebar.radio("Mod Seçimi", ["Tek Hisse Analizi", "Otomatik Piyasa Ta
 st.sidebar.markdown("---")
 st.sidebar.info("Alpha Fonu Modu Aktif.\n(Yüksek Risk / Yüksek Getiri)")
 
+with st.sidebar.expander("🗄️ Önbellek"):
+    st.caption(f"Analiz: {ANALYSIS_TTL} sn · Fiyat: {PRICE_TTL // 60} dk · Tarama: {SCAN_TTL // 60} dk")
+    if st.button("Analiz sonuçlarını temizle", use_container_width=True):
+        get_recent_analyses().clear()
+    if st.button("Fiyat ve indikatörleri temizle", use_container_width=True):
+        load_price_history.clear()
+        load_chart_indicators.clear()
+        get_indicator_cache().clear()
+    if st.button("Tarama sonucunu temizle", use_container_width=True):
+        get_scan_cache().clear()
+    if st.button("Tümünü sıfırla", use_container_width=True, help="Graf, ajanlar ve veritabanı bağlantısı dahil"):
+        # Eski bağlantı kapatılmazsa WAL dosyasıyla birlikte açık kalır; sonraki get_memory() yenisini açar
+        get_memory().close()
+        reset_registry()
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        get_indicator_cache().clear()
+
 # --- AKIŞ ---
 
 # 1. MOD: TEK HİSSE
@@ -120,83 +266,151 @@ if mode == "Tek Hisse Analizi":
         analyze_btn = st.button("Analiz Et 🚀", type="primary")
 
     if analyze_btn:
-        with st.status("Yapay zeka analiz ediyor...", expanded=True) as status:
+        # Durum kutusu üstte; metrikler ve sekmeler önceden açılır ki rapor akarken Rapor sekmesine yazılabilsin
+        status = st.status("Yapay zeka analiz ediyor...", expanded=True)
+        metrics_box = st.container()
+        tab1, tab2, tab3 = st.tabs(["📝 Rapor", "📈 Grafik", "🤖 Detaylar"])
+        report_box = tab1.empty()
+
+        run = None
+        with status:
             try:
-                app = create_graph()
-                initial_state = {"ticker": ticker_input, "technical_data": {}, "fundamental_data": {}, "sentiment_data": {}, "quant_data": {}, "final_report": ""}
-                
                 st.write("📡 Veriler çekiliyor ve işleniyor...")
-                result = app.invoke(initial_state)
-                
-                # --- KAYIT ---
-                save_to_db(ticker_input, result)
-                
-                status.update(label="Analiz Tamamlandı!", state="complete", expanded=False)
+                started = time.perf_counter()
+                run = run_analysis(ticker_input, on_node=node_progress_writer(status),
+                                   on_report_chunk=report_streamer(report_box))
+                if run["save_error"]:
+                    st.error(f"DB Kayıt Hatası: {run['save_error']}")
                 
-                # --- GÖSTERİM ---
-                q_data = result.get("quant_data", {})
-                if q_data:
-                    c1, c2, c3, c4 = st.columns(4)
-                    entry = q_data.get('entry_price', 0)
-                    tp = q_data.get('take_profit', 0)
-                    sl = q_data.get('stop_loss', 0)
-                    c1.metric("Giriş", f"{entry:.2f} TL" if entry else "-")
-                    c2.metric("Hedef", f"{tp:.2f} TL" if tp else "-", delta_color="normal")
-                    c3.metric("Stop", f"{sl:.2f} TL" if sl else "-", delta_color="inverse")
-                    c4.metric("Risk", q_data.get("signal", "-"))
-
-                tab1, tab2, tab3 = st.tabs(["📝 Rapor", "📈 Grafik", "🤖 Detaylar"])
-                with tab1: render_report(result["final_report"])
-                with tab2:
-                    loader = MarketDataLoader()
-                    df = loader.get_stock_price_history(ticker_input)
-                    if not df.empty:
-                        df['SMA_50'] = ta.sma(df['Close'], length=50)
-                        df['SMA_200'] = ta.sma(df['Close'], length=200)
-                        fig = plot_chart(ticker_input, df, q_data)
-                        st.plotly_chart(fig)
-                with tab3:
-                    with st.expander("Teknik"): st.json(result.get("technical_data"))
-                    with st.expander("Temel"): st.json(result.get("fundamental_data"))
-                    with st.expander("Sentiment"): st.json(result.get("sentiment_data"))
+                age = time.time() - run["analyzed_at"]
+                if age < 1:
+                    label = f"Analiz Tamamlandı! ({time.perf_counter() - started:.1f} sn)"
+                else:
+                    label = f"Analiz Tamamlandı! (önbellekten, {age:.0f} sn önce)"
+                status.update(label=label, state="complete", expanded=False)
             except Exception as e:
                 st.error(f"Hata: {e}")
+                status.update(label="Analiz başarısız", state="error")
+
+        if run:
+            result = run["result"]
+
+            # --- GÖSTERİM ---
+            q_data = result.get("quant_data", {})
+            if q_data:
+                c1, c2, c3, c4 = metrics_box.columns(4)
+                entry = q_data.get('entry_price') or q_data.get('current_price', 0)
+                tp = q_data.get('take_profit', 0)
+                sl = q_data.get('stop_loss', 0)
+                c1.metric("Giriş", f"{entry:.2f} TL" if entry else "-")
+                c2.metric("Hedef", f"{tp:.2f} TL" if tp else "-", delta_color="normal")
+                c3.metric("Stop", f"{sl:.2f} TL" if sl else "-", delta_color="inverse")
+                c4.metric("Risk", q_data.get("signal", "-"))
+
+            with report_box.container():
+                render_report(result["final_report"])
+                render_report_latency(result.get("llm_latency"))
+            with tab2:
+                # Analiz koşusunun kullandığı frame ve indikatörler önbellekten gelir (tekrar indirme yok)
+                df = load_price_history(ticker_input)
+                if not df.empty:
+                    sma_50, sma_200 = load_chart_indicators(ticker_input)
+                    fig = plot_chart(ticker_input, df, q_data, sma_50, sma_200)
+                    st.plotly_chart(fig)
+            with tab3:
+                with st.expander("Teknik"): st.json(result.get("technical_data"))
+                with st.expander("Temel"): st.json(result.get("fundamental_data"))
+                with st.expander("Sentiment"): st.json(result.get("sentiment_data"))
+                with st.expander("Token Kullanımı"): st.json(result.get("token_usage", {}))
 
 # 2. MOD: SCANNER
 elif mode == "Otomatik Piyasa Tarama":
     st.title("🚀 Büyüme Hissesi Tarayıcısı (Growth Hunter)")
     st.write("Yüksek hacim, güçlü momentum ve büyüme hikayesi olan hisseleri tarar.")
     
+    early_start = st.checkbox("Lider hisse için detaylı analizi tarama bitmeden başlat", value=True)
+
     if st.button("Taramayı Başlat 🕵️‍♂️"):
         try:
-            scanner = MarketScanner()
-            with st.spinner("Piyasa taranıyor... (Bu işlem 1-2 dk sürebilir)"):
-                top_picks = scanner.scan_market()
+            # Tarayıcı her taramada sayaçlarını sıfırlar; paylaşılan olan loader'dır
+            scanner = MarketScanner(loader=get_loader())
+            app = get_graph()
+            early_runs = {}  # ticker -> Future (tarama sürerken başlatılan analiz)
+            scan_cache = get_scan_cache()
+            cached_scan = scan_cache if scan_cache and time.time() - scan_cache["at"] < SCAN_TTL else None
+
+            with ThreadPoolExecutor(max_workers=1) as analysis_pool:
+                if cached_scan:
+                    leaderboard = cached_scan["leaderboard"]
+                    failed = cached_scan["failed"]
+                    st.caption(f"Son tarama sonucu kullanılıyor ({(time.time() - cached_scan['at']) / 60:.0f} dk önce). Yeniden taramak için yan menüden tarama önbelleğini temizleyin.")
+                    st.dataframe(pd.DataFrame(leaderboard), use_container_width=True, hide_index=True)
+                else:
+                    # --- CANLI LİDER TABLOSU ---
+                    progress = st.progress(0.0, text="Piyasa taranıyor...")
+                    board = st.empty()
+                    leaderboard = []
+                    for _, leaderboard in scanner.iter_scan(top_k=3):
+                        total = len(scanner.tickers)
+                        progress.progress(min(scanner.scanned / total, 1.0), text=f"Taranan: {scanner.scanned}/{total}")
+                        board.dataframe(pd.DataFrame(leaderboard), use_container_width=True, hide_index=True)
+
+                        # Taramanın yarısı geçildiyse mevcut lideri beklemeden analize başla
+                        if early_start and not early_runs and scanner.scanned * 2 >= total:
+                            leader = leaderboard[0]["ticker"]
+                            early_runs[leader] = analysis_pool.submit(
+                                app.invoke, create_initial_state(leader, market_data=MarketDataContext(leader, loader=get_loader())))
+                    progress.empty()
+                    failed = dict(scanner.failed)
+                    scan_cache.update(leaderboard=leaderboard, failed=failed, at=time.time())
+
+                top_picks = [s["ticker"] for s in leaderboard]
             
-            if not top_picks:
-                st.warning("Kriterlere uyan hisse bulunamadı.")
-            else:
-                st.success(f"Fırsat Adayları: {', '.join(top_picks)}")
-                app = create_graph()
-                
-                for stock in top_picks:
-                    st.divider()
-                    st.subheader(f"Analiz: {stock}")
-                    time.sleep(3) # Kota dostu bekleme
+                if not top_picks:
+                    st.warning("Kriterlere uyan hisse bulunamadı.")
+                else:
+                    st.success(f"Fırsat Adayları: {', '.join(top_picks)}")
+                    if failed:
+                        st.caption(f"Verisi alınamayan hisseler: {', '.join(failed)}")
+
+                    # Detaylı analizlerin kullanacağı 1 yıllık veriyi tek bir toplu istekle depoya al
+                    get_loader().get_many(top_picks, period="1y")
+                    # Erken başlatılan koşu dışındaki hisselerin temel analizi tek LLM çağrısında yapılır
+                    pending = [stock for stock in top_picks if stock not in early_runs]
+                    fundamentals = get_registry().fundamental.analyze_many(pending) if pending else {}
+                    # Haber aramalarını da paralel yap; Sentiment ajanı önbellekten okur
+                    get_registry().sentiment.prefetch_news(pending)
                     
-                    with st.status(f"{stock} inceleniyor...", expanded=False) as status:
-                        initial_state = {"ticker": stock, "technical_data": {}, "fundamental_data": {}, "sentiment_data": {}, "quant_data": {}, "final_report": ""}
-                        try:
-                            result = app.invoke(initial_state)
-                            
-                            # --- KAYIT ---
-                            save_to_db(stock, result)
-                            
-                            status.update(label="Tamamlandı", state="complete")
-                            with st.expander(f"📄 {stock} Raporunu Oku", expanded=True):
-                                render_report(result["final_report"])
-                        except Exception as e:
-                            st.error(f"Hata ({stock}): {e}")
+                    records = []
+                    for stock in top_picks:
+                        st.divider()
+                        st.subheader(f"Analiz: {stock}")
+                        
+                        status = st.status(f"{stock} inceleniyor...", expanded=False)
+                        report_box = st.expander(f"📄 {stock} Raporunu Oku", expanded=True).empty()
+                        with status:
+                            try:
+                                if stock in early_runs:
+                                    # Tarama sırasında başlatılan analizi bekle
+                                    result = early_runs[stock].result()
+                                else:
+                                    time.sleep(3) # Kota dostu bekleme
+                                    context = MarketDataContext(stock, loader=get_loader())
+                                    result = stream_graph(app, create_initial_state(stock, fundamentals.get(stock), market_data=context),
+                                                          on_node=node_progress_writer(status),
+                                                          on_report_chunk=report_streamer(report_box))
+                                
+                                records.append(analysis_record(stock, result))
+                                
+                                status.update(label="Tamamlandı", state="complete")
+                                with report_box.container():
+                                    render_report(result["final_report"])
+                                    render_report_latency(result.get("llm_latency"))
+                            except Exception as e:
+                                st.error(f"Hata ({stock}): {e}")
+
+                    # --- KAYIT (tüm adaylar tek transaction'da) ---
+                    save_to_db(records)
         except Exception as e:
             st.error(f"Tarayıcı Hatası: {e}")
 
@@ -205,15 +419,42 @@ elif mode == "📊 Geçmiş Analizler":
     st.title("📜 Analiz Hafızası")
     
     try:
-        memory = TradeMemory()
-        df_history = memory.get_history()
+        memory = get_memory()
+
+        if st.button("🎯 Sonuçları Güncelle", help="Kayıtlı hedef/stop seviyelerinin sonrasında tetiklenip tetiklenmediğini fiyat verisiyle kontrol eder"):
+            with st.spinner("Kayıtlı sinyaller fiyat verisiyle karşılaştırılıyor..."):
+                stats = evaluate_outcomes(memory, loader=get_loader())
+            st.success(f"{stats['updated']} kayıt güncellendi ({stats['tickers']} hisse).")
+
+        # --- Filtreler (sorgu SQLite'ta çalışır; sadece görünen sayfa belleğe gelir) ---
+        f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+        ticker_filter = f1.selectbox("Hisse", [""] + memory.get_distinct("ticker"), format_func=lambda t: t or "Tümü")
+        date_range = f2.date_input("Tarih Aralığı", value=(), help="Boş bırakılırsa tüm tarihler")
+        signal_filter = f3.multiselect("Sinyal", memory.get_distinct("signal"))
+        page_size = f4.selectbox("Sayfa", [25, 50, 100, 250], index=1)
+
+        filters = {
+            "ticker": ticker_filter or None,
+            "start": date_range[0] if len(date_range) > 0 else None,
+            "end": date_range[1] if len(date_range) > 1 else (date_range[0] if len(date_range) == 1 else None),
+            "signal": signal_filter or None,
+        }
+        total = memory.count_history(**filters)
         
-        if not df_history.empty:
-            # Full Report'u ana tabloda gizle
-            display_cols = [c for c in df_history.columns if c != "full_report"]
+        if total:
+            record = memory.get_track_record(**filters)
+            if record["closed"]:
+                r1, r2, r3 = st.columns(3)
+                r1.metric("Kapanan Sinyal", record["closed"], help=f"Açık: {record['open']}")
+                r2.metric("Hedef İsabeti", f"{record['hit_rate']:.0%}")
+                r3.metric("Ort. Getiri", f"{record['avg_return']:.2%}")
+
+            pages = -(-total // page_size)
+            page = st.number_input(f"Sayfa (toplam {pages} sayfa, {total} kayıt)", min_value=1, max_value=pages, value=1, step=1)
+            df_history = memory.query_history(limit=page_size, offset=(page - 1) * page_size, **filters)
             
             event = st.dataframe(
-                df_history[display_cols],
+                df_history,
                 use_container_width=True,
                 hide_index=True,
                 on_select="rerun",
@@ -234,12 +475,20 @@ elif mode == "📊 Geçmiş Analizler":
                 c2.metric("Hedef", f"{selected_row['target_price']:.2f}" if selected_row['target_price'] else "-")
                 c3.metric("Stop", f"{selected_row['stop_loss']:.2f}" if selected_row['stop_loss'] else "-")
                 c4.metric("Risk", selected_row['risk_level'] if selected_row['risk_level'] else "-")
+
+                if pd.notna(selected_row.get('realized_return')):
+                    o1, o2, o3 = st.columns(3)
+                    o1.metric("Sonuç", selected_row['outcome'])
+                    o2.metric("Süre", f"{int(selected_row['bars_held'])} gün")
+                    o3.metric("Gerçekleşen Getiri", f"{selected_row['realized_return']:.2%}")
                 
-                # Raporu Göster
+                # Raporu Göster (sadece seçilen kaydın raporu açılır)
                 st.markdown("### 📝 Analiz Raporu")
                 with st.container(border=True):
-                    render_report(selected_row['full_report'])
+                    render_report(memory.get_report(selected_row['id']) or "Rapor bulunamadı.")
                 
+        elif any(filters.values()):
+            st.info("Filtrelere uyan kayıt yok.")
         else:
             st.info("Henüz veritabanında kayıtlı analiz yok. Bir analiz yapın!")
     except Exception as e:
@@ -0,0 +1,86 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# İki benchmark sonucunu (benchmarks.run çıktısı) karşılaştırır ve eşiği aşan gerilemeleri listeler.
+#
+#   python -m benchmarks.compare benchmarks/results/eski.json benchmarks/results/yeni.json --threshold 10
+#
+# Süre ve bellek metriklerinde düşük, *_per_sec metriklerinde yüksek değer iyidir. Gerileme varsa çıkış kodu 1'dir.
+
+# Karşılaştırılan metrikler (gürültülü min/max ve örnek sayıları hariç)
+LOWER_IS_BETTER = ("median_ms", "p95_ms", "seconds", "peak_mb", "db_mb")
+HIGHER_IS_BETTER = ("rows_per_sec", "tickers_per_sec")
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """İç içe sonuçları 'scanner.sizes.500.disk.tickers_per_sec' gibi yollara açar (sadece sayısal değerler)."""
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == "params":
+                continue
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix[:-1]] = float(data)
+    return flat
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1: yüksek değer iyi, -1: düşük değer iyi, None: karşılaştırılmaz."""
+    name = metric.rsplit(".", 1)[-1]
+    if name in HIGHER_IS_BETTER:
+        return 1
+    if name in LOWER_IS_BETTER:
+        return -1
+    return None
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 10.0) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    Dönüş: (metrik, eski, yeni, değişim %, gerileme mi) listesi.
+    Değişim yüzdesi iyileşmede pozitif, kötüleşmede negatiftir; -threshold'dan kötüyse gerileme sayılır.
+    """
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    rows = []
+    for metric in sorted(set(old_flat) & set(new_flat)):
+        sign = direction(metric)
+        before, after = old_flat[metric], new_flat[metric]
+        if sign is None or before == 0:
+            continue
+        change = sign * (after - before) / abs(before) * 100
+        rows.append((metric, before, after, change, change < -threshold))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="İki benchmark sonucunu karşılaştırır.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Gerileme sayılacak kötüleşme yüzdesi")
+    parser.add_argument("--all", action="store_true", help="Sadece gerilemeleri değil tüm metrikleri yaz")
+    cli = parser.parse_args(argv)
+
+    with open(cli.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(cli.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    if old.get("env", {}).get("platform") != new.get("env", {}).get("platform"):
+        print("UYARI: Sonuçlar farklı makinelerde alınmış; karşılaştırma yanıltıcı olabilir.")
+    if old.get("params") != new.get("params"):
+        print("UYARI: Benchmark parametreleri farklı (örn. --quick); karşılaştırma yanıltıcı olabilir.")
+
+    rows = compare(old, new, cli.threshold)
+    regressions = [row for row in rows if row[4]]
+    print(f"{old.get('env', {}).get('commit')} -> {new.get('env', {}).get('commit')}: "
+          f"{len(rows)} metrik, {len(regressions)} gerileme (eşik %{cli.threshold:g})")
+    for metric, before, after, change, regressed in (rows if cli.all else regressions):
+        mark = "❌" if regressed else ("✅" if change > cli.threshold else "  ")
+        print(f"{mark} {metric}: {before:g} -> {after:g} ({change:+.1f}%)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
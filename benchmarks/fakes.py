@@ -0,0 +1,247 @@
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.agents.fundamental import FundamentalAgent
+from src.agents.registry import AgentRegistry
+from src.agents.sentiment import SentimentAgent
+from src.tools.market_data import MarketDataLoader
+from src.tools.price_store import PriceStore, period_start
+
+# Benchmark'ların ağa hiç çıkmadan gerçek kod yolunu çalıştırması için sahte veri kaynakları:
+# deterministik sentetik OHLCV / temel veri, hazır cevap dönen sahte LLM ve sahte haber arama aracı.
+# Aynı ticker + seed her zaman aynı seriyi üretir (hash() süreçler arasında rastgele olduğu için crc32).
+
+# "max" period ve bilinmeyen period'lar için üretilen bar sayısı (~5 yıl)
+MAX_BARS = 1260
+
+
+def _rng(*parts: Any) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(":".join(map(str, parts)).encode("utf-8")))
+
+
+def synthetic_tickers(count: int) -> List[str]:
+    """SYN0000.IS, SYN0001.IS, ... biçiminde sahte hisse kodları."""
+    return [f"SYN{i:04d}.IS" for i in range(count)]
+
+
+def bars_for_period(period: Optional[str], end: Optional[pd.Timestamp] = None) -> int:
+    """Period'un (yfinance biçimi) bugüne kadar kapsadığı iş günü sayısı."""
+    start = period_start(period) if period else None
+    if start is None:
+        return MAX_BARS
+    end = (end or pd.Timestamp.now()).normalize()
+    return max(len(pd.bdate_range(start.tz_localize(None).normalize(), end)), 1)
+
+
+def synthetic_ohlcv(ticker: str, bars: int = 252, end: Optional[pd.Timestamp] = None, seed: int = 0) -> pd.DataFrame:
+    """
+    Ticker'a özgü deterministik OHLCV serisi (geometrik rastgele yürüyüş, ara sıra hacim patlamaları).
+    Index iş günleridir ve end tarihinde (varsayılan: bugün) biter; kolonlar yfinance ile aynıdır.
+    """
+    rng = _rng(seed, ticker)
+    index = pd.bdate_range(end=(end or pd.Timestamp.now()).normalize(), periods=bars, name="Date")
+
+    drift = rng.normal(0.0004, 0.0008)
+    volatility = rng.uniform(0.01, 0.035)
+    close = rng.uniform(5, 500) * np.exp(np.cumsum(rng.normal(drift, volatility, bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(rng.normal(0, volatility / 3, bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, bars)))
+
+    volume = rng.lognormal(mean=rng.uniform(11, 16), sigma=0.4, size=bars)
+    spikes = rng.random(bars) < 0.04
+    volume[spikes] *= rng.uniform(2, 5, spikes.sum())
+
+    return pd.DataFrame({
+        "Open": open_,
+        "High": high,
+        "Low": low,
+        "Close": close,
+        "Volume": volume.round(),
+    }, index=index)
+
+
+def synthetic_fundamentals(ticker: str, seed: int = 0) -> Dict[str, Any]:
+    """MarketDataLoader.get_fundamental_info ile aynı anahtarlara sahip sahte temel veriler."""
+    rng = _rng(seed, ticker, "fundamentals")
+    price = round(float(rng.uniform(5, 500)), 2)
+    return {
+        "symbol": ticker,
+        "shortName": f"{ticker.split('.')[0]} Sentetik A.Ş.",
+        "sector": str(rng.choice(["Technology", "Energy", "Industrials", "Financial Services", "Utilities"])),
+        "industry": "Synthetic",
+        "marketCap": int(rng.uniform(1e9, 5e11)),
+        "trailingPE": round(float(rng.uniform(3, 60)), 2),
+        "forwardPE": round(float(rng.uniform(3, 40)), 2),
+        "priceToBook": round(float(rng.uniform(0.5, 12)), 2),
+        "profitMargins": round(float(rng.uniform(-0.1, 0.4)), 4),
+        "revenueGrowth": round(float(rng.uniform(-0.2, 1.5)), 4),
+        "returnOnEquity": round(float(rng.uniform(-0.1, 0.6)), 4),
+        "currentPrice": price,
+        "targetMeanPrice": round(price * float(rng.uniform(0.8, 1.6)), 2),
+        "recommendationKey": str(rng.choice(["buy", "hold", "sell", "strong_buy"])),
+    }
+
+
+class SyntheticLoader(MarketDataLoader):
+    """
+    yfinance yerine sentetik veri veren MarketDataLoader. Sadece ağ çağrıları (_download_*, _fetch_*) değişir;
+    PriceStore, toplu indirme ve span'ler gerçek koddur.
+    store: Verilirse Parquet deposu kullanılır (disk yolunu ölçmek için geçici klasör verilmeli).
+    latency: Her "indirme" çağrısına eklenen yapay gecikme (sn).
+    Üretilen frame'ler bellekte tutulur; preload ile ölçüm öncesinde hazırlanabilir.
+    """
+
+    def __init__(self, store: Optional[PriceStore] = None, seed: int = 0, latency: float = 0.0):
+        super().__init__(store=store, use_store=store is not None, use_cache=False)
+        self.seed = seed
+        self.latency = latency
+        self.downloads = 0
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def frame(self, ticker: str, period: Optional[str] = "1y", start=None) -> pd.DataFrame:
+        bars = bars_for_period(period) if start is None else MAX_BARS
+        key = (ticker, bars)
+        with self._lock:
+            df = self._frames.get(key)
+        if df is None:
+            df = synthetic_ohlcv(ticker, bars=bars, seed=self.seed)
+            with self._lock:
+                self._frames[key] = df
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start).tz_localize(None)]
+        return df
+
+    def preload(self, tickers: List[str], period: str = "3mo"):
+        for ticker in tickers:
+            self.frame(ticker, period)
+
+    def _download_many_raw(self, tickers, interval, period, start, threads) -> Dict[str, pd.DataFrame]:
+        self.downloads += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {ticker: self.frame(ticker, period, start) for ticker in tickers}
+
+    def _download_history_raw(self, ticker, period, interval, start) -> pd.DataFrame:
+        self.downloads += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.frame(ticker, period, start)
+
+    def _fetch_fundamental_info_raw(self, ticker: str) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        return synthetic_fundamentals(ticker, self.seed)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Ajanların prompt'una göre hazır cevap dönen sahte chat modeli.
+    Temel analiz -> JSON (toplu prompt'ta JSON dizisi), duygu analizi -> JSON, konsensüs -> Markdown rapor.
+    delay: Her çağrının (akışta ilk parçanın) gecikmesi. chunk_delay: Akışta parçalar arası gecikme.
+    """
+
+    delay: float = 0.0
+    chunk_delay: float = 0.0
+    report_words: int = 300
+    words_per_chunk: int = 5
+    model_name: str = "fake-benchmark"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        system = str(messages[0].content) if messages else ""
+        user = str(messages[-1].content) if messages else ""
+        tickers = re.findall(r'"symbol":"([^"]+)"', user) or re.findall(r"TICKER: (\S+)", user) or ["UNKNOWN"]
+
+        if "Venture Capitalist" in system:
+            results = [self._fundamental(ticker) for ticker in tickers]
+            return json.dumps(results if "JSON dizisi" in user else results[0], ensure_ascii=False)
+        if "sentiment_score" in system:
+            score = round(float(_rng("sentiment", user).uniform(0, 1)), 2)
+            signal = "POZİTİF" if score > 0.6 else "NEGATİF" if score < 0.4 else "NÖTR"
+            return json.dumps({"signal": signal, "sentiment_score": score,
+                               "news_summary": "Sentetik haber özeti."}, ensure_ascii=False)
+        return self._report(tickers[0])
+
+    @staticmethod
+    def _fundamental(ticker: str) -> Dict[str, Any]:
+        signal = str(_rng("fundamental", ticker).choice(["AL", "TUT", "SAT"]))
+        return {"ticker": ticker, "signal": signal, "reason": "Sentetik temel analiz.",
+                "metrics": {"PE": "-", "ROE": "-"}}
+
+    def _report(self, ticker: str) -> str:
+        rng = _rng("report", ticker)
+        vocabulary = ["hacim", "kırılım", "trend", "risk", "hedef", "stop", "büyüme", "marj", "momentum", "destek"]
+        body = " ".join(rng.choice(vocabulary, self.report_words))
+        decision = rng.choice(["AL", "TUT", "SAT"])
+        return f"# {ticker} Yatırım Komitesi Raporu\n\n**Karar:** {decision}\n\n{body}\n"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.delay:
+            time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.respond(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.delay:
+            time.sleep(self.delay)
+        words = self.respond(messages).split(" ")
+        for i in range(0, len(words), self.words_per_chunk):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            piece = " ".join(words[i:i + self.words_per_chunk])
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece if i == 0 else " " + piece))
+
+
+class FakeSearchTool:
+    """SentimentAgent için sahte arama aracı: sorgu başına deterministik 'content' alanlı sonuç listesi."""
+
+    def __init__(self, delay: float = 0.0, results: int = 5, words: int = 120):
+        self.delay = delay
+        self.results = results
+        self.words = words
+        self.calls = 0
+
+    def invoke(self, query: Any) -> List[Dict[str, str]]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        query = query.get("query", "") if isinstance(query, dict) else str(query)
+        rng = _rng("news", query)
+        vocabulary = ["şirket", "kâr", "ihracat", "yatırım", "sözleşme", "talep", "faiz", "borsa", "rekor", "beklenti"]
+        return [{"content": f"Haber {i + 1} ({query}): " + " ".join(rng.choice(vocabulary, self.words))}
+                for i in range(self.results)]
+
+
+class BenchmarkRegistry(AgentRegistry):
+    """Sahte LLM, sahte arama aracı ve sentetik yükleyiciyle kurulan, önbelleksiz ajan kayıt defteri."""
+
+    def __init__(self, llm: Any, loader: MarketDataLoader, search_tool: Any):
+        super().__init__(llm=llm, use_cache=False)
+        self.loader = loader
+        self.search_tool = search_tool
+
+    @property
+    def fundamental(self) -> FundamentalAgent:
+        def build():
+            agent = FundamentalAgent(llm=self.llm, use_cache=False)
+            agent.loader = self.loader
+            return agent
+        return self._get("fundamental", build)
+
+    @property
+    def sentiment(self) -> SentimentAgent:
+        return self._get("sentiment", lambda: SentimentAgent(llm=self.llm, use_cache=False, search_tool=self.search_tool))
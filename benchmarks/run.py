@@ -0,0 +1,355 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fakes import (BenchmarkRegistry, FakeChatModel, FakeSearchTool, SyntheticLoader,
+                              synthetic_tickers)
+from src.graph.state import create_initial_state
+from src.graph.workflow import ANALYST_NODES, create_graph, stream_graph
+from src.tools import tracing
+from src.tools.database import TradeMemory
+from src.tools.market_data import MarketDataContext
+from src.tools.price_store import PriceStore
+from src.tools.scanner import MarketScanner
+
+# Ağ, API anahtarı veya gerçek model gerektirmeyen benchmark takımı.
+#
+#   python -m benchmarks.run                      # tam takım, sonuç benchmarks/results/ altına JSON olarak yazılır
+#   python -m benchmarks.run --quick --only scanner
+#   python -m benchmarks.compare eski.json yeni.json
+#
+# Süreler duvar saatiyle (perf_counter) ölçülür; tepe bellek tracemalloc ile ayrı bir koşuda ölçülür
+# (tracemalloc yavaşlattığı için zaman ölçümlerine karışmaz). Sonuç dosyasında commit ve makine bilgisi vardır.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SUITES = ("graph", "scanner", "trade_memory")
+
+DEFAULTS = {
+    "graph_runs": 20,
+    "llm_delay": 0.05,
+    "chunk_delay": 0.002,
+    "search_delay": 0.02,
+    "scanner_sizes": [42, 500, 5000],
+    "scanner_repeats": 3,
+    "memory_rows": 20000,
+    "memory_single_inserts": 500,
+    "memory_reads": 200,
+    "seed": 0,
+}
+QUICK = {
+    "graph_runs": 5,
+    "scanner_sizes": [42, 500],
+    "scanner_repeats": 2,
+    "memory_rows": 2000,
+    "memory_single_inserts": 100,
+    "memory_reads": 50,
+}
+
+
+# --- Ölçüm yardımcıları ---
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Saniye cinsinden örnekleri milisaniye istatistiklerine çevirir."""
+    values = np.asarray(samples, dtype=float) * 1000
+    return {
+        "n": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "median_ms": round(float(np.median(values)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "min_ms": round(float(values.min()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def peak_memory_mb(fn: Callable[[], Any]) -> float:
+    """fn'in çalışırken ayırdığı en yüksek Python belleği (MB, tracemalloc)."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+# --- Graf ---
+
+def bench_graph(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Tam grafın (dört paralel analist + akışlı konsensüs) ve her node'un gecikmesi."""
+    loader = SyntheticLoader(seed=params["seed"])
+    llm = FakeChatModel(delay=params["llm_delay"], chunk_delay=params["chunk_delay"])
+    registry = BenchmarkRegistry(llm, loader, FakeSearchTool(delay=params["search_delay"]))
+    app = create_graph(agents=registry)
+    tickers = synthetic_tickers(10)
+    loader.preload(tickers, period="1y")
+
+    def run_once(ticker: str) -> Dict[str, Any]:
+        first_chunk = []
+        started = time.perf_counter()
+
+        def on_chunk(_):
+            if not first_chunk:
+                first_chunk.append(time.perf_counter() - started)
+
+        state = create_initial_state(ticker, market_data=MarketDataContext(ticker, loader=loader))
+        result = stream_graph(app, state, on_report_chunk=on_chunk)
+        result["_wall"] = time.perf_counter() - started
+        result["_first_chunk"] = first_chunk[0] if first_chunk else result["_wall"]
+        return result
+
+    run_once(tickers[0])  # Isınma: import'lar, indikatör derlemeleri, graf kurulumu
+
+    totals, first_chunks, overheads = [], [], []
+    per_node: Dict[str, List[float]] = {}
+    for i in range(params["graph_runs"]):
+        result = run_once(tickers[i % len(tickers)])
+        timings = result.get("node_timings", {})
+        for node, elapsed in timings.items():
+            per_node.setdefault(node, []).append(elapsed)
+        totals.append(result["_wall"])
+        first_chunks.append(result["_first_chunk"])
+        # Kritik yol: en yavaş analist + konsensüs; kalan süre graf/çerçeve maliyetidir
+        critical = max(timings.get(node, 0.0) for node in ANALYST_NODES) + timings.get("consensus_node", 0.0)
+        overheads.append(max(result["_wall"] - critical, 0.0))
+
+    return {
+        "params": {key: params[key] for key in ("graph_runs", "llm_delay", "chunk_delay", "search_delay")},
+        "full_graph": summarize(totals),
+        "report_first_chunk": summarize(first_chunks),
+        "framework_overhead": summarize(overheads),
+        "nodes": {node: summarize(samples) for node, samples in sorted(per_node.items())},
+        "peak_mb": peak_memory_mb(lambda: run_once(tickers[0])),
+    }
+
+
+# --- Tarayıcı ---
+
+def bench_scanner(params: Dict[str, Any]) -> Dict[str, Any]:
+    """MarketScanner'ın uçtan uca tarama hızı: önce bellekteki 'indirmeden', sonra sıcak Parquet deposundan."""
+    results = {}
+    for size in params["scanner_sizes"]:
+        tickers = synthetic_tickers(size)
+        with tempfile.TemporaryDirectory(prefix="trademind-bench-") as root:
+            cases = {
+                "download": SyntheticLoader(seed=params["seed"]),
+                "disk": SyntheticLoader(store=PriceStore(root), seed=params["seed"]),
+            }
+            results[str(size)] = {name: _scan_case(loader, tickers, params["scanner_repeats"])
+                                  for name, loader in cases.items()}
+    return {"params": {"sizes": params["scanner_sizes"], "repeats": params["scanner_repeats"]}, "sizes": results}
+
+
+def _scan_case(loader: SyntheticLoader, tickers: List[str], repeats: int) -> Dict[str, Any]:
+    loader.preload(tickers, period="3mo")
+    scanner = MarketScanner(loader=loader)
+    scanner.tickers = tickers
+
+    first_result = []
+
+    def scan():
+        started = time.perf_counter()
+        for i, _ in enumerate(scanner.iter_scan(top_k=5)):
+            if i == 0:
+                first_result.append(time.perf_counter() - started)
+
+    # Disk durumunda ilk tarama depoyu doldurur; ölçülen taramalar diskten okur
+    scan()
+    first_result.clear()
+    durations = [timed(scan) for _ in range(repeats)]
+    best = min(durations)
+    return {
+        "scan": summarize(durations),
+        "tickers_per_sec": round(len(tickers) / best, 1),
+        "first_result": summarize(first_result),
+        "scored": scanner.scanned - len(scanner.failed),
+        "peak_mb": peak_memory_mb(scan),
+    }
+
+
+# --- TradeMemory ---
+
+def _analysis_records(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    tickers = synthetic_tickers(200)
+    # Raporların bir kısmı birebir aynı (tarama modunda tekrar eden metinler); içerik adresli depoyu da ölçer
+    reports = [f"# Rapor {i}\n\n" + " ".join(rng.choice(["hacim", "trend", "risk", "hedef", "stop", "kırılım"])
+                                             for _ in range(500)) for i in range(count // 4 or 1)]
+    records = []
+    for i in range(count):
+        entry = round(rng.uniform(5, 500), 2)
+        records.append({
+            "date": f"{2020 + i % 6}-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00",
+            "ticker": tickers[i % len(tickers)],
+            "signal": rng.choice(["AL", "TUT", "SAT"]),
+            "entry": entry,
+            "target": round(entry * 1.1, 2),
+            "stop": round(entry * 0.95, 2),
+            "risk": rng.choice(["Düşük", "Orta", "Yüksek"]),
+            "full_report": reports[i % len(reports)],
+        })
+    return records
+
+
+def bench_trade_memory(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Toplu / tekli yazma, sayfalı geçmiş sorguları ve rapor okuma hızı (geçici veritabanında)."""
+    rows, singles, reads = params["memory_rows"], params["memory_single_inserts"], params["memory_reads"]
+    records = _analysis_records(rows + singles, params["seed"])
+    rng = random.Random(params["seed"])
+
+    with tempfile.TemporaryDirectory(prefix="trademind-bench-") as root:
+        with TradeMemory(os.path.join(root, "bench.db")) as memory:
+            bulk = timed(lambda: memory.save_many(records[:rows]))
+            single = [timed(lambda r=record: memory.save_many([r])) for record in records[rows:]]
+
+            total = memory.count_history()
+            ids = [int(i) for i in memory.query_history(columns=["id"], limit=total)["id"]]
+            sample_ids = rng.sample(ids, min(reads, len(ids)))
+            ticker = records[0]["ticker"]
+
+            result = {
+                "params": {"rows": rows, "single_inserts": singles, "reads": reads},
+                "bulk_insert": {"seconds": round(bulk, 4), "rows_per_sec": round(rows / bulk, 1)},
+                "single_insert": {**summarize(single), "rows_per_sec": round(len(single) / sum(single), 1)},
+                "first_page": summarize([timed(lambda: memory.query_history()) for _ in range(reads)]),
+                "last_page": summarize([timed(lambda: memory.query_history(offset=total - 50))
+                                        for _ in range(max(reads // 10, 1))]),
+                "ticker_page": summarize([timed(lambda: memory.query_history(ticker=ticker))
+                                          for _ in range(reads)]),
+                "count": summarize([timed(lambda: memory.count_history(signal=["AL", "SAT"]))
+                                    for _ in range(max(reads // 10, 1))]),
+                "track_record": summarize([timed(memory.get_track_record) for _ in range(max(reads // 10, 1))]),
+                "get_report": summarize([timed(lambda i=i: memory.get_report(i)) for i in sample_ids]),
+                "db_mb": round(os.path.getsize(memory.db_name) / (1024 * 1024), 3),
+            }
+        with TradeMemory(os.path.join(root, "peak.db")) as memory:
+            result["peak_mb"] = peak_memory_mb(lambda: memory.save_many(records[:rows]))
+    return result
+
+
+BENCHMARKS = {
+    "graph": bench_graph,
+    "scanner": bench_scanner,
+    "trade_memory": bench_trade_memory,
+}
+
+
+# --- Çıktı ---
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def run(suites: List[str], params: Dict[str, Any], verbose: bool = False) -> Dict[str, Any]:
+    results = {"env": environment(), "params": params, "results": {}}
+    for name in suites:
+        print(f"⏱️ {name} ölçülüyor...", flush=True)
+        started = time.perf_counter()
+        # Kod yolundaki DEBUG satırları (binlerce hisse için) ölçümü gölgelemesin
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            results["results"][name] = BENCHMARKS[name](params)
+        print(f"   {name} bitti ({time.perf_counter() - started:.1f} sn)", flush=True)
+    return results
+
+
+def print_summary(results: Dict[str, Any]):
+    data = results["results"]
+    if "graph" in data:
+        graph = data["graph"]
+        print(f"\nGraf: medyan {graph['full_graph']['median_ms']:.1f} ms, p95 {graph['full_graph']['p95_ms']:.1f} ms, "
+              f"rapor ilk parça {graph['report_first_chunk']['median_ms']:.1f} ms, "
+              f"çerçeve payı {graph['framework_overhead']['median_ms']:.1f} ms, tepe bellek {graph['peak_mb']} MB")
+        for node, stats in graph["nodes"].items():
+            print(f"   {node}: medyan {stats['median_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms")
+    if "scanner" in data:
+        print("\nTarayıcı (hisse/sn):")
+        for size, cases in data["scanner"]["sizes"].items():
+            line = ", ".join(f"{name} {case['tickers_per_sec']:.0f} ({case['peak_mb']} MB)" for name, case in cases.items())
+            print(f"   {size} hisse: {line}")
+    if "trade_memory" in data:
+        memory = data["trade_memory"]
+        print(f"\nTradeMemory: toplu yazma {memory['bulk_insert']['rows_per_sec']:.0f} satır/sn, "
+              f"tekli yazma {memory['single_insert']['rows_per_sec']:.0f} satır/sn, "
+              f"ilk sayfa {memory['first_page']['median_ms']:.2f} ms, son sayfa {memory['last_page']['median_ms']:.2f} ms, "
+              f"rapor okuma {memory['get_report']['median_ms']:.2f} ms, tepe bellek {memory['peak_mb']} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="TradeMind çevrimdışı benchmark takımı (sentetik veri, sahte LLM/arama).")
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES), help="Çalıştırılacak takımlar")
+    parser.add_argument("--quick", action="store_true", help="Küçük boyutlarla hızlı koşu (sonuçlar tam koşuyla karşılaştırılmamalı)")
+    parser.add_argument("--output", help="Sonuç JSON dosyası (varsayılan: benchmarks/results/<commit>-<zaman>.json)")
+    parser.add_argument("--graph-runs", type=int)
+    parser.add_argument("--llm-delay", type=float, help="Sahte LLM çağrı gecikmesi (sn)")
+    parser.add_argument("--chunk-delay", type=float, help="Akışta parçalar arası gecikme (sn)")
+    parser.add_argument("--search-delay", type=float, help="Sahte arama gecikmesi (sn)")
+    parser.add_argument("--scanner-sizes", type=int, nargs="+")
+    parser.add_argument("--memory-rows", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--trace", nargs="?", const=tracing.DEFAULT_TRACE_DIR, metavar="KLASÖR",
+                        help="Koşu boyunca span izlemeyi açar (süreleri bir miktar artırır)")
+    parser.add_argument("--verbose", action="store_true", help="Kod yolundaki DEBUG çıktılarını gizleme")
+    cli = parser.parse_args(argv)
+
+    params = {**DEFAULTS, **(QUICK if cli.quick else {})}
+    overrides = {
+        "graph_runs": cli.graph_runs, "llm_delay": cli.llm_delay, "chunk_delay": cli.chunk_delay,
+        "search_delay": cli.search_delay, "scanner_sizes": cli.scanner_sizes, "memory_rows": cli.memory_rows,
+        "seed": cli.seed,
+    }
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    params["quick"] = cli.quick
+    if cli.trace:
+        tracing.enable(cli.trace)
+
+    results = run(cli.only, params, verbose=cli.verbose)
+    print_summary(results)
+
+    output = cli.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{results['env']['commit'] or 'nogit'}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Sonuçlar yazıldı: {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
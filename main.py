@@ -1,32 +1,69 @@
+import argparse
 import os
 from dotenv import load_dotenv
-from src.graph.workflow import create_graph
+from src.graph.workflow import NODE_LABELS, create_graph, describe_update, stream_graph
+from src.graph.state import create_initial_state
+from src.agents.registry import get_registry
+from src.tools.tokens import summarize_usage
 from src.tools.scanner import MarketScanner
+from src.tools import tracing
 
 # .env dosyasındaki API anahtarlarını yükle
 load_dotenv()
 
-def run_analysis(app, ticker):
+def print_token_usage(token_usage):
+    if not token_usage:
+        return
+    print("🔢 Token kullanımı (node: girdi / çıktı, önbellekten dönen çağrı):")
+    for node, usage in token_usage.items():
+        print(f"   {node}: {usage['prompt_tokens']} / {usage['completion_tokens']} ({usage['cached_calls']}/{usage['calls']} önbellek)")
+    total = summarize_usage(token_usage)
+    print(f"   TOPLAM: {total['prompt_tokens']} / {total['completion_tokens']}")
+
+def print_node_progress(node, update, elapsed):
+    # Node'lar bittiği anda (paralel analistler bitiş sırasıyla) tek satır özet
+    print(f"✅ {NODE_LABELS.get(node, node)} ({elapsed:.1f} sn): {describe_update(node, update)}")
+
+def report_printer(ticker):
+    """Konsensüs raporunu parçalar geldikçe yazan callback (başlık ilk parçayla basılır)."""
+    started = []
+    def on_chunk(chunk):
+        if not started:
+            started.append(True)
+            print("\n" + "="*50)
+            print(f"📊 YATIRIM KOMİTESİ KARARI ({ticker})")
+            print("="*50)
+        print(chunk, end="", flush=True)
+    return on_chunk
+
+def print_report_latency(llm_latency):
+    timings = (llm_latency or {}).get("consensus_node")
+    if timings and "total" in timings:
+        source = " (önbellekten)" if timings.get("cached") else ""
+        print(f"⏱️ Rapor: ilk token {timings['ttft']:.2f} sn, toplam {timings['total']:.2f} sn{source}")
+
+def run_analysis(app, ticker, fundamental_data=None):
     print(f"\n🚀 {ticker} için analiz başlatılıyor...\n")
-    initial_state = {
-        "ticker": ticker,
-        "technical_data": {},
-        "fundamental_data": {},
-        "sentiment_data": {},
-        "quant_data": {},
-        "final_report": ""
-    }
+    initial_state = create_initial_state(ticker, fundamental_data)
     try:
-        result = app.invoke(initial_state)
+        result = stream_graph(app, initial_state, on_node=print_node_progress, on_report_chunk=report_printer(ticker))
         print("\n" + "="*50)
-        print(f"📊 YATIRIM KOMİTESİ KARARI ({ticker})")
-        print("="*50)
-        print(result["final_report"])
-        print("="*50)
+        print_report_latency(result.get("llm_latency"))
+        print_token_usage(result.get("token_usage", {}))
     except Exception as e:
         print(f"\n❌ {ticker} analiz edilirken hata: {e}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="TradeMind AI - Yapay Zeka Borsa Asistanı")
+    parser.add_argument("--trace", nargs="?", const=tracing.DEFAULT_TRACE_DIR, default=None, metavar="KLASÖR",
+                        help="Span izlemeyi açar; JSONL ve Chrome trace dosyaları klasöre yazılır (varsayılan: traces)")
+    return parser.parse_args()
+
 def main():
+    cli = parse_args()
+    if cli.trace:
+        tracing.enable(cli.trace)
+
     # Grafı oluştur
     app = create_graph()
     
@@ -43,10 +80,17 @@ def main():
         scanner = MarketScanner()
         top_tickers = scanner.scan_market()
         print(f"\n🔍 Bulunan Fırsatlar: {top_tickers}")
+
+        # Detaylı analizlerin kullanacağı 1 yıllık veriyi tek bir toplu istekle depoya al
+        scanner.loader.get_many(top_tickers, period="1y")
+        # Kısa listenin temel analizini tek LLM çağrısında yap; her koşu hazır sonucu kullanır
+        fundamentals = get_registry().fundamental.analyze_many(top_tickers)
+        # Haber aramalarını da paralel yap; Sentiment ajanı önbellekten okur
+        get_registry().sentiment.prefetch_news(top_tickers)
         
         for ticker in top_tickers:
             print(f"\n{'*'*20} {ticker} Analiz Ediliyor {'*'*20}")
-            run_analysis(app, ticker)
+            run_analysis(app, ticker, fundamentals.get(ticker))
             
     else:
         # Default to option 1
@@ -1,13 +1,23 @@
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Dict, Any, Iterator, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-import json
 import sys
 import os
 
 # Function provided by user context for proper pathing if needed
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
+from src.agents.llm import create_gemini_llm
+from src.tools.llm_cache import CachedLLM
+from src.tools.prompt_builder import PromptBuilder
+
+# Analist başına prompt'a ayrılan en fazla token (toplam girdi ~1.5K token ile sınırlı kalır)
+SECTION_BUDGETS = {
+    "technical": 300,
+    "fundamental": 400,
+    "sentiment": 400,
+    "quant": 250,
+}
+
 try:
     from src.graph.state import AgentState
 except ImportError:
@@ -15,20 +25,39 @@ except ImportError:
     AgentState = Dict[str, Any]
 
 class ConsensusAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-flash-lite-latest", 
-            temperature=0, 
-            convert_system_message_to_human=True,
-            google_api_key=os.environ["GOOGLE_API_KEY"]
-        )
+    def __init__(self, llm=None, use_cache: bool = True):
+        """
+        llm: Dışarıdan verilen chat modeli (paylaşılan istemci veya test için sahte model). Verilmezse Gemini kurulur.
+        use_cache: False ise bu ajan LLM önbelleğini atlar ve her seferinde modeli çağırır.
+        """
+        if llm is None:
+            llm = create_gemini_llm()
+        # Aynı girdiye (temperature=0) tekrar model çağrısı yapmamak için önbellekli sarmalayıcı
+        self.llm = CachedLLM(llm, namespace="consensus", enabled=use_cache)
 
     def synthesize(self, state: AgentState) -> str:
         """
         Synthesizes reports from Technical, Fundamental, and Sentiment agents.
         Returns the final Investment Committee Report as a string.
         """
-        
+        try:
+            response = self.llm.invoke(self.build_messages(state))
+            content = response.content
+            if isinstance(content, list):
+                content = "".join([str(x) for x in content])
+            return content
+        except Exception as e:
+            return f"Error generating report: {str(e)}"
+
+    def synthesize_stream(self, state: AgentState, timings: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        synthesize'ın akışlı hali: rapor Markdown parçalar halinde, modelden geldikçe verilir.
+        Parçaların birleşimi nihai rapordur. timings: {"ttft", "total", "cached"} ile doldurulur.
+        Hata, parçaların bir kısmı verildikten sonra da olabileceği için yutulmaz; çağıran yarım raporu atmalıdır.
+        """
+        yield from self.llm.stream(self.build_messages(state), timings=timings)
+
+    def build_messages(self, state: AgentState) -> List[Any]:
         ticker = state.get("ticker", "Unknown Ticker")
         technical = state.get("technical_data", {})
         fundamental = state.get("fundamental_data", {})
@@ -36,32 +65,32 @@ class ConsensusAgent:
         quant = state.get("quant_data", {})
 
         # Prepare context for the LLM
-        context_str = f"""
-        TICKER: {ticker}
-
-        --- TECHNICAL ANALYSIS ---
-        Signal: {technical.get('signal', 'N/A')}
-        Score: {technical.get('score', 'N/A')}
-        Details: {technical.get('analysis', 'N/A')}
-        Metrics: {technical.get('metrics', 'N/A')}
-
-        --- FUNDAMENTAL ANALYSIS ---
-        Signal: {fundamental.get('signal', 'N/A')}
-        Reason: {fundamental.get('reason', 'N/A')}
-        Metrics: {json.dumps(fundamental.get('metrics', {}), indent=2)}
-
-        --- SENTIMENT ANALYSIS ---
-        Signal: {sentiment.get('signal', 'N/A')}
-        Score: {sentiment.get('sentiment_score', 'N/A')}
-        Summary: {sentiment.get('news_summary', 'N/A')}
-
-        --- QUANT RISK ANALYSIS ---
-        Signal: {quant.get('signal', 'N/A')}
-        Stop Loss: {quant.get('stop_loss', 'N/A')}
-        Take Profit: {quant.get('take_profit', 'N/A')}
-        Max Allocation: {quant.get('max_portfolio_allocation', 'N/A')}
-        Metrics: {json.dumps(quant, indent=2)}
-        """
+        # Her analistin bölümü kompakt yazılır ve kendi token bütçesiyle sınırlanır.
+        # Quant'ın yukarıda listelenen alanları "Metrics" satırında ikinci kez yazılmaz.
+        builder = PromptBuilder().add_text(f"TICKER: {ticker}")
+        builder.add_section("TECHNICAL ANALYSIS", technical, {
+            "Signal": "signal",
+            "Score": "score",
+            "Details": "analysis",
+            "Metrics": "metrics",
+        }, budget=SECTION_BUDGETS["technical"])
+        builder.add_section("FUNDAMENTAL ANALYSIS", fundamental, {
+            "Signal": "signal",
+            "Reason": "reason",
+            "Metrics": "metrics",
+        }, budget=SECTION_BUDGETS["fundamental"])
+        builder.add_section("SENTIMENT ANALYSIS", sentiment, {
+            "Signal": "signal",
+            "Score": "sentiment_score",
+            "Summary": "news_summary",
+        }, budget=SECTION_BUDGETS["sentiment"])
+        builder.add_section("QUANT RISK ANALYSIS", quant, {
+            "Signal": "signal",
+            "Stop Loss": "stop_loss",
+            "Take Profit": "take_profit",
+            "Max Allocation": "max_portfolio_allocation",
+        }, budget=SECTION_BUDGETS["quant"], extra_key="Metrics")
+        context_str = builder.build()
         
         system_prompt = """You are managing a High-Risk/High-Reward 'Alpha Fund'. Your goal is to find the next 10x stock. Tolerate volatility. If Technicals show a volume breakout and Fundamentals show a growth story, recommend a BUY with a 'High Risk' tag. Do not recommend 'Safe/Boring' stocks.
 
@@ -83,20 +112,11 @@ Rapor şu bölümlerden oluşmalıdır:
 
         user_message = f"Here is the data for {ticker}:\n{context_str}\n\nGenerate the Investment Committee Report."
 
-        messages = [
+        return [
             SystemMessage(content=system_prompt),
             HumanMessage(content=user_message)
         ]
 
-        try:
-            response = self.llm.invoke(messages)
-            content = response.content
-            if isinstance(content, list):
-                content = "".join([str(x) for x in content])
-            return content
-        except Exception as e:
-            return f"Error generating report: {str(e)}"
-
 # --- Test Block ---
 if __name__ == "__main__":
     # Mock data for testing
@@ -1,38 +1,47 @@
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Dict, Any, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
+from src.agents.llm import create_gemini_llm
+from src.tools.llm_cache import CachedLLM
+from src.tools.prompt_builder import compact_json
 import json
-import os
 # MarketDataLoader importu senin klasör yapına göre:
 from src.tools.market_data import MarketDataLoader
 
+SYSTEM_PROMPT = "You are a Venture Capitalist looking for aggressive growth stocks. Do not be scared of high P/E ratios if the growth story is strong. Focus on sector hype, future expectations, and aggressive expansion. If metrics are risky but potential is huge, signal BUY. Cevaplarını Türkçe ver."
+
+# Tek prompt'a sığdırılacak en fazla hisse sayısı (çıktı uzunluğunu makul tutmak için)
+DEFAULT_BATCH_SIZE = 10
+
 class FundamentalAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-flash-lite-latest", 
-            temperature=0, 
-            convert_system_message_to_human=True,
-            google_api_key=os.environ["GOOGLE_API_KEY"]
-        )
+    def __init__(self, llm=None, use_cache: bool = True):
+        """
+        llm: Dışarıdan verilen chat modeli (paylaşılan istemci veya test için sahte model). Verilmezse Gemini kurulur.
+        use_cache: False ise bu ajan LLM önbelleğini atlar ve her seferinde modeli çağırır.
+        """
+        if llm is None:
+            llm = create_gemini_llm()
+        # Aynı girdiye (temperature=0) tekrar model çağrısı yapmamak için önbellekli sarmalayıcı
+        self.llm = CachedLLM(llm, namespace="fundamental", enabled=use_cache)
         self.loader = MarketDataLoader()
 
-    def analyze(self, ticker: str) -> Dict[str, Any]:
+    def analyze(self, ticker: str, raw_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Temel verileri çeker ve Gemini ile yorumlar.
+        raw_data verilirse (örn. toplu analizden geri düşüldüğünde) veri tekrar çekilmez.
         """
         # 1. Veriyi Çek
-        raw_data = self.loader.get_fundamental_info(ticker)
+        if raw_data is None:
+            raw_data = self.loader.get_fundamental_info(ticker)
         
         if not raw_data:
             return {"signal": "HOLD", "reason": "Veri çekilemedi.", "metrics": {}}
 
         # 2. Prompt Hazırla
-        # 2. Prompt Hazırla
-        system_msg = SystemMessage(content="You are a Venture Capitalist looking for aggressive growth stocks. Do not be scared of high P/E ratios if the growth story is strong. Focus on sector hype, future expectations, and aggressive expansion. If metrics are risky but potential is huge, signal BUY. Cevaplarını Türkçe ver.")
+        system_msg = SystemMessage(content=SYSTEM_PROMPT)
         
         user_prompt = f"""
         Şirket: {ticker}
-        Veriler: {json.dumps(raw_data, indent=2)}
+        Veriler: {compact_json(raw_data)}
         
         Bu verileri analiz et. F/K oranı, marjlar ve büyüme potansiyeline odaklan.
         Çıktıyı SADECE geçerli bir JSON formatında ver:
@@ -43,32 +52,22 @@ class FundamentalAgent:
         }}
         """
         
-        # 3. Modelden Cevap Al
         # 3. Modelden Cevap Al
         try:
-            response = self.llm.invoke([system_msg, HumanMessage(content=user_prompt)])
-            content = response.content
-            if isinstance(content, list):
-                content = "".join([str(x) for x in content])
-            
-            # Clean Markdown
-            content = content.replace("```json", "").replace("```", "").strip()
+            # Çözülemeyen cevap önbelleğe yazılmaz; aksi halde "Veri formatı hatası" TTL boyunca tekrar döner
+            response = self.llm.invoke([system_msg, HumanMessage(content=user_prompt)],
+                                       validate=lambda text: _parse_json(_clean_content(text)) is not None)
+            content = _clean_content(response.content)
             
-            # Try parsing
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                # Fallback: Try ast.literal_eval for single quotes
-                import ast
-                try:
-                    return ast.literal_eval(content)
-                except:
-                    print(f"JSON Parsing Failed. Raw: {content}")
-                    return {
-                        "signal": "TUT",
-                        "reason": "Veri formatı hatası (JSON parse edilemedi).",
-                        "metrics": raw_data
-                    }
+            parsed = _parse_json(content)
+            if parsed is None:
+                print(f"JSON Parsing Failed. Raw: {content}")
+                return {
+                    "signal": "TUT",
+                    "reason": "Veri formatı hatası (JSON parse edilemedi).",
+                    "metrics": raw_data
+                }
+            return parsed
         except Exception as e:
             print(f"Fundamental Agent Error: {e}")
             return {
@@ -77,6 +76,132 @@ class FundamentalAgent:
                 "metrics": raw_data
             }
 
+    def analyze_many(self, tickers: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+        """
+        Birden çok hisseyi tek LLM çağrısında yorumlar (tarama modundaki kısa liste için).
+
+        Temel veriler paralel çekilir, her batch_size hisse tek prompt'ta gönderilir ve
+        hisse koduna göre anahtarlanmış bir JSON dizisi istenir. Her hissenin sonucu ayrı ayrı
+        doğrulanır; sadece cevapta eksik olan veya geçersiz dönen hisseler için tekli analyze
+        çağrısına geri düşülür. Dönüş: ticker -> analyze() ile aynı formatta sonuç.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        raw_by_ticker = self.loader.prefetch_fundamentals(tickers)
+
+        results = {}
+        for ticker in tickers:
+            if ticker not in raw_by_ticker:
+                results[ticker] = {"signal": "HOLD", "reason": "Veri çekilemedi.", "metrics": {}}
+
+        pending = [ticker for ticker in tickers if ticker in raw_by_ticker]
+        for i in range(0, len(pending), batch_size):
+            batch = {ticker: raw_by_ticker[ticker] for ticker in pending[i:i + batch_size]}
+            results.update(self._analyze_batch(batch))
+
+        # Orijinal sırayı koru
+        return {ticker: results[ticker] for ticker in tickers}
+
+    def _analyze_batch(self, batch: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Tek prompt'ta birden çok hisse; geçersiz dönenler tekli çağrıyla tamamlanır."""
+        if len(batch) == 1:
+            ticker, raw_data = next(iter(batch.items()))
+            return {ticker: self.analyze(ticker, raw_data)}
+
+        system_msg = SystemMessage(content=SYSTEM_PROMPT)
+        user_prompt = f"""
+        Şirketler ve verileri (hisse kodu -> veriler):
+        {compact_json(batch)}
+        
+        Her şirketi diğerlerinden bağımsız olarak analiz et. F/K oranı, marjlar ve büyüme potansiyeline odaklan.
+        Çıktıyı SADECE geçerli bir JSON dizisi olarak ver; her şirket için tam olarak bir eleman:
+        [
+            {{
+                "ticker": "Hisse kodu (yukarıdaki gibi, örn: THYAO.IS)",
+                "signal": "AL" veya "TUT" veya "SAT",
+                "reason": "Kısa ve öz bir açıklama (Türkçe, Max 2 cümle)",
+                "metrics": {{ "PE": "...", "ROE": "..." }}
+            }}
+        ]
+        """
+
+        parsed = {}
+        try:
+            # Hiçbir hissesi çözülemeyen toplu cevap önbelleğe yazılmaz
+            response = self.llm.invoke([system_msg, HumanMessage(content=user_prompt)],
+                                       validate=lambda text: bool(_split_batch_response(_parse_json(_clean_content(text)), batch)))
+            parsed = _split_batch_response(_parse_json(_clean_content(response.content)), batch)
+        except Exception as e:
+            print(f"Fundamental Agent Batch Error: {e}")
+
+        results = {}
+        retry = []
+        for ticker in batch:
+            if ticker in parsed:
+                results[ticker] = parsed[ticker]
+            else:
+                retry.append(ticker)
+
+        if retry:
+            print(f"UYARI: Toplu temel analizde geçersiz dönen hisseler tek tek analiz ediliyor: {', '.join(retry)}")
+            for ticker in retry:
+                results[ticker] = self.analyze(ticker, batch[ticker])
+        return results
+
+
+def _clean_content(content: Any) -> str:
+    if isinstance(content, list):
+        content = "".join([str(x) for x in content])
+    # Clean Markdown
+    return content.replace("```json", "").replace("```", "").strip()
+
+
+def _parse_json(content: str) -> Any:
+    """JSON olarak, olmazsa tek tırnaklı Python literal'i olarak çözer. Başarısızsa None."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # Fallback: Try ast.literal_eval for single quotes
+        import ast
+        try:
+            return ast.literal_eval(content)
+        except Exception:
+            return None
+
+
+def _is_valid_result(item: Any) -> bool:
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("signal"), str) and bool(item["signal"].strip())
+        and isinstance(item.get("reason"), str)
+    )
+
+
+def _split_batch_response(parsed: Any, batch: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Toplu cevabı hisse bazında doğrular. Dizi ({"ticker": ...} elemanları) veya
+    hisse koduna göre anahtarlanmış nesne kabul edilir; istenmeyen/geçersiz elemanlar atılır.
+    """
+    if isinstance(parsed, dict):
+        items = [{**value, "ticker": key} for key, value in parsed.items() if isinstance(value, dict)]
+    elif isinstance(parsed, list):
+        items = parsed
+    else:
+        return {}
+
+    results = {}
+    for item in items:
+        if not _is_valid_result(item):
+            continue
+        ticker = str(item.get("ticker") or item.get("symbol") or "").strip()
+        if ticker not in batch or ticker in results:
+            continue
+        results[ticker] = {
+            "signal": item["signal"],
+            "reason": item["reason"],
+            "metrics": item.get("metrics") if isinstance(item.get("metrics"), dict) else {}
+        }
+    return results
+
 if __name__ == "__main__":
     # Test block
     try:
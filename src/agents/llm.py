@@ -0,0 +1,15 @@
+import os
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+# Tüm Gemini ajanlarının kullandığı model
+GEMINI_MODEL = "models/gemini-flash-lite-latest"
+
+
+def create_gemini_llm() -> ChatGoogleGenerativeAI:
+    """Ajanların ortak Gemini istemcisini kurar (tek yerde yapılandırma)."""
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL, 
+        temperature=0, 
+        convert_system_message_to_human=True,
+        google_api_key=os.environ["GOOGLE_API_KEY"]
+    )
@@ -1,15 +1,29 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.tools.indicators import IndicatorSet
+
+# ATR ve volatilite pencereleri
+ATR_LENGTH = 14
+VOLATILITY_LENGTH = 20
+# Stop ve hedef seviyeleri: fiyat -/+ ATR katı (backtest de aynı katsayıları kullanır)
+STOP_ATR_MULT = 2
+TARGET_ATR_MULT = 4
+
 
 class QuantAgent:
     def __init__(self):
         pass
 
-    def analyze(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze(self, df: pd.DataFrame, indicators: Optional[IndicatorSet] = None) -> Dict[str, Any]:
         """
         Performs quantitative risk analysis using technical indicators.
         Expected columns in df: 'High', 'Low', 'Close'
+
+        indicators: Koşunun paylaşılan indikatör erişimi; ATR ve volatilite hissenin artımlı durumundan
+        okunur (sadece yeni barlar işlenir). Verilmezse df üzerinde önbelleksiz hesaplanır.
+        Frame kopyalanmaz ve kolon eklenmez.
         """
         if df is None or df.empty:
             return {
@@ -18,71 +32,116 @@ class QuantAgent:
             }
         
         # Ensure sufficient data for 14-period ATR
-        if len(df) < 15:
+        if len(df) < ATR_LENGTH + 1:
             return {
                 "signal": "UNKNOWN",
                 "reason": "Insufficient data for ATR calculation (need > 14 periods)"
             }
 
-        # Work on a copy to avoid modifying original df
-        data = df.copy()
-        
-        # --- 1. Calculate ATR (Average True Range) Period 14 ---
-        # TR = max(High - Low, |High - PrevClose|, |Low - PrevClose|)
-        data['H-L'] = data['High'] - data['Low']
-        data['H-PC'] = abs(data['High'] - data['Close'].shift(1))
-        data['L-PC'] = abs(data['Low'] - data['Close'].shift(1))
-        
-        data['TR'] = data[['H-L', 'H-PC', 'L-PC']].max(axis=1)
-        
-        # Simple Moving Average for ATR (common variation)
-        # Note: Some implementations use Wilder's Smoothing, but SMA is specified as acceptable via "manual calculation" implying standard rolling.
-        # We will use Wilder's smoothing method as it is standard for ATR.
-        # ATR = (PrevATR * (n-1) + CurrentTR) / n
-        # Or simply rolling mean for simplicity if not strictly specified. I will use simple rolling mean for robustness and simplicity.
-        data['ATR'] = data['TR'].rolling(window=14).mean()
-        
-        current_atr = data['ATR'].iloc[-1]
-        
-        # --- 2. Calculate Volatility ---
-        # Standard deviation of daily returns
-        data['Returns'] = data['Close'].pct_change()
-        # Using a rolling window for volatility (e.g., 20 days) or full series? 
-        # Requirement says "Volatility (Standard Deviation of returns)". I will use the std of the last 20 periods to be relevant.
-        volatility = data['Returns'].rolling(window=20).std().iloc[-1]
-        
-        # If NaN (e.g. not enough data), fallback to full series std
-        if np.isnan(volatility):
-            volatility = data['Returns'].std()
-            
-        # Convert to percentage for easy comparison
-        volatility_pct = volatility * 100
-
-        # --- 3. Determine Risk Levels ---
-        current_price = data['Close'].iloc[-1]
-        stop_loss = current_price - (2 * current_atr)
-        take_profit = current_price + (4 * current_atr)
-        
-        # --- 4. Portfolio Allocation and Signal ---
-        if volatility_pct > 3.0:
-            allocation = "Low (max 5%)"
-            signal = "Risky"
-        elif volatility_pct < 1.5:
-            allocation = "High (max 15%)"
-            signal = "Safe"
-        else:
-            allocation = "Medium (max 10%)"
-            signal = "Moderate"
-
-        return {
-            "signal": signal,
-            "current_price": round(current_price, 2),
-            "atr": round(current_atr, 4),
-            "volatility_daily_pct": round(volatility_pct, 2),
-            "stop_loss": round(stop_loss, 2),
-            "take_profit": round(take_profit, 2),
-            "max_portfolio_allocation": allocation
-        }
+        # ATR: son 14 barın True Range ortalaması.
+        # Volatilite: son 20 günlük getirilerin standart sapması (yetersiz veride tüm getiriler)
+        latest = (indicators or IndicatorSet(df)).latest()
+
+        return _risk_report(latest["Close"], latest["ATR_SMA"], latest["VOLATILITY"])
+
+    def analyze_many(self, panel: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+        """
+        Tüm evrenin risk analizini tek vektörel geçişte yapar.
+
+        panel: indicators.build_panel çıktısı (kolon -> bar x hisse DataFrame; 'High', 'Low', 'Close' gerekli).
+        Dönüş: ticker -> analyze() ile aynı sözlük.
+        """
+        close_df = panel["Close"]
+        tickers = list(close_df.columns)
+        high = panel["High"].to_numpy(dtype=float)
+        low = panel["Low"].to_numpy(dtype=float)
+        close = close_df.to_numpy(dtype=float)
+        rows = close.shape[0]
+
+        # Panel son bara hizalı; her hissenin bar sayısı ilk geçerli satırdan sona kadardır
+        valid = ~np.isnan(close)
+        first = np.where(valid.any(axis=0), valid.argmax(axis=0), rows)
+        bars = rows - first
+
+        results: Dict[str, Dict[str, Any]] = {}
+        usable = bars >= ATR_LENGTH + 1
+        if usable.any():
+            cols = np.flatnonzero(usable)
+            tail = slice(rows - (ATR_LENGTH + 1), rows)
+            atr = _atr_last(high[tail][:, cols], low[tail][:, cols], close[tail][:, cols])
+
+            returns = close[1:, cols] / close[:-1, cols] - 1
+            volatility = _volatility_last(returns)
+            last_close = close[-1, cols]
+
+            for k, j in enumerate(cols):
+                results[tickers[j]] = _risk_report(last_close[k], atr[k], volatility[k])
+
+        for j, ticker in enumerate(tickers):
+            if ticker in results:
+                continue
+            if bars[j] == 0:
+                results[ticker] = {"signal": "UNKNOWN", "error": "Empty or None DataFrame provided"}
+            else:
+                results[ticker] = {
+                    "signal": "UNKNOWN",
+                    "reason": "Insufficient data for ATR calculation (need > 14 periods)"
+                }
+        return {ticker: results[ticker] for ticker in tickers}
+
+
+def _atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    Son ATR_LENGTH barın True Range ortalaması (rolling(14).mean() son değeri).
+    Girdiler ATR_LENGTH + 1 satırdır (ilk satır sadece önceki kapanış için); 1 veya 2 boyutlu olabilir.
+    TR = max(High - Low, |High - PrevClose|, |Low - PrevClose|)
+    """
+    prev_close = close[:-1]
+    high, low = high[1:], low[1:]
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return tr.mean(axis=0)
+
+
+def _volatility_last(returns: np.ndarray) -> np.ndarray:
+    """
+    Son VOLATILITY_LENGTH getirinin örnek standart sapması; pencere dolmadıysa (NaN) tüm getirilerinki.
+    returns 1 veya 2 boyutlu (bar x hisse) olabilir; panelde baştaki NaN dolgusu atlanır.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        window = returns[-VOLATILITY_LENGTH:]
+        volatility = np.std(window, axis=0, ddof=1) if len(window) == VOLATILITY_LENGTH else np.full(window.shape[1:], np.nan)
+        fallback = np.nanstd(returns, axis=0, ddof=1) if len(returns) > 1 else np.full(returns.shape[1:], np.nan)
+    return np.where(np.isnan(volatility), fallback, volatility)
+
+
+def _risk_report(current_price: float, current_atr: float, volatility: float) -> Dict[str, Any]:
+    # Convert to percentage for easy comparison
+    volatility_pct = volatility * 100
+
+    # --- 3. Determine Risk Levels ---
+    stop_loss = current_price - (STOP_ATR_MULT * current_atr)
+    take_profit = current_price + (TARGET_ATR_MULT * current_atr)
+    
+    # --- 4. Portfolio Allocation and Signal ---
+    if volatility_pct > 3.0:
+        allocation = "Low (max 5%)"
+        signal = "Risky"
+    elif volatility_pct < 1.5:
+        allocation = "High (max 15%)"
+        signal = "Safe"
+    else:
+        allocation = "Medium (max 10%)"
+        signal = "Moderate"
+
+    return {
+        "signal": signal,
+        "current_price": round(current_price, 2),
+        "atr": round(current_atr, 4),
+        "volatility_daily_pct": round(volatility_pct, 2),
+        "stop_loss": round(stop_loss, 2),
+        "take_profit": round(take_profit, 2),
+        "max_portfolio_allocation": allocation
+    }
 
 if __name__ == "__main__":
     # Test Block with mock data
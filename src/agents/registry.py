@@ -0,0 +1,80 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.agents.llm import create_gemini_llm
+from src.agents.technical import TechnicalAgent
+from src.agents.quant import QuantAgent
+from src.agents.fundamental import FundamentalAgent
+from src.agents.sentiment import SentimentAgent
+from src.agents.consensus import ConsensusAgent
+
+
+class AgentRegistry:
+    """
+    Ajanları ilk ihtiyaç anında bir kez kurar ve sonraki koşularda aynı örnekleri verir.
+
+    Üç Gemini ajanı tek bir chat istemcisini (ve onun HTTP/gRPC bağlantı havuzunu) paylaşır;
+    SentimentAgent'ın arama aracı ve FundamentalAgent'ın veri yükleyicisi de tekrar kurulmaz.
+    Böylece tarama modunda ve tekrarlanan Streamlit tıklamalarında istemci kurulumu ve TLS el sıkışması
+    her hisse için yeniden ödenmez. Paralel node'lar için thread-safe'tir.
+    """
+
+    def __init__(self, llm: Any = None, use_cache: bool = True):
+        self._llm = llm
+        self.use_cache = use_cache
+        self._agents: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def llm(self) -> Any:
+        """Gemini ajanlarının paylaştığı chat istemcisi."""
+        with self._lock:
+            if self._llm is None:
+                self._llm = create_gemini_llm()
+            return self._llm
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._agents:
+                self._agents[name] = factory()
+            return self._agents[name]
+
+    @property
+    def technical(self) -> TechnicalAgent:
+        return self._get("technical", TechnicalAgent)
+
+    @property
+    def quant(self) -> QuantAgent:
+        return self._get("quant", QuantAgent)
+
+    @property
+    def fundamental(self) -> FundamentalAgent:
+        return self._get("fundamental", lambda: FundamentalAgent(llm=self.llm, use_cache=self.use_cache))
+
+    @property
+    def sentiment(self) -> SentimentAgent:
+        return self._get("sentiment", lambda: SentimentAgent(llm=self.llm, use_cache=self.use_cache))
+
+    @property
+    def consensus(self) -> ConsensusAgent:
+        return self._get("consensus", lambda: ConsensusAgent(llm=self.llm, use_cache=self.use_cache))
+
+
+_default_registry: Optional[AgentRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry() -> AgentRegistry:
+    """Süreç geneli varsayılan ajan kayıt defteri."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = AgentRegistry()
+        return _default_registry
+
+
+def reset_registry():
+    """Varsayılan kayıt defterini bırakır; sonraki get_registry() ajanları ve LLM istemcilerini yeniden kurar."""
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = None
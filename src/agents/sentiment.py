@@ -1,44 +1,143 @@
-from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Dict, Any, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
+from src.agents.llm import create_gemini_llm
+from src.tools.cache import TTLCache
+from src.tools.llm_cache import CachedLLM
+from src.tools.tokens import truncate_to_tokens
+from src.tools.tracing import span
 from langchain_community.tools import DuckDuckGoSearchRun, TavilySearchResults
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 import os
+import threading
+
+# Haber aramaları kısa süreli önbelleğe alınır (saniye)
+NEWS_TTL = 30 * 60
+# Aynı haber kümesi için önceki duygu sonucu bu süre boyunca tekrar kullanılır (saniye)
+SENTIMENT_RESULT_TTL = 24 * 3600
+# Modele gönderilen haber metninin toplam token bütçesi (haberler arasında eşit paylaştırılır)
+NEWS_TOKEN_BUDGET = 2000
+
+_default_caches: Dict[str, TTLCache] = {}
+_default_cache_lock = threading.Lock()
+
+
+def get_news_cache() -> TTLCache:
+    """Süreç genelinde paylaşılan haber arama önbelleği (ticker + sorgu -> haberler)."""
+    with _default_cache_lock:
+        if "news" not in _default_caches:
+            _default_caches["news"] = TTLCache("news", ttl=NEWS_TTL)
+        return _default_caches["news"]
+
+
+def get_sentiment_result_cache() -> TTLCache:
+    """Ticker başına son duygu sonucu ve o sonucu üreten haberlerin hash kümesi."""
+    with _default_cache_lock:
+        if "sentiment_results" not in _default_caches:
+            _default_caches["sentiment_results"] = TTLCache("sentiment_results", ttl=SENTIMENT_RESULT_TTL)
+        return _default_caches["sentiment_results"]
+
+
+def news_hash(content: str) -> str:
+    """Haber metninin içerik hash'i (boşluk farklılıkları aynı haber sayılır)."""
+    normalized = " ".join(content.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
 
 class SentimentAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-flash-lite-latest", 
-            temperature=0, 
-            convert_system_message_to_human=True,
-            google_api_key=os.environ["GOOGLE_API_KEY"]
-        )
+    def __init__(self, llm=None, use_cache: bool = True, search_tool: Any = None,
+                 news_cache: Optional[TTLCache] = None, result_cache: Optional[TTLCache] = None):
+        """
+        llm: Dışarıdan verilen chat modeli (paylaşılan istemci veya test için sahte model). Verilmezse Gemini kurulur.
+        use_cache: False ise bu ajan LLM, haber ve sonuç önbelleklerini atlar ve her seferinde arama + model çağrısı yapar.
+        search_tool: invoke(query) metodu olan arama aracı (testler için sahte araç). Verilmezse
+            TAVILY_API_KEY varsa Tavily, yoksa DuckDuckGo kullanılır. Dönüş değeri tek bir metin,
+            metin listesi ya da 'content' alanlı sözlük listesi olabilir.
+        """
+        if llm is None:
+            llm = create_gemini_llm()
+        # Aynı girdiye (temperature=0) tekrar model çağrısı yapmamak için önbellekli sarmalayıcı
+        self.llm = CachedLLM(llm, namespace="sentiment", enabled=use_cache)
+        self.news_cache = (news_cache or get_news_cache()) if use_cache else None
+        self.result_cache = (result_cache or get_sentiment_result_cache()) if use_cache else None
         
+        if search_tool is not None:
+            self.search_tool = search_tool
+            self.using_tavily = False
         # Check for Tavily API Key
-        if os.environ.get("TAVILY_API_KEY"):
+        elif os.environ.get("TAVILY_API_KEY"):
             self.search_tool = TavilySearchResults(max_results=5)
             self.using_tavily = True
         else:
             self.search_tool = DuckDuckGoSearchRun()
             self.using_tavily = False
 
-    def get_news(self, ticker: str) -> List[str]:
+    @staticmethod
+    def build_query(ticker: str) -> str:
+        return f"{ticker} stock news analysis financial"
+
+    def get_news(self, ticker: str, force_refresh: bool = False) -> List[str]:
         """
-        Fetches recent news using Tavily or DuckDuckGo.
+        Fetches recent news using Tavily or DuckDuckGo (önbellekten, süresi dolmadıysa).
         """
-        query = f"{ticker} stock news analysis financial"
-        try:
+        return [item["content"] for item in self.get_news_items(ticker, force_refresh)]
+
+    def get_news_items(self, ticker: str, force_refresh: bool = False) -> List[Dict[str, str]]:
+        """
+        Haberleri içerik hash'leriyle birlikte döndürür: [{"hash": ..., "content": ...}, ...]
+        Sonuç ticker + sorgu anahtarıyla NEWS_TTL süresince önbellekte tutulur. Aynı içerikli haberler tekilleştirilir.
+        """
+        query = self.build_query(ticker)
+        cache_key = f"{ticker}|{query}"
+        with span("search.news", ticker=ticker, cache_hit=False) as sp:
+            if self.news_cache is not None and not force_refresh:
+                cached = self.news_cache.get(cache_key)
+                if cached is not None:
+                    sp.set(cache_hit=True, items=len(cached))
+                    return cached
+
+            try:
+                contents = self._search(query)
+            except Exception as e:
+                print(f"Error fetching news for {ticker}: {e}")
+                sp.set(error=repr(e))
+                # Hata önbelleğe yazılmaz; sonraki çağrı tekrar dener
+                return []
+            sp.set(items=len(contents))
+
+        items = {}
+        for content in contents:
+            if content and content.strip():
+                items.setdefault(news_hash(content), content)
+        news_items = [{"hash": digest, "content": content} for digest, content in items.items()]
+
+        if self.news_cache is not None:
+            self.news_cache.set(cache_key, news_items)
+        return news_items
+
+    def prefetch_news(self, tickers: List[str], max_workers: int = 4) -> Dict[str, List[Dict[str, str]]]:
+        """Birden çok hissenin haber aramasını paralel yapar (önbellekte olanlar ağa gitmez)."""
+        tickers = list(dict.fromkeys(tickers))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(tickers, pool.map(self.get_news_items, tickers)))
+
+    def _search(self, query: str) -> List[str]:
+        with span("search.query", provider="tavily" if self.using_tavily else "duckduckgo") as sp:
             if self.using_tavily:
                 results = self.search_tool.invoke({"query": query})
-                # Tavily returns list of dicts with 'content'
-                return [r.get("content", "") for r in results if r.get("content")]
             else:
                 # DuckDuckGo returns a single string of results usually
                 results = self.search_tool.invoke(query)
-                return [results] # Wrap in list for consistency
-        except Exception as e:
-            print(f"Error fetching news for {ticker}: {e}")
-            return []
+
+            if isinstance(results, str):
+                contents = [results] # Wrap in list for consistency
+            else:
+                # Tavily returns list of dicts with 'content'
+                contents = [r.get("content", "") if isinstance(r, dict) else str(r) for r in (results or [])]
+            if sp:
+                sp.set(results=len(contents), bytes=sum(len(c.encode("utf-8")) for c in contents))
+            return contents
 
     def analyze(self, ticker: str) -> Dict[str, Any]:
         """
@@ -50,16 +149,26 @@ class SentimentAgent:
                 "news_summary": "..."
             }
         """
-        news_items = self.get_news(ticker)
+        news_items = self.get_news_items(ticker)
         
-        if not news_items or (len(news_items) == 1 and not news_items[0]):
+        if not news_items:
             return {
                 "signal": "NEUTRAL",
                 "sentiment_score": 0.5,
                 "news_summary": "No recent news found."
             }
 
-        news_text = "\n---\n".join(news_items)
+        # Haber kümesi (sırası önemsiz) son analizdekiyle aynıysa modele tekrar gitme
+        hashes = sorted(item["hash"] for item in news_items)
+        if self.result_cache is not None:
+            previous = self.result_cache.get(ticker)
+            if previous is not None and previous.get("hashes") == hashes:
+                print(f"DEBUG: {ticker} için haberler değişmedi, önceki duygu sonucu kullanılıyor.")
+                return previous["result"]
+
+        # DuckDuckGo tek ve uzun bir metin döndürebilir; her haber kendi payına kırpılır
+        per_item_budget = NEWS_TOKEN_BUDGET // len(news_items)
+        news_text = "\n---\n".join(truncate_to_tokens(item["content"], per_item_budget) for item in news_items)
         
         system_prompt = """Sen bir Finansal Duygu Analizi Uzmanısın (Financial Sentiment Analyst).
 Hisse senedi için verilen haberleri analiz et.
@@ -75,38 +184,26 @@ Genel duygu durumunu ve güven skorunu belirle.
         user_message = f"News for {ticker}:\n{news_text}"
 
         try:
+            # Çözülemeyen cevap LLM önbelleğine yazılmaz (aynı haberlerle bir sonraki analizde model tekrar çağrılır)
             response = self.llm.invoke([
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_message)
-            ])
+            ], validate=lambda text: bool(_parse_sentiment(text)))
             
-            content = response.content
-            if isinstance(content, list):
-                content = "".join([str(x) for x in content])
-            
-            # Clean
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-                
-            try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError:
-                import ast
-                try:
-                    parsed = ast.literal_eval(content)
-                except:
-                    print(f"Sentiment JSON Parse Error. Raw: {content}")
-                    parsed = {}
+            content = _clean_content(response.content)
+            parsed = _parse_sentiment(content)
+            if not parsed:
+                print(f"Sentiment JSON Parse Error. Raw: {content}")
 
-            return {
+            result = {
                 "signal": parsed.get("signal", "NÖTR").upper(),
                 "sentiment_score": float(parsed.get("sentiment_score", 0.5)),
                 "news_summary": parsed.get("news_summary", "Hata: Özet alınamadı.")
             }
+            # Sadece başarıyla çözülen sonuçlar tekrar kullanılmak üzere saklanır
+            if parsed and self.result_cache is not None:
+                self.result_cache.set(ticker, {"hashes": hashes, "result": result})
+            return result
             
         except Exception as e:
             return {
@@ -115,6 +212,31 @@ Genel duygu durumunu ve güven skorunu belirle.
                 "news_summary": f"Analiz hatası: {str(e)}"
             }
 
+def _clean_content(content: Any) -> str:
+    if isinstance(content, list):
+        content = "".join([str(x) for x in content])
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
+def _parse_sentiment(content: Any) -> Dict[str, Any]:
+    """Cevabı JSON, olmazsa Python literal'i olarak çözer. Sözlük çıkmazsa boş sözlük."""
+    content = _clean_content(content)
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        import ast
+        try:
+            parsed = ast.literal_eval(content)
+        except Exception:
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
 if __name__ == "__main__":
     try:
         agent = SentimentAgent()
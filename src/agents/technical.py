@@ -1,29 +1,31 @@
 import pandas as pd
-import pandas_ta as ta  # TA-Lib yerine pandas-ta kullanıyoruz, kurulumu daha kolay
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.tools.indicators import IndicatorSet
+
+# Karar eşikleri (backtest de aynı eşikleri kullanır)
+BUY_SCORE = 3
+SELL_SCORE = -3
 
 class TechnicalAgent:
     def __init__(self):
         pass
 
-    def analyze(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze(self, df: pd.DataFrame, indicators: Optional[IndicatorSet] = None) -> Dict[str, Any]:
         """
         Fiyat verisini alır, indikatörleri hesaplar ve teknik bir görüş bildirir.
+        indicators: Koşunun paylaşılan (önbellekli) indikatör erişimi. Verilmezse df üzerinde
+        önbelleksiz hesaplanır. df hiçbir durumda değiştirilmez.
         """
         if df.empty:
             return {"signal": "NEUTRAL", "reason": "Yetersiz veri."}
 
-        # 1. İndikatör Hesaplamaları
-        # RSI (14 periyot)
-        df['RSI'] = ta.rsi(df['Close'], length=14)
-        
-        # SMA 50 ve SMA 200
-        df['SMA_50'] = ta.sma(df['Close'], length=50)
-        df['SMA_200'] = ta.sma(df['Close'], length=200)
+        indicators = indicators or IndicatorSet(df)
 
-        # Son satırı (güncel durumu) alalım
-        latest = df.iloc[-1]
-        prev = df.iloc[-2] # Trend değişimi kontrolü için bir önceki gün
+        # 1. İndikatörlerin son değerleri: RSI (14), SMA 50 ve SMA 200 (pandas_ta ile aynı formüller).
+        # Hissenin artımlı durumundan okunur; sadece son değerlendirmeden sonra gelen barlar işlenir.
+        # Yetersiz veride değer NaN'dır.
+        latest = indicators.latest()
 
         signal = "NEUTRAL"
         reasons = []
@@ -59,9 +61,9 @@ class TechnicalAgent:
             reasons.append("Death Cross mevcut (50 < 200 - Uzun vade Ayı).")
 
         # Karar Mekanizması
-        if score >= 3:
+        if score >= BUY_SCORE:
             signal = "BUY"
-        elif score <= -3:
+        elif score <= SELL_SCORE:
             signal = "SELL"
         else:
             signal = "HOLD"
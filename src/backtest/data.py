@@ -0,0 +1,78 @@
+import glob
+import os
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+# Backtest ağa gitmez: fiyatlar yerel Parquet deposundan (PriceStore düzeni: {root}/{interval}/{ticker}.parquet)
+# veya hisse başına bir CSV/Parquet dosyası içeren herhangi bir klasörden okunur.
+DEFAULT_DATA_DIR = os.path.join("data", "ohlcv", "1d")
+REQUIRED_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def load_price_set(path: str = DEFAULT_DATA_DIR, tickers: Optional[Iterable[str]] = None,
+                   min_bars: int = 30) -> Dict[str, pd.DataFrame]:
+    """
+    Klasördeki *.parquet ve *.csv dosyalarını {ticker: OHLCV DataFrame} olarak yükler.
+    Dosya adı (uzantısız) ticker'dır. CSV'lerde ilk kolon tarih olmalıdır (yfinance'in to_csv çıktısı gibi).
+    Eksik kolonlu veya min_bars'tan kısa seriler atlanır.
+    """
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Fiyat klasörü bulunamadı: {path}")
+
+    files = sorted(glob.glob(os.path.join(path, "*.parquet")) + glob.glob(os.path.join(path, "*.csv")))
+    wanted = set(tickers) if tickers is not None else None
+
+    frames: Dict[str, pd.DataFrame] = {}
+    for file in files:
+        ticker = os.path.splitext(os.path.basename(file))[0]
+        if (wanted is not None and ticker not in wanted) or ticker in frames:
+            continue
+        try:
+            df = _read_frame(file)
+        except Exception as e:
+            print(f"UYARI: {file} okunamadı, atlanıyor -> {e}")
+            continue
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing or len(df) < min_bars:
+            continue
+        frames[ticker] = df
+
+    print(f"DEBUG: {len(frames)} hissenin fiyat verisi {path} klasöründen yüklendi.")
+    return frames
+
+
+def _read_frame(file: str) -> pd.DataFrame:
+    if file.endswith(".parquet"):
+        df = pd.read_parquet(file)
+    else:
+        df = pd.read_csv(file, index_col=0)
+        df.index = _to_datetime(df.index)
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        # Tarih kolon olarak saklanmışsa index'e al
+        date_col = next((c for c in ("Date", "Datetime", "date") if c in df.columns), None)
+        if date_col is None:
+            raise ValueError("Tarih kolonu yok")
+        df = df.set_index(_to_datetime(df[date_col])).drop(columns=[date_col])
+
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna(subset=["Close"]) if "Close" in df.columns else df
+
+
+def _to_datetime(values) -> pd.DatetimeIndex:
+    # Yerel saat korunur (günlük barlarda UTC'ye çevirmek tarihi bir gün kaydırabilir);
+    # karışık ofsetli metinler ancak UTC olarak çözülebilir
+    try:
+        return pd.DatetimeIndex(pd.to_datetime(values))
+    except (ValueError, TypeError):
+        return pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+
+
+def session_dates(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Kesitsel hizalama için yerel işlem günü (saat dilimi atılır, gün başına normalize)."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
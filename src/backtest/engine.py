@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.agents.quant import ATR_LENGTH, STOP_ATR_MULT, TARGET_ATR_MULT
+from src.agents.technical import BUY_SCORE, SELL_SCORE
+from src.backtest.data import DEFAULT_DATA_DIR, load_price_set, session_dates
+from src.tools.indicators import build_panel, rsi, sma
+from src.tools.scanner import growth_score_panel
+
+# Mevcut karar kurallarını geçmiş fiyatlar üzerinde tekrar oynatan backtest motoru.
+#
+# Her hissenin tüm geçmişi tek seferde (tarih ekseninde vektörel) skorlanır; hisseler gruplar halinde
+# süreç havuzuna dağıtılır. Tarayıcının "ilk 3" kuralı kesitsel olduğu için ana süreçte, tüm hisselerin
+# günlük skorları birleştirildikten sonra uygulanır.
+#
+# Not: Canlı ajanlar indikatörleri son 1 yıllık (tarayıcı 3 aylık) pencerede hesaplar; burada tüm geçmiş
+# kullanılır. RSI/ATR gibi üstel ortalamalar başlangıçtan bağımsızlaştıktan sonra (birkaç düzine bar) aynıdır.
+
+DEFAULT_HORIZON = 10          # Teknik ve tarayıcı sinyalleri için ileri getiri ufku (bar)
+DEFAULT_BRACKET_HORIZON = 20  # Stop/hedef için en fazla bekleme (bar)
+DEFAULT_GROWTH_THRESHOLD = 5
+SCANNER_TOP_K = 3
+SCANNER_MIN_BARS = 25
+# Canlı Teknik Analist 1 yıllık veriyle çalışır, yani SMA 200 hep hazırdır; daha erken barlar sayılmaz
+TECHNICAL_MIN_BARS = 200
+
+
+# --- Kurallar (canlı ajanlarla aynı mantık, tüm barlar için) ---
+
+def technical_scores(close: Union[pd.Series, pd.DataFrame]) -> np.ndarray:
+    """TechnicalAgent skorunu her bar için hesaplar (-5 ... +5). Tek seri veya (bar x hisse) panel alır."""
+    rsi_values = rsi(close, 14).to_numpy(dtype=float)
+    sma_50 = sma(close, 50).to_numpy(dtype=float)
+    sma_200 = sma(close, 200).to_numpy(dtype=float)
+    price = close.to_numpy(dtype=float)
+
+    # NaN karşılaştırmaları canlı ajandaki gibi False sayılır
+    score = np.zeros(price.shape, dtype=int)
+    score += np.where(rsi_values < 30, 2, 0)
+    score -= np.where(rsi_values > 70, 2, 0)
+    score += np.where(price > sma_50, 1, -1)
+    score += np.where(sma_50 > sma_200, 2, 0)
+    score -= np.where(sma_50 < sma_200, 2, 0)
+    return score
+
+
+def quant_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """QuantAgent'ın ATR'si (True Range'in ATR_LENGTH barlık basit ortalaması) her bar için."""
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return pd.Series(tr).rolling(ATR_LENGTH).mean().to_numpy()
+
+
+def forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """horizon bar sonraki kapanışa göre getiri; yeterli gelecek yoksa NaN."""
+    result = np.full(len(close), np.nan)
+    if len(close) > horizon:
+        result[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return result
+
+
+def first_hit(high: np.ndarray, low: np.ndarray, close: np.ndarray, entries: np.ndarray,
+              target: np.ndarray, stop: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """
+    Her giriş için sonraki en fazla horizon barda hedefin mi stobun mu önce görüldüğünü bulur (uzun pozisyon).
+    Tüm girişler tek bir (giriş x ufuk) matrisinde birlikte taranır.
+
+    Aynı barda ikisi de görülürse stop sayılır (muhafazakâr varsayım). horizon=None ise serinin sonuna kadar bakılır.
+    Dönüş sözlüğü (giriş başına):
+        outcome: "target" | "stop" | "expired" (ufuk doldu) | "open" (henüz yeterli gelecek yok)
+        exit_index, exit_price, bars_held
+    """
+    n = len(close)
+    entries = np.asarray(entries, dtype=int)
+    unbounded = horizon is None
+    if unbounded:
+        horizon = max(n - 1 - (entries.min() if len(entries) else 0), 1)
+
+    offsets = np.arange(1, horizon + 1)
+    path = entries[:, None] + offsets[None, :]
+    in_range = path < n
+    path = np.minimum(path, n - 1)
+
+    hit_target = (high[path] >= target[:, None]) & in_range
+    hit_stop = (low[path] <= stop[:, None]) & in_range
+    first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), horizon)
+    first_stop = np.where(hit_stop.any(axis=1), hit_stop.argmax(axis=1), horizon)
+
+    stopped = (first_stop < horizon) & (first_stop <= first_target)
+    targeted = (first_target < horizon) & ~stopped
+    # Ufuksuz taramada süre hiç dolmaz; tetiklenmeyen girişler açık kalır
+    expired = ~stopped & ~targeted & (entries + horizon <= n - 1) & (not unbounded)
+
+    outcome = np.full(len(entries), "open", dtype=object)
+    outcome[expired] = "expired"
+    outcome[stopped] = "stop"
+    outcome[targeted] = "target"
+
+    exit_offset = np.where(stopped, first_stop, np.where(targeted, first_target, horizon - 1))
+    exit_index = entries + exit_offset + 1
+    exit_price = np.where(stopped, stop, np.where(targeted, target, close[np.minimum(exit_index, n - 1)]))
+
+    is_open = outcome == "open"
+    exit_index = np.where(is_open, -1, exit_index)
+    exit_price = np.where(is_open, np.nan, exit_price)
+    return {
+        "outcome": outcome,
+        "exit_index": exit_index,
+        "exit_price": exit_price,
+        "bars_held": np.where(is_open, -1, exit_index - entries),
+    }
+
+
+# --- Hisse grubu değerlendirme (süreç havuzunda çalışır) ---
+
+TRADE_COLUMNS = ["rule", "ticker", "date", "exit_date", "return", "outcome", "bars_held"]
+
+
+class TradeLog:
+    """İşlemleri kolon dizileri olarak biriktirir; tablo en sonda tek seferde kurulur (satır satır DataFrame yok)."""
+
+    def __init__(self):
+        self.parts: Dict[str, List[np.ndarray]] = {col: [] for col in TRADE_COLUMNS}
+
+    def add(self, rule: str, ticker: str, dates: pd.DatetimeIndex, idx: np.ndarray, exit_idx: np.ndarray,
+            returns: np.ndarray, outcome: Optional[np.ndarray] = None, bars_held: Optional[np.ndarray] = None):
+        count = len(idx)
+        if not count:
+            return
+        self.parts["rule"].append(np.full(count, rule, dtype=object))
+        self.parts["ticker"].append(np.full(count, ticker, dtype=object))
+        self.parts["date"].append(dates[idx].to_numpy())
+        self.parts["exit_date"].append(dates[exit_idx].to_numpy())
+        self.parts["return"].append(np.asarray(returns, dtype=float))
+        self.parts["outcome"].append(outcome if outcome is not None else np.full(count, None, dtype=object))
+        self.parts["bars_held"].append(np.asarray(bars_held, dtype=float) if bars_held is not None else np.full(count, np.nan))
+
+    def extend(self, other: "TradeLog"):
+        for col in TRADE_COLUMNS:
+            self.parts[col].extend(other.parts[col])
+
+    def frame(self) -> pd.DataFrame:
+        if not self.parts["rule"]:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        return pd.DataFrame({col: np.concatenate(values) for col, values in self.parts.items()}, columns=TRADE_COLUMNS)
+
+
+def _evaluate_shard(shard: Dict[str, pd.DataFrame], horizon: int, bracket_horizon: int,
+                    growth_threshold: int) -> Tuple[TradeLog, Dict[str, pd.DataFrame]]:
+    """
+    Bir hisse grubunu değerlendirir. İndikatörler grubun (bar x hisse) paneli üzerinde tek geçişte hesaplanır;
+    panel son bara hizalı olduğu için her hissenin değerleri kendi barları üzerindendir (tek tek hesapla aynı).
+    Dönüş: (işlem tabloları, ticker -> günlük growth skoru ve ileri getiri)
+    """
+    panel = build_panel(shard)
+    close_panel = panel["Close"]
+    tech_panel = technical_scores(close_panel)
+    growth = growth_score_panel(panel)
+    growth_valid = ~(growth["rsi"].isna() | growth["vol_ma"].isna() | growth["atr"].isna()).to_numpy()
+    growth_score = growth["score"].to_numpy(dtype=float)
+
+    log = TradeLog()
+    daily: Dict[str, pd.DataFrame] = {}
+    for j, (ticker, df) in enumerate(shard.items()):
+        n = len(df)
+        if n == 0:
+            continue
+        rows = slice(len(close_panel) - n, None)  # Hissenin kendi barları panelin son n satırıdır
+        high = df["High"].to_numpy(dtype=float)
+        low = df["Low"].to_numpy(dtype=float)
+        close = df["Close"].to_numpy(dtype=float)
+        dates = session_dates(df.index)
+        fwd = forward_returns(close, horizon)
+        tech = tech_panel[rows, j]
+
+        # 1. TechnicalAgent: BUY (skor >= 3) uzun, SELL (skor <= -3) kısa
+        ready = np.arange(n) >= TECHNICAL_MIN_BARS - 1
+        buy_idx = np.flatnonzero((tech >= BUY_SCORE) & ready & ~np.isnan(fwd))
+        sell_idx = np.flatnonzero((tech <= SELL_SCORE) & ready & ~np.isnan(fwd))
+        log.add("technical_buy", ticker, dates, buy_idx, buy_idx + horizon, fwd[buy_idx])
+        log.add("technical_sell", ticker, dates, sell_idx, sell_idx + horizon, -fwd[sell_idx])
+
+        # 2. QuantAgent: teknik AL sinyalinde girip fiyat -2 ATR stop / +4 ATR hedef
+        atr_values = quant_atr(high, low, close)
+        entries = np.flatnonzero((tech >= BUY_SCORE) & ready & ~np.isnan(atr_values))
+        if len(entries):
+            target = close[entries] + TARGET_ATR_MULT * atr_values[entries]
+            stop = close[entries] - STOP_ATR_MULT * atr_values[entries]
+            hits = first_hit(high, low, close, entries, target, stop, bracket_horizon)
+            closed = hits["outcome"] != "open"
+            returns = hits["exit_price"][closed] / close[entries[closed]] - 1
+            log.add("quant_bracket", ticker, dates, entries[closed], hits["exit_index"][closed], returns,
+                    outcome=hits["outcome"][closed], bars_held=hits["bars_held"][closed])
+
+        # 3. MarketScanner growth skoru (tarayıcıyla aynı fonksiyon ve aynı geçerlilik koşulları)
+        valid = growth_valid[rows, j] & (np.arange(n) >= SCANNER_MIN_BARS - 1)
+        score = np.where(valid, growth_score[rows, j], np.nan)
+        strong = np.flatnonzero((score >= growth_threshold) & ~np.isnan(fwd))
+        log.add(f"growth_score_ge{growth_threshold}", ticker, dates, strong, strong + horizon, fwd[strong])
+
+        # Kesitsel "ilk 3" seçimi ana süreçte yapılır
+        exit_dates = pd.Series(dates).shift(-horizon).to_numpy()
+        ticker_daily = pd.DataFrame({"score": score, "fwd": fwd, "exit": exit_dates}, index=dates)
+        daily[ticker] = ticker_daily[~ticker_daily.index.duplicated(keep="last")]
+
+    return log, daily
+
+
+def scanner_top_k(daily: Dict[str, pd.DataFrame], universe: List[str], top_k: int = SCANNER_TOP_K) -> TradeLog:
+    """
+    Her gün tarayıcının seçeceği ilk top_k hisseyi (skor azalan, eşitlikte evren sırası) seçer
+    ve ileri getirilerini işlem olarak döndürür.
+    """
+    log = TradeLog()
+    tickers = [t for t in universe if t in daily]
+    if not tickers:
+        return log
+    scores = pd.concat({t: daily[t]["score"] for t in tickers}, axis=1).sort_index()
+    fwd = pd.concat({t: daily[t]["fwd"] for t in tickers}, axis=1).reindex(scores.index)
+    exits = pd.concat({t: daily[t]["exit"] for t in tickers}, axis=1).reindex(scores.index)
+
+    score_values = scores.to_numpy(dtype=float)
+    fwd_values = fwd.to_numpy(dtype=float)
+    # Sıralama anahtarı: önce skor, eşitlikte listede önce gelen (skorlar tam sayı, sıra farkı < 1)
+    rank_key = np.where(np.isnan(score_values), -np.inf, score_values - np.arange(len(tickers)) / (len(tickers) + 1))
+    k = min(top_k, len(tickers))
+    picks = np.argsort(-rank_key, axis=1, kind="stable")[:, :k]
+
+    rows = np.repeat(np.arange(len(scores)), k)
+    cols = picks.ravel()
+    keep = ~np.isinf(rank_key[rows, cols]) & ~np.isnan(fwd_values[rows, cols])
+    rows, cols = rows[keep], cols[keep]
+    ticker_names = np.asarray(tickers, dtype=object)
+    # Gün bazlı seçimler tek seferde eklenir (her hisse için ayrı ayrı değil)
+    log.parts["rule"].append(np.full(len(rows), f"scanner_top{top_k}", dtype=object))
+    log.parts["ticker"].append(ticker_names[cols])
+    log.parts["date"].append(scores.index[rows].to_numpy())
+    log.parts["exit_date"].append(exits.to_numpy()[rows, cols].astype("datetime64[ns]"))
+    log.parts["return"].append(fwd_values[rows, cols])
+    log.parts["outcome"].append(np.full(len(rows), None, dtype=object))
+    log.parts["bars_held"].append(np.full(len(rows), np.nan))
+    return log
+
+
+# --- Özet metrikler ---
+
+def summarize(trades: pd.DataFrame, horizon: int = DEFAULT_HORIZON,
+              bracket_horizon: int = DEFAULT_BRACKET_HORIZON) -> Dict[str, Dict[str, Any]]:
+    """
+    Kural başına: işlem sayısı, isabet oranı (getiri > 0), ortalama / medyan getiri ve maksimum düşüş.
+
+    Düşüş, kaldıraçsız bir portföy eğrisi üzerinden hesaplanır: işlemler en fazla `horizon` bar
+    (stop/hedef kuralında `bracket_horizon`) açık kaldığı için her giriş gününe sermayenin 1/horizon'ı
+    ayrılır ve o günün işlemlerine eşit bölünür. Her işlemin getirisi çıkış gününde deftere yazılır;
+    böylece üst üste binen çok günlük işlemler tekrar tekrar bileşiklenmez.
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    if trades.empty:
+        return report
+
+    for rule, group in trades.groupby("rule", sort=True):
+        returns = group["return"].to_numpy(dtype=float)
+        slots = bracket_horizon if group["outcome"].notna().any() else horizon
+        trades_per_entry = group.groupby("date")["return"].transform("size")
+        pnl = group["return"] / (trades_per_entry * max(slots, 1))
+        daily = pnl.groupby(group["exit_date"]).sum().sort_index()
+        equity = np.cumprod(1 + daily.to_numpy())
+        peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+        drawdown = float((equity / peak - 1).min()) if len(equity) else 0.0
+
+        stats = {
+            "trades": int(len(returns)),
+            "tickers": int(group["ticker"].nunique()),
+            "hit_rate": round(float((returns > 0).mean()), 4),
+            "avg_return": round(float(returns.mean()), 4),
+            "median_return": round(float(np.median(returns)), 4),
+            "max_drawdown": round(drawdown, 4),
+        }
+        if "outcome" in group and group["outcome"].notna().any():
+            counts = group["outcome"].value_counts()
+            stats["outcomes"] = {name: int(counts.get(name, 0)) for name in ("target", "stop", "expired")}
+            stats["avg_bars_held"] = round(float(group["bars_held"].mean()), 2)
+        report[rule] = stats
+    return report
+
+
+def run_backtest(frames: Dict[str, pd.DataFrame], horizon: int = DEFAULT_HORIZON,
+                 bracket_horizon: int = DEFAULT_BRACKET_HORIZON, growth_threshold: int = DEFAULT_GROWTH_THRESHOLD,
+                 max_workers: Optional[int] = None, shard_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tüm kuralları verilen evren üzerinde çalıştırır.
+    frames: {ticker: OHLCV}; sözlük sırası tarayıcının evren sırası kabul edilir (eşitlik bozma için).
+    max_workers=1 ile süreç havuzu kullanılmaz (hata ayıklama / küçük evren).
+    Dönüş: {"rules": summarize çıktısı, "trades": tüm işlemler (DataFrame)}
+    """
+    universe = list(frames)
+    max_workers = max_workers or os.cpu_count() or 1
+    shard_size = shard_size or max(1, -(-len(universe) // (max_workers * 4)))
+    shards = [{t: frames[t] for t in universe[i:i + shard_size]} for i in range(0, len(universe), shard_size)]
+
+    log = TradeLog()
+    daily: Dict[str, pd.DataFrame] = {}
+    args = (horizon, bracket_horizon, growth_threshold)
+    if max_workers == 1 or len(shards) <= 1:
+        results = [_evaluate_shard(shard, *args) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_evaluate_shard, shards, *[[a] * len(shards) for a in args]))
+
+    for shard_log, shard_daily in results:
+        log.extend(shard_log)
+        daily.update(shard_daily)
+    log.extend(scanner_top_k(daily, universe))
+
+    trades_df = log.frame()
+    return {"rules": summarize(trades_df, horizon, bracket_horizon), "trades": trades_df}
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    print(f"{'KURAL':<20} {'İŞLEM':>7} {'İSABET':>8} {'ORT.GETİRİ':>11} {'MEDYAN':>8} {'MAX DÜŞÜŞ':>10}")
+    for rule, stats in report.items():
+        print(f"{rule:<20} {stats['trades']:>7} {stats['hit_rate']:>8.1%} {stats['avg_return']:>11.2%} "
+              f"{stats['median_return']:>8.2%} {stats['max_drawdown']:>10.1%}")
+        if "outcomes" in stats:
+            outcomes = stats["outcomes"]
+            print(f"{'':<20} hedef: {outcomes['target']}, stop: {outcomes['stop']}, süre doldu: {outcomes['expired']}, "
+                  f"ort. tutma: {stats['avg_bars_held']} bar")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TradeMind kurallarını yerel fiyat verisi üzerinde test eder (ağ kullanmaz).")
+    parser.add_argument("--data", default=DEFAULT_DATA_DIR, help="Hisse başına Parquet/CSV dosyalarının klasörü")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Sinyal getirisi ufku (bar)")
+    parser.add_argument("--bracket-horizon", type=int, default=DEFAULT_BRACKET_HORIZON, help="Stop/hedef için en fazla bekleme (bar)")
+    parser.add_argument("--growth-threshold", type=int, default=DEFAULT_GROWTH_THRESHOLD)
+    parser.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--json", default=None, help="Özet raporu bu dosyaya JSON olarak yaz")
+    parser.add_argument("--trades-csv", default=None, help="Tüm işlemleri CSV olarak yaz")
+    cli = parser.parse_args()
+
+    result = run_backtest(load_price_set(cli.data), horizon=cli.horizon, bracket_horizon=cli.bracket_horizon,
+                          growth_threshold=cli.growth_threshold, max_workers=cli.workers)
+    print_report(result["rules"])
+
+    if cli.json:
+        with open(cli.json, "w", encoding="utf-8") as f:
+            json.dump(result["rules"], f, indent=2, ensure_ascii=False)
+    if cli.trades_csv:
+        result["trades"].to_csv(cli.trades_csv, index=False)
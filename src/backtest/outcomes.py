@@ -0,0 +1,152 @@
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.data import session_dates
+from src.backtest.engine import DEFAULT_BRACKET_HORIZON, first_hit
+from src.tools.database import TradeMemory
+from src.tools.market_data import MarketDataLoader
+
+# TradeMemory'deki kayıtlı projeksiyonların (giriş / hedef / stop) gerçekte nasıl sonuçlandığını hesaplar.
+#
+# Kayıtlar hisse bazında gruplanır; her hissenin fiyat serisi bir kez yüklenir ve o hisseye ait tüm
+# analizler backtest'teki first_hit ile tek matris taramasında değerlendirilir. Sonuçlar toplu yazılır.
+# Kesinleşmiş kayıtlar (target/stop/expired/invalid) bir daha okunmaz; "open" kayıtlar yeni barlar
+# geldikçe tekrar denenir, bu yüzden değerlendirme istenildiği kadar tekrar çalıştırılabilir.
+#
+# Analiz gün içinde yapılmış olabileceği için o günün barı sayılmaz; tarama analiz gününden sonraki
+# ilk işlem gününden başlar.
+
+# Yfinance period'ları (gün cinsinden kapsama); en eski analizi kapsayan en kısa olan seçilir
+_PERIODS = (("3mo", 90), ("6mo", 180), ("1y", 365), ("2y", 730), ("5y", 1825), ("10y", 3650))
+
+
+def _covering_period(oldest: pd.Timestamp, now: Optional[pd.Timestamp] = None) -> str:
+    now = now or pd.Timestamp.now()
+    # Hafta sonu / tatil boşlukları için birkaç gün pay
+    days = (now - oldest).days + 7
+    for period, span in _PERIODS:
+        if days <= span:
+            return period
+    return "max"
+
+
+def evaluate_ticker(rows: pd.DataFrame, prices: pd.DataFrame,
+                    horizon: Optional[int] = DEFAULT_BRACKET_HORIZON) -> List[Tuple]:
+    """
+    Tek hissenin kayıtlarını fiyat serisi üzerinde değerlendirir.
+    rows: id, date, entry_price, target_price, stop_loss kolonları.
+    Dönüş: TradeMemory.save_outcomes'a gidecek (outcome, exit_date, exit_price, bars_held, realized_return, id) demetleri.
+    Fiyat verisinin başlangıcından önceki kayıtlar atlanır (sonuç yazılmaz).
+    """
+    sessions = session_dates(prices.index)
+    high = prices["High"].to_numpy(dtype=float)
+    low = prices["Low"].to_numpy(dtype=float)
+    close = prices["Close"].to_numpy(dtype=float)
+
+    analysis_days = pd.DatetimeIndex(pd.to_datetime(rows["date"], format="mixed")).normalize()
+    entries = sessions.searchsorted(analysis_days, side="right") - 1
+    known = entries >= 0
+    rows, entries = rows[known], entries[known]
+    if rows.empty:
+        return []
+
+    # Eski kayıtlarda giriş fiyatı 0/boş olabilir; o durumda analiz günündeki kapanış giriş kabul edilir
+    entry = rows["entry_price"].to_numpy(dtype=float)
+    entry = np.where(np.isfinite(entry) & (entry > 0), entry, close[entries])
+    target = rows["target_price"].to_numpy(dtype=float)
+    stop = rows["stop_loss"].to_numpy(dtype=float)
+
+    long = (stop < entry) & (entry < target)
+    short = (target < entry) & (entry < stop)
+    direction = np.where(short, -1.0, 1.0)
+
+    # Açığa satış seviyeleri fiyatlar ters çevrilerek aynı uzun pozisyon taramasıyla değerlendirilir
+    hits = {}
+    for side, mask in ((1.0, long), (-1.0, short)):
+        if not mask.any():
+            continue
+        if side > 0:
+            side_hits = first_hit(high, low, close, entries[mask], target[mask], stop[mask], horizon)
+        else:
+            side_hits = first_hit(-low, -high, -close, entries[mask], -target[mask], -stop[mask], horizon)
+            side_hits["exit_price"] = -side_hits["exit_price"]
+        hits[side] = (mask, side_hits)
+
+    count = len(rows)
+    outcome = np.full(count, "invalid", dtype=object)
+    exit_index = np.full(count, -1)
+    exit_price = np.full(count, np.nan)
+    bars_held = np.full(count, -1)
+    for mask, side_hits in hits.values():
+        outcome[mask] = side_hits["outcome"]
+        exit_index[mask] = side_hits["exit_index"]
+        exit_price[mask] = side_hits["exit_price"]
+        bars_held[mask] = side_hits["bars_held"]
+
+    realized = direction * (exit_price / entry - 1)
+    closed = exit_index >= 0
+    exit_dates = np.full(count, None, dtype=object)
+    exit_dates[closed] = prices.index[exit_index[closed]].strftime("%Y-%m-%d").to_numpy()
+
+    return [
+        (
+            outcome[i],
+            exit_dates[i],
+            float(exit_price[i]) if closed[i] else None,
+            int(bars_held[i]) if closed[i] else None,
+            float(realized[i]) if closed[i] else None,
+            int(row_id),
+        )
+        for i, row_id in enumerate(rows["id"].to_numpy())
+    ]
+
+
+def evaluate_outcomes(memory: Optional[TradeMemory] = None, loader: Optional[MarketDataLoader] = None,
+                      horizon: Optional[int] = DEFAULT_BRACKET_HORIZON) -> Dict[str, int]:
+    """
+    Sonucu kesinleşmemiş tüm kayıtları değerlendirip sonuçları veritabanına yazar.
+    horizon: Hedef/stop için en fazla bekleme (bar); dolarsa kapanıştan "expired" olarak kapanır.
+             None verilirse süre sınırı yoktur ve tetiklenmeyen kayıtlar açık kalır.
+    Dönüş: {"pending": okunan kayıt, "updated": yazılan kayıt, "tickers": ..., "missing_data": ...}
+    """
+    memory = memory or TradeMemory()
+    pending = memory.get_unevaluated()
+    stats = {"pending": len(pending), "updated": 0, "tickers": 0, "missing_data": 0}
+    if pending.empty:
+        return stats
+
+    loader = loader or MarketDataLoader()
+    pending["date"] = pd.to_datetime(pending["date"], format="mixed")
+    tickers = sorted(pending["ticker"].dropna().unique())
+    period = _covering_period(pending["date"].min())
+    prices, errors = loader.get_many(tickers, period=period, interval="1d")
+    for ticker, error in errors.items():
+        print(f"UYARI: {ticker} fiyat verisi alınamadı, sonuç değerlendirilemedi -> {error}")
+
+    updates: List[Tuple] = []
+    for ticker, rows in pending.groupby("ticker", sort=False):
+        df = prices.get(ticker)
+        if df is None or df.empty:
+            stats["missing_data"] += len(rows)
+            continue
+        updates.extend(evaluate_ticker(rows, df, horizon))
+        stats["tickers"] += 1
+
+    stats["updated"] = memory.save_outcomes(updates)
+    print(f"DEBUG: {stats['pending']} bekleyen kayıttan {stats['updated']} tanesi değerlendirildi ({stats['tickers']} hisse).")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kayıtlı analizlerin hedef/stop sonuçlarını hesaplar.")
+    parser.add_argument("--db", default="trade_history.db")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_BRACKET_HORIZON,
+                        help="Hedef/stop için en fazla bekleme (bar); 0 = sınırsız")
+    cli = parser.parse_args()
+
+    with TradeMemory(cli.db) as memory:
+        print(evaluate_outcomes(memory, horizon=cli.horizon or None))
+        print(memory.get_track_record())
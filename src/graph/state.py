@@ -1,18 +1,65 @@
-from typing import TypedDict, List, Annotated
+from typing import TypedDict, List, Annotated, Any, Optional
 import operator
 
+from src.tools.market_data import MarketDataContext
+
+
+def merge_dicts(left: dict, right: dict) -> dict:
+    """
+    Paralel çalışan node'ların aynı süper adımda state'e yazabilmesi için reducer.
+    Her ajan sadece kendi anahtarını günceller; çakışma olursa sağdaki (yeni) değer kazanır.
+    """
+    return {**(left or {}), **(right or {})}
+
+
 # Ajanların ürettiği mesajların formatı
 class AgentState(TypedDict):
     ticker: str                # Analiz edilen hisse (örn: THYAO.IS)
-    
+
     # Her ajanın raporu buraya eklenecek.
-    # operator.add kullanmamızın sebebi: Her ajan buraya kendi verisini "append" etsin, üzerine yazmasın.
-    technical_data: Annotated[dict, "Teknik Analiz Verisi"]
-    fundamental_data: Annotated[dict, "Temel Analiz Verisi"]
-    sentiment_data: Annotated[dict, "Haber/Sentiment Verisi"]
-    quant_data: Annotated[dict, "Risk ve Pozisyon Analizi"]
-    
+    # Paralel modda dört analist aynı anda çalışır; merge_dicts reducer'ı sayesinde
+    # her ajan kendi anahtarına yazar ve birbirinin verisini ezmez.
+    technical_data: Annotated[dict, merge_dicts]   # Teknik Analiz Verisi
+    fundamental_data: Annotated[dict, merge_dicts] # Temel Analiz Verisi
+    sentiment_data: Annotated[dict, merge_dicts]   # Haber/Sentiment Verisi
+    quant_data: Annotated[dict, merge_dicts]       # Risk ve Pozisyon Analizi
+
+    # Koşu başına paylaşılan piyasa verisi (MarketDataContext).
+    # Fiyat verisi bir kez çekilir; Teknik, Quant ve arayüz grafiği aynı frame'i okur.
+    market_data: Any
+
     final_report: str          # Consensus ajanının yazacağı son rapor
-    
+
+    # Node bazında LLM token kullanımı: {"sentiment_node": {"prompt_tokens": ..., "completion_tokens": ...}, ...}
+    token_usage: Annotated[dict, merge_dicts]
+
+    # Node bazında çalışma süresi (saniye): {"technical_node": 0.41, ...}
+    node_timings: Annotated[dict, merge_dicts]
+
+    # Akışlı LLM çağrılarının gecikmesi: {"consensus_node": {"ttft": 0.8, "total": 6.1, "cached": False}}
+    llm_latency: Annotated[dict, merge_dicts]
+
     # Ajanların sırasını yönetmek için (Opsiyonel ama iyi pratik)
-    next_step: str
\ No newline at end of file
+    next_step: str
+
+
+def create_initial_state(ticker: str, fundamental_data: Optional[dict] = None,
+                         market_data: Optional[MarketDataContext] = None) -> AgentState:
+    """
+    CLI ve Streamlit için ortak başlangıç state'i.
+    fundamental_data: Tarama modunda toplu (analyze_many) üretilmiş temel analiz sonucu; verilirse
+    Temel Analist node'u LLM'e tekrar gitmez.
+    market_data: Hazır bağlam (örn. paylaşılan loader veya önbellekteki fiyat verisiyle kurulmuş); yoksa yenisi açılır.
+    """
+    return {
+        "ticker": ticker,
+        "technical_data": {},
+        "fundamental_data": fundamental_data or {},
+        "sentiment_data": {},
+        "quant_data": {},
+        "market_data": market_data or MarketDataContext(ticker),
+        "final_report": "",
+        "token_usage": {},
+        "node_timings": {},
+        "llm_latency": {}
+    }
@@ -1,97 +1,238 @@
-from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, START, END
 from src.graph.state import AgentState
 
-# Senin oluşturduğun ajanları import ediyoruz
-# EĞER ANTIGRAVITY SINIF İSİMLERİNİ FARKLI YAPTIYSA BURAYI DÜZELT
-from src.agents.technical import TechnicalAgent
-from src.agents.quant import QuantAgent
-from src.agents.fundamental import FundamentalAgent
-from src.agents.sentiment import SentimentAgent
-from src.agents.consensus import ConsensusAgent
-from src.tools.market_data import MarketDataLoader
+import time
+from functools import partial, wraps
+from typing import Any, Callable, Dict, Optional
+
+# Ajanlar registry üzerinden süreç başına bir kez kurulur ve koşular arasında paylaşılır
+from src.agents.registry import AgentRegistry, get_registry
+from src.tools.market_data import MarketDataContext
+from src.tools.tokens import token_scope
+from src.tools.tracing import span
+
+def get_market_data(state: AgentState) -> MarketDataContext:
+    """State'teki paylaşılan veri bağlamını döndürür (yoksa bu node için yenisini kurar)."""
+    context = state.get("market_data")
+    if context is None:
+        context = MarketDataContext(state["ticker"])
+    return context
 
 # --- Node Fonksiyonları (Ajanları Çalıştıran Tetikleyiciler) ---
 
-def run_technical(state: AgentState):
+def run_technical(state: AgentState, agents: Optional[AgentRegistry] = None):
     print("--- TEKNİK ANALİST ÇALIŞIYOR ---")
-    ticker = state["ticker"]
     
-    # Veriyi çek
-    loader = MarketDataLoader()
-    df = loader.get_stock_price_history(ticker)
+    # Veriyi çek (koşu başına bir kez, Quant ile paylaşılır)
+    context = get_market_data(state)
+    df = context.get_price_history()
     
-    # Analiz et
-    agent = TechnicalAgent()
-    result = agent.analyze(df)
+    # Analiz et (indikatörler paylaşılan önbellekten; grafik aynı serileri okur)
+    agent = (agents or get_registry()).technical
+    result = agent.analyze(df, context.indicators)
     
     # State'i güncelle
     return {"technical_data": result}
 
-def run_quant(state: AgentState):
+def run_quant(state: AgentState, agents: Optional[AgentRegistry] = None):
     print("--- QUANT ANALİST (RİSK) ÇALIŞIYOR ---")
-    ticker = state["ticker"]
     
-    # Veriyi çek (Technical ile aynı veriyi kullanır)
-    loader = MarketDataLoader()
-    df = loader.get_stock_price_history(ticker)
+    # Veriyi çek (Technical ile aynı DataFrame nesnesini kullanır)
+    context = get_market_data(state)
+    df = context.get_price_history()
     
-    # Analiz et
-    agent = QuantAgent()
-    result = agent.analyze(df)
+    # Analiz et (ATR ve volatilite Teknik Analist'le paylaşılan artımlı indikatör durumundan)
+    agent = (agents or get_registry()).quant
+    result = agent.analyze(df, context.indicators)
     
     return {"quant_data": result}
 
-def run_fundamental(state: AgentState):
+def run_fundamental(state: AgentState, agents: Optional[AgentRegistry] = None):
     print("--- TEMEL ANALİST ÇALIŞIYOR ---")
     ticker = state["ticker"]
+
+    # Tarama modunda kısa liste toplu analiz edildiyse sonuç state'te hazır gelir
+    if state.get("fundamental_data"):
+        return {"fundamental_data": state["fundamental_data"]}
     
-    agent = FundamentalAgent()
+    agent = (agents or get_registry()).fundamental
     result = agent.analyze(ticker)
     
     return {"fundamental_data": result}
 
-def run_sentiment(state: AgentState):
+def run_sentiment(state: AgentState, agents: Optional[AgentRegistry] = None):
     print("--- SENTIMENT AJANI ÇALIŞIYOR ---")
     ticker = state["ticker"]
     
-    agent = SentimentAgent()
+    agent = (agents or get_registry()).sentiment
     result = agent.analyze(ticker)
     
     return {"sentiment_data": result}
 
-def run_consensus(state: AgentState):
+def _report_writer() -> Callable[[Any], None]:
+    # Graf "custom" modda akıtılıyorsa parçalar dinleyiciye gider; node graf dışında çağrıldıysa yok sayılır
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _: None
+
+def run_consensus(state: AgentState, agents: Optional[AgentRegistry] = None):
     print("--- KONSENSÜS (YATIRIM KOMİTESİ) TOPLANIYOR ---")
     
-    agent = ConsensusAgent()
-    # Tüm veriler zaten state'in içinde, ajana state'i veriyoruz
-    final_report = agent.synthesize(state)
-    
-    return {"final_report": final_report}
+    agent = (agents or get_registry()).consensus
+    # Tüm veriler zaten state'in içinde, ajana state'i veriyoruz.
+    # Rapor parça parça üretilir; her parça geldiği anda akış dinleyicisine (CLI / arayüz) iletilir.
+    writer = _report_writer()
+    timings: Dict[str, Any] = {}
+    chunks = []
+    try:
+        for chunk in agent.synthesize_stream(state, timings):
+            chunks.append(chunk)
+            writer({"report_chunk": chunk})
+        report = "".join(chunks)
+    except Exception as e:
+        # Akış yarıda kesildiyse gelen parçalar atılır; yarım rapor gerçek analiz gibi kaydedilmemeli
+        print(f"HATA: Konsensüs raporu akışı kesildi ({len(chunks)} parça atıldı) -> {e}")
+        report = f"Error generating report: {str(e)}"
+        timings["error"] = str(e)
+        writer({"report_chunk": f"\n\n{report}"})
+
+    return {"final_report": report, "llm_latency": {"consensus_node": timings}}
+
+def with_token_usage(node_name: str, node: Callable) -> Callable:
+    """Node'un yaptığı LLM çağrılarının token sayımlarını state'teki token_usage'a ekler."""
+    @wraps(node)
+    def wrapper(state: AgentState):
+        with token_scope() as usage:
+            update = node(state)
+        if usage["calls"]:
+            update = {**update, "token_usage": {node_name: usage}}
+        return update
+    return wrapper
+
+def with_timing(node_name: str, node: Callable) -> Callable:
+    """Node'un çalışma süresini state'teki node_timings'e ekler (akış sırasında arayüz bunu gösterir)."""
+    @wraps(node)
+    def wrapper(state: AgentState):
+        started = time.perf_counter()
+        update = node(state)
+        return {**update, "node_timings": {node_name: time.perf_counter() - started}}
+    return wrapper
+
+def with_tracing(node_name: str, node: Callable) -> Callable:
+    """Node'u "node.<ad>" span'i ile sarar (izleme kapalıyken etkisizdir); token sayımları span'e eklenir."""
+    @wraps(node)
+    def wrapper(state: AgentState):
+        with span(f"node.{node_name}", ticker=state.get("ticker")) as sp:
+            update = node(state)
+            usage = (update.get("token_usage") or {}).get(node_name)
+            if sp and usage:
+                sp.set(prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"],
+                       llm_calls=usage["calls"], cached_calls=usage.get("cached_calls", 0))
+            return update
+    return wrapper
+
+# --- Akışlı Çalıştırma ---
+
+NODE_LABELS = {
+    "technical_node": "Teknik Analist",
+    "quant_node": "Quant (Risk)",
+    "fundamental_node": "Temel Analist",
+    "sentiment_node": "Sentiment",
+    "consensus_node": "Yatırım Komitesi",
+}
+
+def describe_update(node: str, update: Dict[str, Any]) -> str:
+    """Node çıktısının tek satırlık özeti (CLI ve arayüz ilerleme satırları için)."""
+    if node == "technical_node":
+        data = update.get("technical_data") or {}
+        return f"{data.get('signal', '-')} (skor {data.get('score', '-')})"
+    if node == "quant_node":
+        data = update.get("quant_data") or {}
+        if "current_price" not in data:
+            return data.get("signal", "-")
+        return f"Fiyat {data['current_price']:.2f} · Stop {data['stop_loss']:.2f} · Hedef {data['take_profit']:.2f} · {data['signal']}"
+    if node in ("fundamental_node", "sentiment_node"):
+        key = "fundamental_data" if node == "fundamental_node" else "sentiment_data"
+        data = update.get(key) or {}
+        return str(data.get("signal", "-"))
+    if node == "consensus_node":
+        return "Rapor hazır"
+    return ""
+
+def stream_graph(app, initial_state: AgentState,
+                 on_node: Optional[Callable[[str, Dict[str, Any], float], None]] = None,
+                 on_report_chunk: Optional[Callable[[str], None]] = None) -> AgentState:
+    """
+    app.invoke yerine grafı akış modunda çalıştırır: her node bittiği anda
+    on_node(node_adı, node_çıktısı, süre_sn) çağrılır (paralel analistler bitiş sırasıyla gelir).
+    on_report_chunk(metin): Konsensüs raporunun her parçası modelden geldiği anda çağrılır.
+    Dönüş: invoke ile aynı son state.
+    """
+    final_state = initial_state
+    with span("graph.run", ticker=initial_state.get("ticker")):
+        for mode, chunk in app.stream(initial_state, stream_mode=["updates", "values", "custom"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            if mode == "custom":
+                if on_report_chunk is not None and "report_chunk" in chunk:
+                    on_report_chunk(chunk["report_chunk"])
+                continue
+            for node, update in chunk.items():
+                update = update or {}
+                if on_node is not None:
+                    on_node(node, update, update.get("node_timings", {}).get(node, 0.0))
+    return final_state
 
 # --- Graph Yapısını Kurma ---
 
-def create_graph():
+ANALYST_NODES = ["technical_node", "quant_node", "fundamental_node", "sentiment_node"]
+
+def create_graph(sequential: bool = False, *, agents: Optional[AgentRegistry] = None):
+    """
+    Analiz grafını kurar.
+
+    agents: Node'ların kullanacağı ajan örnekleri. Verilmezse süreç geneli registry kullanılır;
+    böylece graf tekrar kurulsa bile LLM istemcileri ve arama aracı yeniden oluşturulmaz.
+
+    Varsayılan (paralel) modda dört analist başlangıç noktasından aynı anda dallanır ve
+    consensus_node hepsini bekler; toplam süre en yavaş analist kadardır.
+    sequential=True ile eski sıralı akış (hata ayıklaması daha kolay) kullanılır.
+    """
     workflow = StateGraph(AgentState)
 
+    agents = agents or get_registry()
+
     # 1. Node'ları Ekle
-    workflow.add_node("technical_node", run_technical)
-    workflow.add_node("quant_node", run_quant)
-    workflow.add_node("fundamental_node", run_fundamental)
-    workflow.add_node("sentiment_node", run_sentiment)
-    workflow.add_node("consensus_node", run_consensus)
+    nodes = {
+        "technical_node": run_technical,
+        "quant_node": run_quant,
+        "fundamental_node": run_fundamental,
+        "sentiment_node": run_sentiment,
+        "consensus_node": run_consensus,
+    }
+    for name, node in nodes.items():
+        workflow.add_node(name, with_tracing(name, with_timing(name, with_token_usage(name, partial(node, agents=agents)))))
 
     # 2. Bağlantıları (Edges) Kur
-    # Başlangıç noktasını belirliyoruz.
-    # Burada PARALEL çalışma yapabiliriz ama şimdilik garanti olsun diye sıralı yapalım,
-    # Hata ayıklaması daha kolay olur.
-    # Start -> Technical -> Fundamental -> Sentiment -> Consensus -> End
-    
-    workflow.set_entry_point("technical_node")
-    
-    workflow.add_edge("technical_node", "quant_node")
-    workflow.add_edge("quant_node", "fundamental_node")
-    workflow.add_edge("fundamental_node", "sentiment_node")
-    workflow.add_edge("sentiment_node", "consensus_node")
+    if sequential:
+        # Start -> Technical -> Quant -> Fundamental -> Sentiment -> Consensus -> End
+        workflow.set_entry_point("technical_node")
+
+        workflow.add_edge("technical_node", "quant_node")
+        workflow.add_edge("quant_node", "fundamental_node")
+        workflow.add_edge("fundamental_node", "sentiment_node")
+        workflow.add_edge("sentiment_node", "consensus_node")
+    else:
+        # Start -> [Technical | Quant | Fundamental | Sentiment] -> Consensus -> End
+        for node in ANALYST_NODES:
+            workflow.add_edge(START, node)
+
+        # Liste halindeki kaynaklar: consensus ancak dördü de bitince çalışır (join)
+        workflow.add_edge(ANALYST_NODES, "consensus_node")
+
     workflow.add_edge("consensus_node", END)
 
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile()
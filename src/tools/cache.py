@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+
+class TTLCache:
+    """
+    SQLite tabanlı, süreli (TTL) anahtar-değer önbelleği.
+    Değerler JSON olarak saklanır; aynı veritabanı dosyasını farklı namespace'ler paylaşabilir.
+    Süreçler arası kalıcıdır ve thread-safe'tir (paralel node'lar aynı örneği kullanabilir).
+
+    Tahliye (eviction): ttl'den eski kayıtlar silinir; max_entries / max_bytes verilirse
+    sınır aşıldığında en eski kayıtlar silinir. Kontrol her evict_every yazmada bir yapılır.
+    """
+
+    def __init__(self, namespace: str, ttl: float, db_path: str = "data/cache.db",
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None, evict_every: int = 50):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._writes = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT,
+                    key TEXT,
+                    value TEXT,
+                    created_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_created ON cache_entries (namespace, created_at)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Süresi dolmamış değeri döndürür; yoksa None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None or (time.time() - row[1]) >= self.ttl:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Birden çok anahtarı tek sorguda okur. Sadece geçerli (süresi dolmamış) kayıtlar döner."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        placeholders = ",".join("?" for _ in keys)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value, created_at FROM cache_entries WHERE namespace = ? AND key IN ({placeholders})",
+                (self.namespace, *keys)
+            ).fetchall()
+
+            now = time.time()
+            found = {key: json.loads(value) for key, value, created_at in rows if (now - created_at) < self.ttl}
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False, default=str), time.time())
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Süresi dolan ve boyut sınırını aşan (en eski) kayıtları siler. Silinen kayıt sayısını döndürür."""
+        removed = 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND created_at <= ?",
+                (self.namespace, time.time() - self.ttl)
+            )
+            removed += cursor.rowcount
+
+            if self.max_entries is not None or self.max_bytes is not None:
+                rows = self._conn.execute(
+                    "SELECT key, LENGTH(value) FROM cache_entries WHERE namespace = ? ORDER BY created_at DESC",
+                    (self.namespace,)
+                ).fetchall()
+
+                # En yeniden eskiye doğru sınırlar içinde kalanları tut, gerisini sil
+                kept_bytes = 0
+                stale = []
+                for position, (key, size) in enumerate(rows):
+                    kept_bytes += size
+                    over_count = self.max_entries is not None and position >= self.max_entries
+                    over_size = self.max_bytes is not None and kept_bytes > self.max_bytes
+                    if over_count or over_size:
+                        stale.append((self.namespace, key))
+
+                if stale:
+                    self._conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", stale)
+                    removed += len(stale)
+
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._conn.commit()
+
+    def clear(self):
+        """Bu namespace'teki tüm kayıtları siler."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
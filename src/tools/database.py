@@ -1,59 +1,377 @@
+import hashlib
 import sqlite3
+import threading
+import zlib
 import pandas as pd
 from datetime import datetime
 
+try:
+    import zstandard
+except ImportError:  # zstandard yoksa zlib ile devam edilir (okurken her kaydın kendi codec'i kullanılır)
+    zstandard = None
+
+# Sonradan eklenen sonuç kolonları (eski veritabanlarına ALTER TABLE ile eklenir)
+OUTCOME_COLUMNS = {
+    "outcome": "TEXT",              # target | stop | expired | open | invalid
+    "exit_date": "TIMESTAMP",
+    "exit_price": "REAL",
+    "bars_held": "INTEGER",
+    "realized_return": "REAL",
+    "evaluated_at": "TIMESTAMP",
+}
+# Bu sonuçlar kesinleşmiştir; "open" kayıtlar yeni barlarla tekrar değerlendirilir
+FINAL_OUTCOMES = ("target", "stop", "expired", "invalid")
+
+# save_many'nin beklediği kayıt alanları -> analyses kolonları (rapor metni ayrı tabloya gider)
+RECORD_FIELDS = {
+    "date": "date",
+    "ticker": "ticker",
+    "signal": "signal",
+    "entry": "entry_price",
+    "target": "target_price",
+    "stop": "stop_loss",
+    "risk": "risk_level",
+}
+ZSTD_LEVEL = 10
+
+# Geçmiş listesinin varsayılan projeksiyonu (rapor gövdesi ve iç kolonlar yok)
+HISTORY_COLUMNS = (
+    "id", "date", "ticker", "signal", "entry_price", "target_price", "stop_loss", "risk_level",
+    "outcome", "bars_held", "realized_return",
+)
+CLOSED_OUTCOMES = ("target", "stop", "expired")
+
+
+# --- Rapor Sıkıştırma ---
+# Rapor metinleri içerik hash'i ile adreslenir: aynı rapor kaç analizde geçerse geçsin bir kez saklanır.
+
+def report_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_report(text):
+    """Dönüş: (codec, sıkıştırılmış bayt)."""
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def _report_row(digest, text):
+    codec, data = compress_report(text)
+    return digest, codec, len(text), data
+
+
+def decompress_report(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Rapor zstd ile sıkıştırılmış ama zstandard paketi kurulu değil.")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Bilinmeyen rapor codec'i: {codec}")
+
+
+# --- Şema Migration'ları ---
+# Veritabanının şema sürümü PRAGMA user_version'da tutulur. Her migration bir sürüm ilerletir ve
+# kendi transaction'ında çalışır; yeni kolon/tablo için listeye yeni fonksiyon eklemek yeterlidir
+# (mevcut veritabanını silmek gerekmez). Sürüm numarası olmayan eski dosyalar 0'dan başlar,
+# bu yüzden adımlar tekrar çalıştırılmaya dayanıklı yazılır (IF NOT EXISTS / kolon kontrolü).
+
+def _add_columns(cursor, table, columns):
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for column, column_type in columns.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _create_analyses(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TIMESTAMP,
+            ticker TEXT,
+            signal TEXT,
+            entry_price REAL,
+            target_price REAL,
+            stop_loss REAL,
+            risk_level TEXT,
+            full_report TEXT
+        )
+    ''')
+
+
+def _add_outcome_columns(cursor):
+    _add_columns(cursor, "analyses", OUTCOME_COLUMNS)
+
+
+def _add_indexes(cursor):
+    # Geçmiş ekranı tarihe göre sıralar, filtreler ticker/sinyal üzerinden; değerlendirici sonucu boş olanları arar
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_date ON analyses (date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_ticker_date ON analyses (ticker, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_signal ON analyses (signal)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_outcome ON analyses (outcome)")
+
+
+def _move_reports(cursor):
+    # Rapor metinleri satır içinden sıkıştırılmış, hash adresli reports tablosuna taşınır.
+    # full_report kolonu eski sürümlerle uyumluluk için kalır ama artık hep boştur.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reports (
+            hash TEXT PRIMARY KEY,
+            codec TEXT,
+            size INTEGER,
+            data BLOB
+        )
+    ''')
+    _add_columns(cursor, "analyses", {"report_hash": "TEXT"})
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_report ON analyses (report_hash)")
+
+    rows = cursor.execute("SELECT id, full_report FROM analyses WHERE full_report IS NOT NULL").fetchall()
+    reports, links = {}, []
+    for analysis_id, text in rows:
+        text = str(text)
+        digest = report_hash(text)
+        if digest not in reports:
+            reports[digest] = _report_row(digest, text)
+        links.append((digest, analysis_id))
+    cursor.executemany("INSERT OR IGNORE INTO reports (hash, codec, size, data) VALUES (?, ?, ?, ?)", reports.values())
+    cursor.executemany("UPDATE analyses SET report_hash = ?, full_report = NULL WHERE id = ?", links)
+
+
+MIGRATIONS = [
+    _create_analyses,       # 1
+    _add_outcome_columns,   # 2
+    _add_indexes,           # 3
+    _move_reports,          # 4
+]
+
+
 class TradeMemory:
+    """
+    Analiz geçmişini tutan SQLite deposu.
+
+    Tek bir uzun ömürlü bağlantı kullanılır (WAL modunda; okuyucular yazarı beklemez) ve tüm erişim
+    bir kilit altında yapılır, böylece aynı örnek paralel thread'lerden güvenle paylaşılabilir.
+    Rapor metinleri ayrı, sıkıştırılmış tabloda durur; sadece get_report ile açılır.
+    """
+
     def __init__(self, db_name="trade_history.db"):
         self.db_name = db_name
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_name, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # WAL'da güvenli, her commit'te fsync yok
         self.init_db()
 
     def init_db(self):
-        """Initializes the database and creates the table if it doesn't exist."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # Added full_report column
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analyses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TIMESTAMP,
-                ticker TEXT,
-                signal TEXT,
-                entry_price REAL,
-                target_price REAL,
-                stop_loss REAL,
-                risk_level TEXT,
-                full_report TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Şemayı son sürüme getirir (bekleyen migration'ları sırayla uygular)."""
+        with self._lock:
+            version = self.schema_version
+            for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                cursor = self._conn.cursor()
+                cursor.execute("BEGIN")
+                try:
+                    migration(cursor)
+                    cursor.execute(f"PRAGMA user_version = {target}")
+                    self._conn.commit()
+                except Exception:
+                    self._conn.rollback()
+                    raise
+
+            if version < MIGRATIONS.index(_move_reports) + 1 and self.schema_version > version:
+                # Satır içi raporlar taşındıktan sonra boşalan sayfaları diske geri ver
+                self.compact()
+
+            # Projeksiyonlar bu listeye göre doğrulanır; liste sorguları rapor gövdesini hiç okumaz
+            self._columns = [row[1] for row in self._conn.execute("PRAGMA table_info(analyses)")]
+
+    @property
+    def schema_version(self):
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def compact(self):
+        """VACUUM + WAL checkpoint: silinen/taşınan verinin kapladığı alanı dosyadan geri kazanır."""
+        with self._lock:
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def save_analysis(self, ticker, signal, entry, target, stop, risk, full_report):
         """Saves a new analysis record to the database."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        timestamp = datetime.now()
-        
-        cursor.execute('''
-            INSERT INTO analyses (date, ticker, signal, entry_price, target_price, stop_loss, risk_level, full_report)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (timestamp, ticker, signal, entry, target, stop, risk, full_report))
-        
-        conn.commit()
-        conn.close()
+        self.save_many([{
+            "ticker": ticker, "signal": signal, "entry": entry, "target": target,
+            "stop": stop, "risk": risk, "full_report": full_report,
+        }])
+
+    def save_many(self, records):
+        """
+        Birden çok analizi tek transaction'da (executemany) kaydeder.
+        records: save_analysis argümanlarıyla aynı anahtarlara sahip sözlükler; "date" verilmezse şimdiki zaman.
+        Rapor metni daha önce kaydedilmişse tekrar sıkıştırılıp yazılmaz, mevcut kayda bağlanır.
+        Dönüş: yazılan kayıt sayısı.
+        """
+        timestamp = datetime.now().isoformat(" ")
+        rows, texts = [], {}
+        for record in records:
+            text = record.get("full_report")
+            digest = None
+            if text is not None:
+                text = str(text)
+                digest = report_hash(text)
+                texts[digest] = text
+            rows.append((*(record.get(field, timestamp if field == "date" else None) for field in RECORD_FIELDS), digest))
+        if not rows:
+            return 0
+
+        columns = ", ".join([*RECORD_FIELDS.values(), "report_hash"])
+        placeholders = ", ".join("?" for _ in range(len(RECORD_FIELDS) + 1))
+        with self._lock, self._conn:
+            new_hashes = set(texts) - self._existing_reports(texts)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reports (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                [_report_row(digest, texts[digest]) for digest in new_hashes]
+            )
+            self._conn.executemany(f"INSERT INTO analyses ({columns}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def _existing_reports(self, hashes):
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        placeholders = ", ".join("?" for _ in hashes)
+        rows = self._conn.execute(f"SELECT hash FROM reports WHERE hash IN ({placeholders})", hashes).fetchall()
+        return {row[0] for row in rows}
+
+    def get_report(self, analysis_id):
+        """Analizin rapor metnini açarak döndürür (rapor yoksa None)."""
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT r.codec, r.data, a.full_report
+                FROM analyses a LEFT JOIN reports r ON r.hash = a.report_hash
+                WHERE a.id = ?
+            ''', (int(analysis_id),)).fetchone()
+        if row is None:
+            return None
+        codec, data, legacy_text = row
+        if data is None:
+            return legacy_text
+        return decompress_report(codec, data)
 
     def get_history(self):
-        """Returns the entire trade history as a pandas DataFrame, sorted by date descending."""
-        conn = sqlite3.connect(self.db_name)
-        
-        query = "SELECT * FROM analyses ORDER BY date DESC"
-        df = pd.read_sql_query(query, conn)
-        
-        conn.close()
-        return df
+        """Returns the entire trade history (without report bodies) as a pandas DataFrame, sorted by date descending."""
+        columns = ", ".join(c for c in self._columns if c != "full_report")
+        query = f"SELECT {columns} FROM analyses ORDER BY date DESC"
+        with self._lock:
+            return pd.read_sql_query(query, self._conn)
+
+    def query_history(self, columns=HISTORY_COLUMNS, ticker=None, start=None, end=None, signal=None,
+                      limit=50, offset=0):
+        """
+        Geçmişin bir sayfasını döndürür (en yeni önce). Filtreleme, sıralama ve sayfalama SQLite'ta yapılır;
+        sadece istenen kolonlar okunur.
+        ticker: Tam eşleşme. start / end: Tarih (dahil, gün bazında). signal: Tek değer veya liste.
+        """
+        unknown = [c for c in columns if c not in self._columns or c == "full_report"]
+        if unknown:
+            raise ValueError(f"Geçersiz kolon(lar): {unknown}")
+
+        where, params = self._history_filter(ticker, start, end, signal)
+        query = f"SELECT {', '.join(columns)} FROM analyses{where} ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=[*params, int(limit), int(offset)])
+
+    def count_history(self, ticker=None, start=None, end=None, signal=None):
+        """query_history ile aynı filtrelere uyan kayıt sayısı (sayfa sayısı için)."""
+        where, params = self._history_filter(ticker, start, end, signal)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def get_track_record(self, ticker=None, start=None, end=None, signal=None):
+        """Filtreye uyan kapanmış sinyallerin özeti (tek aggregate sorgusu)."""
+        where, params = self._history_filter(ticker, start, end, signal)
+        placeholders = ", ".join("?" for _ in CLOSED_OUTCOMES)
+        with self._lock:
+            closed, hits, avg_return, still_open = self._conn.execute(f'''
+                SELECT
+                    SUM(outcome IN ({placeholders})),
+                    SUM(outcome = 'target'),
+                    AVG(CASE WHEN outcome IN ({placeholders}) THEN realized_return END),
+                    SUM(outcome = 'open')
+                FROM analyses{where}
+            ''', [*CLOSED_OUTCOMES, *CLOSED_OUTCOMES, *params]).fetchone()
+        closed = closed or 0
+        return {
+            "closed": closed,
+            "open": still_open or 0,
+            "hit_rate": hits / closed if closed else float("nan"),
+            "avg_return": avg_return if closed else float("nan"),
+        }
+
+    def get_distinct(self, column):
+        """Filtre seçenekleri için bir kolonun farklı değerleri (ticker / signal indeksten okunur)."""
+        if column not in ("ticker", "signal", "outcome", "risk_level"):
+            raise ValueError(f"Geçersiz kolon: {column}")
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {column} FROM analyses WHERE {column} IS NOT NULL ORDER BY {column}").fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _history_filter(ticker, start, end, signal):
+        clauses, params = [], []
+        if ticker:
+            clauses.append("ticker = ?")
+            params.append(ticker)
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            # Bitiş günü dahil: ertesi günün başından küçük
+            clauses.append("date < ?")
+            params.append((pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).strftime("%Y-%m-%d"))
+        if signal:
+            signals = [signal] if isinstance(signal, str) else list(signal)
+            clauses.append(f"signal IN ({', '.join('?' for _ in signals)})")
+            params.extend(signals)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def get_unevaluated(self):
+        """Sonucu henüz kesinleşmemiş (hiç değerlendirilmemiş veya 'open') kayıtları döndürür."""
+        placeholders = ", ".join("?" for _ in FINAL_OUTCOMES)
+        query = f'''
+            SELECT id, date, ticker, entry_price, target_price, stop_loss
+            FROM analyses
+            WHERE outcome IS NULL OR outcome NOT IN ({placeholders})
+        '''
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=FINAL_OUTCOMES)
+
+    def save_outcomes(self, rows):
+        """
+        Değerlendirme sonuçlarını tek transaction'da yazar.
+        rows: (outcome, exit_date, exit_price, bars_held, realized_return, id) demetleri.
+        """
+        if not rows:
+            return 0
+
+        evaluated_at = datetime.now().isoformat(" ")
+        with self._lock, self._conn:
+            self._conn.executemany('''
+                UPDATE analyses
+                SET outcome = ?, exit_date = ?, exit_price = ?, bars_held = ?, realized_return = ?, evaluated_at = ?
+                WHERE id = ?
+            ''', [(*row[:5], evaluated_at, row[5]) for row in rows])
+        return len(rows)
 
 if __name__ == "__main__":
     # Test Block
@@ -0,0 +1,451 @@
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.tools.cache import TTLCache
+
+# Artımlı (bar başına O(1)) indikatör durumu.
+# Bir hissenin tüm geçmişi bir kez işlenir; sonrasında her yeni bar sadece durumu günceller.
+# Aynı zaman damgalı bar tekrar gelirse (gün içi güncellenen son bar) önceki bar geri alınıp yenisi uygulanır.
+# Geçmiş yeniden düzeltilmişse (temettü/bölünme; örtüşen kapanmış barın fiyatı değişir) durum baştan kurulur.
+# Sonuçlar toplu hesaplamayla (pandas_ta.rsi / sma / atr ve QuantAgent'ın rolling hesapları) sayısal hata
+# payı içinde aynıdır. Tek fark: pandas_ta.atr serinin HERHANGİ bir yerinde H-L=0 varsa tüm barlara epsilon
+# (~2e-16) ekler; artımlı durum bunu gelecek barları bilemeyeceği için yapmaz.
+
+# Durumlar süreçler arasında bu süre kadar saklanır (saniye)
+INDICATOR_STATE_TTL = 7 * 24 * 3600
+# Örtüşen kapanmış barın kapanışında bu göreli farkın üstü düzeltme sayılır (MarketDataLoader._is_adjusted ile aynı)
+ADJUSTMENT_TOLERANCE = 1e-4
+_NAN = float("nan")
+
+
+def _ewm_step(weighted: float, value: float, alpha: float) -> float:
+    # pandas ewm(adjust=False) ile aynı işlem sırası (bit düzeyinde aynı sonuç için)
+    if weighted != value:
+        old_wt = 1.0 - alpha
+        weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+    return weighted
+
+
+class RollingWindow:
+    """
+    Sabit uzunluklu pencere üzerinde toplam ve kareler toplamı (SMA ve standart sapma için).
+    Kayan toplamda biriken yuvarlama hatası, her 'length' güncellemede pencereden yeniden toplanarak sıfırlanır.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.values: deque = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._since_resync = 0
+        self._evicted: Optional[float] = None
+
+    def push(self, value: float):
+        self._evicted = None
+        if len(self.values) == self.length:
+            self._evicted = self.values.popleft()
+            self.total -= self._evicted
+            self.total_sq -= self._evicted * self._evicted
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        self._since_resync += 1
+        if self._since_resync >= self.length:
+            self._resync()
+
+    def pop(self):
+        """Son push'u geri alır (sadece bir adım)."""
+        value = self.values.pop()
+        self.total -= value
+        self.total_sq -= value * value
+        if self._evicted is not None:
+            self.values.appendleft(self._evicted)
+            self.total += self._evicted
+            self.total_sq += self._evicted * self._evicted
+            self._evicted = None
+
+    def _resync(self):
+        self.total = math.fsum(self.values)
+        self.total_sq = math.fsum(v * v for v in self.values)
+        self._since_resync = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.length
+
+    def mean(self) -> float:
+        return self.total / self.length if self.full else _NAN
+
+    def std(self) -> float:
+        """Penceredeki değerlerin örnek standart sapması (ddof=1). Pencere dolmadıysa eldeki tüm değerler."""
+        n = len(self.values)
+        if n < 2:
+            return _NAN
+        mean = self.total / n
+        variance = max(self.total_sq / n - mean * mean, 0.0) * n / (n - 1)
+        return math.sqrt(variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"length": self.length, "values": list(self.values), "evicted": self._evicted}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingWindow":
+        window = cls(data["length"])
+        window.values = deque(data["values"])
+        window._evicted = data.get("evicted")
+        window._resync()
+        return window
+
+
+class IndicatorState:
+    """
+    Tek bir hissenin artımlı indikatör durumu.
+
+    Üretilen değerler (values()):
+        RSI        -> pandas_ta.rsi(close, rsi_length) son değeri (Wilder / rma)
+        SMA_<n>    -> pandas_ta.sma(close, n) son değeri
+        ATR        -> pandas_ta.atr(high, low, close, atr_length) son değeri (rma, ilk ortalama ile tohumlanır)
+        ATR_SMA    -> QuantAgent'ın ATR'si: True Range'in atr_length barlık basit ortalaması
+        VOLATILITY -> Günlük getirilerin vol_length barlık standart sapması (yetersiz veride tüm getiriler)
+    """
+
+    def __init__(self, rsi_length: int = 14, sma_lengths: Tuple[int, ...] = (50, 200),
+                 atr_length: int = 14, vol_length: int = 20):
+        self.rsi_length = rsi_length
+        self.sma_lengths = tuple(sma_lengths)
+        self.atr_length = atr_length
+        self.vol_length = vol_length
+
+        self.bars = 0
+        self.last_ts: Optional[pd.Timestamp] = None
+        self.prev_ts: Optional[pd.Timestamp] = None   # Son barın bir öncesi (kapanışı prev_close)
+        self.close = _NAN
+        self.prev_close = _NAN
+        self.last_hlc: Tuple[float, float, float] = (_NAN, _NAN, _NAN)
+
+        self.avg_gain = _NAN
+        self.avg_loss = _NAN
+        self.atr_rma = _NAN
+        self.atr_seed: list = []   # ATR tohumu için ilk atr_length TR değeri
+
+        self.sma = {n: RollingWindow(n) for n in self.sma_lengths}
+        self.tr_window = RollingWindow(atr_length)
+        self.returns = RollingWindow(vol_length)
+
+        self._undo: Optional[Dict[str, Any]] = None
+
+    # --- Güncelleme ---
+
+    def update(self, ts: pd.Timestamp, high: float, low: float, close: float) -> Dict[str, float]:
+        """
+        Yeni bir bar uygular. ts son barla aynıysa son bar yerine geçer (gün içi güncelleme).
+        Son bardan eski bar gelirse ValueError (geçmiş değişti, durum baştan kurulmalı).
+        """
+        ts = pd.Timestamp(ts)
+        if self.last_ts is not None:
+            if ts == self.last_ts:
+                return self.replace_last(high, low, close)
+            if ts < self.last_ts:
+                raise ValueError(f"Bar sırası bozuk: {ts} < {self.last_ts}")
+
+        self._apply(float(high), float(low), float(close))
+        self.prev_ts, self.last_ts = self.last_ts, ts
+        return self.values()
+
+    def replace_last(self, high: float, low: float, close: float) -> Dict[str, float]:
+        """Son barı geri alıp yerine yenisini uygular (O(1))."""
+        if self._undo is None:
+            raise ValueError("Geri alınacak bar yok")
+        undo = self._undo
+        self.bars -= 1
+        self.close = undo["close"]
+        self.prev_close = undo["prev_close"]
+        self.avg_gain = undo["avg_gain"]
+        self.avg_loss = undo["avg_loss"]
+        self.atr_rma = undo["atr_rma"]
+        if undo["seeded"]:
+            self.atr_seed.pop()
+        for window in self.sma.values():
+            window.pop()
+        self.tr_window.pop()
+        if undo["has_return"]:
+            self.returns.pop()
+
+        self._apply(float(high), float(low), float(close))
+        return self.values()
+
+    def _apply(self, high: float, low: float, close: float):
+        prev_close = self.close
+        self._undo = {
+            "close": self.close,
+            "prev_close": self.prev_close,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "atr_rma": self.atr_rma,
+            "seeded": False,
+            "has_return": False,
+        }
+
+        # RSI: ilk farktan itibaren alpha=1/length EMA (pandas_ta rma)
+        if not math.isnan(prev_close):
+            delta = close - prev_close
+            gain, loss = max(delta, 0.0), min(delta, 0.0)
+            alpha = 1.0 / self.rsi_length
+            if math.isnan(self.avg_gain):
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain = _ewm_step(self.avg_gain, gain, alpha)
+                self.avg_loss = _ewm_step(self.avg_loss, loss, alpha)
+
+            # Günlük getiri (pct_change)
+            self.returns.push(delta / prev_close)
+            self._undo["has_return"] = True
+
+        # True Range (ilk barda sadece H-L)
+        tr = high - low
+        if not math.isnan(prev_close):
+            tr = max(abs(tr), abs(high - prev_close), abs(prev_close - low))
+        self.tr_window.push(tr)
+
+        # ATR (rma): ilk atr_length TR'nin ortalaması tohum, sonrası Wilder
+        if len(self.atr_seed) < self.atr_length:
+            self.atr_seed.append(tr)
+            self._undo["seeded"] = True
+            if len(self.atr_seed) == self.atr_length:
+                self.atr_rma = sum(self.atr_seed) / self.atr_length
+        else:
+            self.atr_rma = _ewm_step(self.atr_rma, tr, 1.0 / self.atr_length)
+
+        for window in self.sma.values():
+            window.push(close)
+
+        self.prev_close = prev_close
+        self.close = close
+        self.last_hlc = (high, low, close)
+        self.bars += 1
+
+    # --- Okuma ---
+
+    def values(self) -> Dict[str, float]:
+        rsi = _NAN
+        # pandas_ta length+1'den kısa serilerde sonuç üretmez
+        if self.bars >= self.rsi_length + 1:
+            denominator = self.avg_gain + abs(self.avg_loss)
+            rsi = 100 * self.avg_gain / denominator if denominator else _NAN
+
+        result = {"Close": self.close, "RSI": rsi}
+        for n, window in self.sma.items():
+            result[f"SMA_{n}"] = window.mean()
+        result["ATR"] = self.atr_rma if self.bars >= self.atr_length + 1 else _NAN
+        result["ATR_SMA"] = self.tr_window.mean()
+        result["VOLATILITY"] = self.returns.std()
+        return result
+
+    # --- Toplu kurulum ve senkronizasyon ---
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **params) -> "IndicatorState":
+        state = cls(**params)
+        state.sync(df)
+        return state
+
+    def sync(self, df: pd.DataFrame) -> Dict[str, float]:
+        """
+        Frame'de son işlenen bardan sonraki barları uygular (aynı zaman damgalı son bar güncellenir).
+        Durumun son barı frame'de yoksa veya geçmiş yeniden düzeltilmişse ValueError; durum baştan kurulmalıdır.
+        """
+        if df.empty:
+            return self.values()
+
+        if self.last_ts is None:
+            new = df
+        else:
+            if self.last_ts not in df.index:
+                raise ValueError(f"Durumun son barı ({self.last_ts}) veride yok")
+            if self.is_adjusted(df):
+                raise ValueError(f"Geçmiş yeniden düzeltilmiş ({self.prev_ts} barı değişti)")
+            new = df[df.index >= self.last_ts]
+
+        highs = new["High"].to_numpy(dtype=float)
+        lows = new["Low"].to_numpy(dtype=float)
+        closes = new["Close"].to_numpy(dtype=float)
+        for ts, high, low, close in zip(new.index, highs, lows, closes):
+            if ts == self.last_ts and (high, low, close) == self.last_hlc:
+                continue  # Değişmemiş son bar
+            self.update(ts, high, low, close)
+        return self.values()
+
+    def is_adjusted(self, df: pd.DataFrame) -> bool:
+        """
+        Örtüşen kapanmış barın (son barın bir öncesi) kapanışı frame'de farklıysa geçmiş yeniden düzeltilmiştir
+        (MarketDataLoader._is_adjusted ile aynı kontrol). Pencerelerdeki eski fiyatlar artık geçersizdir.
+        Son bar karşılaştırılmaz: gün içinde değişmesi normaldir ve replace_last ile güncellenir.
+        """
+        if self.prev_ts is None:
+            return False
+        if self.prev_ts not in df.index:
+            return True
+        new_close = float(df.at[self.prev_ts, "Close"])
+        return abs(new_close - self.prev_close) > ADJUSTMENT_TOLERANCE * abs(self.prev_close)
+
+    # --- Kalıcılık ---
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            "rsi_length": self.rsi_length,
+            "sma_lengths": list(self.sma_lengths),
+            "atr_length": self.atr_length,
+            "vol_length": self.vol_length,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "params": self.params,
+            "bars": self.bars,
+            "last_ts": None if self.last_ts is None else self.last_ts.isoformat(),
+            "prev_ts": None if self.prev_ts is None else self.prev_ts.isoformat(),
+            "close": self.close,
+            "prev_close": self.prev_close,
+            "last_hlc": list(self.last_hlc),
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "atr_rma": self.atr_rma,
+            "atr_seed": list(self.atr_seed),
+            "sma": {str(n): window.to_dict() for n, window in self.sma.items()},
+            "tr_window": self.tr_window.to_dict(),
+            "returns": self.returns.to_dict(),
+            "undo": self._undo,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        params = data["params"]
+        state = cls(rsi_length=params["rsi_length"], sma_lengths=tuple(params["sma_lengths"]),
+                    atr_length=params["atr_length"], vol_length=params["vol_length"])
+        state.bars = data["bars"]
+        state.last_ts = None if data["last_ts"] is None else pd.Timestamp(data["last_ts"])
+        state.prev_ts = None if data.get("prev_ts") is None else pd.Timestamp(data["prev_ts"])
+        state.close = _float(data["close"])
+        state.prev_close = _float(data["prev_close"])
+        state.last_hlc = tuple(_float(v) for v in data["last_hlc"])
+        state.avg_gain = _float(data["avg_gain"])
+        state.avg_loss = _float(data["avg_loss"])
+        state.atr_rma = _float(data["atr_rma"])
+        state.atr_seed = [_float(v) for v in data["atr_seed"]]
+        state.sma = {int(n): RollingWindow.from_dict(window) for n, window in data["sma"].items()}
+        state.tr_window = RollingWindow.from_dict(data["tr_window"])
+        state.returns = RollingWindow.from_dict(data["returns"])
+        undo = data.get("undo")
+        state._undo = None if undo is None else {k: _float(v) if k not in ("seeded", "has_return") else v
+                                                  for k, v in undo.items()}
+        return state
+
+
+def _float(value: Any) -> float:
+    # JSON NaN'ı None olarak saklar
+    return _NAN if value is None else float(value)
+
+
+def _state_payload(state: IndicatorState) -> Dict[str, Any]:
+    # json.dumps NaN'ı geçersiz JSON olarak yazar; None'a çeviriyoruz
+    def clean(value):
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        return value
+    return clean(state.to_dict())
+
+
+class IndicatorEngine:
+    """
+    Hisse başına IndicatorState'leri tutan ve süreçler arasında saklayan katman.
+
+    evaluate(ticker, df): Durum bellekte veya önbellekte varsa sadece yeni barlar uygulanır;
+    yoksa (veya geçmiş değiştiyse) frame'den bir kez baştan kurulur. İzleme listesi veya gün içi
+    tekrar değerlendirmede her hisse için maliyet yeni bar sayısı kadardır.
+    Aynı hisse paralel node'lardan (Teknik, Quant) değerlendirilebilir; hisse başına kilitle sırayla işlenir.
+    """
+
+    def __init__(self, interval: str = "1d", cache: Optional[TTLCache] = None, persist: bool = True, **params):
+        self.interval = interval
+        self.params = params
+        self.cache = (cache or TTLCache("indicator_state", ttl=INDICATOR_STATE_TTL)) if persist else None
+        self.states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+
+    def _key(self, ticker: str) -> str:
+        return f"{ticker}|{self.interval}"
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def get_state(self, ticker: str) -> Optional[IndicatorState]:
+        with self._lock:
+            state = self.states.get(ticker)
+        if state is None and self.cache is not None:
+            data = self.cache.get(self._key(ticker))
+            if data is not None:
+                state = IndicatorState.from_dict(data)
+                if state.params != IndicatorState(**self.params).params:
+                    state = None  # Parametreler değişmiş, kullanılamaz
+        return state
+
+    def evaluate(self, ticker: str, df: pd.DataFrame) -> Dict[str, float]:
+        with self._ticker_lock(ticker):
+            state = self.get_state(ticker)
+            before = None
+            if state is not None:
+                before = (state.bars, state.last_ts, state.last_hlc)
+                try:
+                    values = state.sync(df)
+                except ValueError as e:
+                    print(f"DEBUG: {ticker} indikatör durumu baştan kuruluyor -> {e}")
+                    state = before = None
+
+            if state is None:
+                state = IndicatorState.from_frame(df, **self.params)
+                values = state.values()
+
+            with self._lock:
+                self.states[ticker] = state
+            # Yeni bar yoksa (aynı koşuda ikinci okuma) önbelleğe tekrar yazılmaz
+            if self.cache is not None and before != (state.bars, state.last_ts, state.last_hlc):
+                self.cache.set(self._key(ticker), _state_payload(state))
+            return values
+
+    def update(self, ticker: str, ts: pd.Timestamp, high: float, low: float, close: float) -> Dict[str, float]:
+        """Tek bir yeni (veya güncellenen son) barı uygular. Hissenin durumu önceden kurulmuş olmalıdır."""
+        with self._ticker_lock(ticker):
+            state = self.get_state(ticker)
+            if state is None:
+                raise KeyError(f"{ticker} için indikatör durumu yok; önce evaluate() ile kurun")
+            values = state.update(ts, high, low, close)
+            with self._lock:
+                self.states[ticker] = state
+            if self.cache is not None:
+                self.cache.set(self._key(ticker), _state_payload(state))
+            return values
+
+
+_default_engines: Dict[str, IndicatorEngine] = {}
+_default_engines_lock = threading.Lock()
+
+
+def get_indicator_engine(interval: str = "1d") -> IndicatorEngine:
+    """Teknik Analist ve Quant'ın paylaştığı süreç geneli (varsayılan parametreli) IndicatorEngine."""
+    with _default_engines_lock:
+        engine = _default_engines.get(interval)
+        if engine is None:
+            engine = _default_engines[interval] = IndicatorEngine(interval)
+        return engine
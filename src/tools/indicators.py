@@ -0,0 +1,309 @@
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Union
+
+from src.tools.indicator_state import IndicatorState, get_indicator_engine
+
+# pandas_ta (talib olmadan) ile birebir aynı sonuçları veren indikatörler.
+# Hepsi hem tek bir Series (tek hisse) hem de DataFrame (bar x hisse paneli) üzerinde çalışır;
+# panelde her kolon bağımsız hesaplanır, böylece tüm evren tek geçişte skorlanabilir.
+
+Frame = Union[pd.Series, pd.DataFrame]
+
+# Bu kolon sayısından itibaren rma, pandas'ın kolon kolon ewm'i yerine satır bazlı numpy çekirdeğini kullanır
+# (iki yol bit düzeyinde aynı sonucu verir; az kolonda pandas, çok kolonda numpy daha hızlıdır)
+_NUMPY_EWM_MIN_COLUMNS = 256
+
+
+def rma(x: Frame, length: int) -> Frame:
+    """Wilder ortalaması (pandas_ta.rma): alpha = 1/length olan EMA."""
+    if isinstance(x, pd.Series) or x.shape[1] < _NUMPY_EWM_MIN_COLUMNS:
+        return x.ewm(alpha=1.0 / length, adjust=False).mean()
+    # pandas DataFrame.ewm kolonları tek tek dolaşır; binlerce hissede satır bazlı numpy döngüsü çok daha hızlı
+    values = _ewm_mean(x.to_numpy(dtype=float), 1.0 / length)
+    return pd.DataFrame(values, index=x.index, columns=x.columns)
+
+
+def _ewm_mean(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    pandas ewm(alpha, adjust=False).mean() çekirdeğinin kolon-vektörel karşılığı.
+    Aynı işlemleri aynı sırayla yaptığı için sonuçlar bit düzeyinde aynıdır:
+    baştaki NaN'lar atlanır, aradaki NaN'larda eski ağırlık sönümlenir.
+    """
+    out = np.empty_like(values)
+    if values.shape[0] == 0:
+        return out
+
+    new_wt = alpha
+    old_wt_factor = 1.0 - alpha
+    weighted = values[0].copy()
+    old_wt = np.ones(values.shape[1])
+    out[0] = weighted
+
+    for i in range(1, values.shape[0]):
+        cur = values[i]
+        is_observation = ~np.isnan(cur)
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * old_wt_factor, old_wt)
+        update = started & is_observation & (weighted != cur)
+        blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(update, blended, weighted)
+        old_wt = np.where(started & is_observation, 1.0, old_wt)
+
+        # Henüz başlamamış kolonlarda ilk gözlem başlangıç değeridir
+        weighted = np.where(~started & is_observation, cur, weighted)
+        out[i] = weighted
+    return out
+
+
+def rsi(close: Frame, length: int = 14) -> Frame:
+    """Relative Strength Index (pandas_ta.rsi ile aynı, mamode='rma')."""
+    delta = close.diff(1)
+    positive = delta.clip(lower=0)
+    negative = delta.clip(upper=0)
+
+    positive_avg = rma(positive, length)
+    negative_avg = rma(negative, length)
+    result = 100 * positive_avg / (positive_avg + negative_avg.abs())
+    # pandas_ta length+1'den kısa serilerde hiç sonuç üretmez
+    return _mask_short(result, close, length + 1)
+
+
+def _sma_1d(values: np.ndarray, length: int) -> np.ndarray:
+    # pandas_ta.sma'nın numpy yolu: konvolüsyon + başa length-1 adet NaN
+    result = np.full(values.shape[0], np.nan)
+    if values.shape[0] >= length:
+        result[length - 1:] = np.convolve(np.ones(length) / length, values)[length - 1:1 - length]
+    return result
+
+
+def sma(x: Frame, length: int) -> Frame:
+    """
+    Basit hareketli ortalama (pandas_ta.sma ile bit düzeyinde aynı).
+    Panelde her kolonun sadece kendi barları (baştaki NaN dolgusu hariç) üzerinde hesaplanır.
+    """
+    if isinstance(x, pd.Series):
+        return pd.Series(_sma_1d(x.to_numpy(dtype=float), length), index=x.index)
+
+    values = x.to_numpy(dtype=float)
+    result = np.full(values.shape, np.nan)
+    starts = _first_valid_rows(values)
+    for j, start in enumerate(starts):
+        result[start:, j] = _sma_1d(values[start:, j], length)
+    return pd.DataFrame(result, index=x.index, columns=x.columns)
+
+
+def true_range(high: Frame, low: Frame, close: Frame) -> Frame:
+    """True Range: max(H-L, |H-PC|, |PC-L|). pandas_ta gibi sıfır aralıklara epsilon ekler."""
+    hl_range = high - low
+    has_zero = hl_range.eq(0).any()
+    if isinstance(hl_range, pd.DataFrame):
+        hl_range = hl_range + has_zero.astype(float) * sys.float_info.epsilon
+    elif has_zero:
+        hl_range = hl_range + sys.float_info.epsilon
+
+    prev_close = close.shift(1)
+    ranges = np.stack([
+        hl_range.to_numpy(dtype=float),
+        (high - prev_close).to_numpy(dtype=float),
+        (prev_close - low).to_numpy(dtype=float),
+    ])
+    # NaN'ları atlayarak satır bazında maksimum (pandas .max(axis=1) davranışı)
+    tr = np.fmax(np.fmax(np.abs(ranges[0]), np.abs(ranges[1])), np.abs(ranges[2]))
+    if isinstance(close, pd.Series):
+        return pd.Series(tr, index=close.index)
+    return pd.DataFrame(tr, index=close.index, columns=close.columns)
+
+
+def atr(high: Frame, low: Frame, close: Frame, length: int = 14) -> Frame:
+    """
+    Average True Range (pandas_ta.atr ile aynı: mamode='rma', presma=True).
+    İlk length barın TR ortalaması başlangıç değeri olarak kullanılır.
+    """
+    tr = true_range(high, low, close)
+    values = tr.to_numpy(dtype=float).copy()
+    is_series = values.ndim == 1
+    if is_series:
+        values = values[:, None]
+
+    starts = _first_valid_rows(values)
+    for j, start in enumerate(starts):
+        segment = values[start:start + length, j]
+        # pandas_ta length+1'den kısa serilerde hiç sonuç üretmez
+        if values.shape[0] - start < length + 1:
+            values[start:, j] = np.nan
+            continue
+        valid = ~np.isnan(segment)
+        # pandas mean() ile aynı: NaN'lar 0 sayılıp toplanır, geçerli adet kadar bölünür
+        seed = np.where(valid, segment, 0.0).sum() / valid.sum() if valid.any() else np.nan
+        values[start:start + length - 1, j] = np.nan
+        values[start + length - 1, j] = seed
+
+    if is_series:
+        return rma(pd.Series(values[:, 0], index=tr.index), length)
+    return rma(pd.DataFrame(values, index=tr.index, columns=tr.columns), length)
+
+
+def build_panel(frames: Dict[str, pd.DataFrame], columns: Iterable[str] = ("Open", "High", "Low", "Close", "Volume")) -> Dict[str, pd.DataFrame]:
+    """
+    Hisse başına OHLCV frame'lerini kolon başına (bar x hisse) 2 boyutlu panellere dönüştürür.
+
+    Seriler SON BARA göre hizalanır: her hissenin son barı panelin son satırındadır, kısa geçmişler
+    başta NaN ile doldurulur. Tüm hisseler aynı takvimde işlem görüyorsa bu tarih hizalamasıyla aynıdır;
+    görmüyorsa bile her hisse kendi barları üzerinde hesaplandığı için tek tek hesaplamayla birebir
+    aynı sonucu verir. Index en uzun serinin tarihleridir.
+    """
+    tickers = list(frames)
+    max_len = max((len(df) for df in frames.values()), default=0)
+    longest = max(frames.values(), key=len) if frames else pd.DataFrame()
+
+    columns = list(columns)
+    values = np.full((len(columns), max_len, len(tickers)), np.nan)
+    layouts = {}  # Aynı kolon düzenine sahip frame'ler için indeks araması bir kez yapılır
+    for j, ticker in enumerate(tickers):
+        df = frames[ticker]
+        if not len(df):
+            continue
+        # Kolon kolon erişmek yerine tek seferde numpy'a çevir (binlerce hissede belirgin fark)
+        layout = tuple(df.columns)
+        if layout not in layouts:
+            positions = df.columns.get_indexer(columns)
+            layouts[layout] = (positions, positions >= 0)
+        positions, present = layouts[layout]
+        raw = df.to_numpy(dtype=float)
+        values[present, max_len - len(df):, j] = raw[:, positions[present]].T
+
+    index = longest.index[-max_len:] if max_len else None
+    return {col: pd.DataFrame(values[k], index=index, columns=tickers) for k, col in enumerate(columns)}
+
+
+def _mask_short(result: Frame, source: Frame, min_bars: int) -> Frame:
+    """min_bars'tan az barı olan hisselerin sonuçlarını NaN yapar."""
+    values = source.to_numpy(dtype=float)
+    if values.ndim == 1:
+        return result if values.shape[0] >= min_bars else result * np.nan
+    # Panelde bar sayısı = ilk geçerli satırdan sona kadar (baştaki NaN dolgusu sayılmaz)
+    short = (values.shape[0] - _first_valid_rows(values)) < min_bars
+    if short.any():
+        result = result.copy()
+        result.loc[:, short] = np.nan
+    return result
+
+
+def _first_valid_rows(values: np.ndarray) -> np.ndarray:
+    """Her kolonda ilk NaN olmayan satırın indeksi (tamamen NaN kolonlar için satır sayısı)."""
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    first[~valid.any(axis=0)] = values.shape[0]
+    return first
+
+
+# --- Paylaşılan, önbellekli indikatör erişimi ---
+
+class IndicatorCache:
+    """
+    İndikatör sonuçları için süreç içi LRU önbellek.
+    Anahtar: (ticker, interval, indikatör, parametreler, veri imzası). Veri imzası serinin ilk ve son bar
+    zaman damgası, bar sayısı ve son kapanıştır; yeni bar geldiğinde veya gün içi son bar değiştiğinde
+    anahtar değişir, aynı veri için indikatör bir kez hesaplanır.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Hesaplama kilit dışında: paralel node'lar farklı hisseleri beklemeden hesaplayabilir
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+_default_indicator_cache = IndicatorCache()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """Teknik Analist, grafik ve diğer tüketicilerin paylaştığı süreç geneli indikatör önbelleği."""
+    return _default_indicator_cache
+
+
+def data_signature(df: pd.DataFrame) -> Tuple:
+    """Frame'in önbellek imzası: (ilk bar, son bar, bar sayısı, son kapanış)."""
+    if df.empty:
+        return (None, None, 0, None)
+    return (df.index[0], df.index[-1], len(df), float(df["Close"].iloc[-1]))
+
+
+class IndicatorSet:
+    """
+    Tek bir hissenin OHLCV frame'i üzerindeki indikatörlere önbellekli erişim.
+
+    Girdi frame'i değiştirilmez (kolon eklenmez). Dönen seriler önbellekteki nesnelerdir ve
+    diğer tüketicilerle paylaşılır; çağıranlar bunları DEĞİŞTİRMEMELİDİR.
+    ticker verilmezse sonuçlar sadece bu örnek içinde saklanır.
+    """
+
+    def __init__(self, df: pd.DataFrame, ticker: Optional[str] = None, interval: str = "1d",
+                 cache: Optional[IndicatorCache] = None):
+        self.df = df
+        self.ticker = ticker
+        self.interval = interval
+        self.cache = (cache or get_indicator_cache()) if ticker else IndicatorCache()
+        self._signature = data_signature(df)
+
+    def _get(self, name: str, params: Tuple, compute: Callable[[], Frame]) -> Frame:
+        key = (self.ticker, self.interval, name, params, self._signature)
+        return self.cache.get_or_compute(key, compute)
+
+    def rsi(self, length: int = 14) -> pd.Series:
+        return self._get("rsi", (length,), lambda: rsi(self.df["Close"], length))
+
+    def sma(self, length: int, column: str = "Close") -> pd.Series:
+        return self._get("sma", (length, column), lambda: sma(self.df[column], length))
+
+    def true_range(self) -> pd.Series:
+        return self._get("true_range", (), lambda: true_range(self.df["High"], self.df["Low"], self.df["Close"]))
+
+    def atr(self, length: int = 14) -> pd.Series:
+        return self._get("atr", (length,), lambda: atr(self.df["High"], self.df["Low"], self.df["Close"], length))
+
+    def latest(self) -> Dict[str, float]:
+        """
+        Son bardaki değerler (Close, RSI, SMA_50, SMA_200, ATR, ATR_SMA, VOLATILITY; bkz. IndicatorState).
+        ticker verildiyse hissenin artımlı durumu süreç geneli IndicatorEngine'den okunur ve sadece son
+        değerlendirmeden sonra gelen barlar işlenir; ticker yoksa durum bu frame'den bir kez kurulur.
+        """
+        if not self.ticker:
+            return IndicatorState.from_frame(self.df).values()
+        return get_indicator_engine(self.interval).evaluate(self.ticker, self.df)
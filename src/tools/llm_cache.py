@@ -0,0 +1,194 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from src.tools.cache import TTLCache
+from src.tools.tokens import count_message_tokens, record_usage, usage_from_response
+from src.tools.tracing import current_span, record_span, span
+
+# LLM cevapları için varsayılan önbellek ayarları
+LLM_CACHE_TTL = 7 * 24 * 3600          # 1 hafta
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50 MB
+
+_default_llm_cache: Optional[TTLCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> TTLCache:
+    """Tüm Gemini ajanlarının paylaştığı süreç geneli LLM cevap önbelleği."""
+    global _default_llm_cache
+    with _default_cache_lock:
+        if _default_llm_cache is None:
+            _default_llm_cache = TTLCache(
+                "llm",
+                ttl=LLM_CACHE_TTL,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_bytes=LLM_CACHE_MAX_BYTES
+            )
+        return _default_llm_cache
+
+
+def model_name_of(llm: Any) -> str:
+    """Gerçek veya sahte (test) LLM istemcisinin model adını bulur."""
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+
+def messages_key(model: str, messages: List[BaseMessage]) -> str:
+    """Model adı + mesaj listesinin birebir içeriğinden deterministik önbellek anahtarı üretir."""
+    payload = [{"type": m.type, "content": m.content} for m in messages]
+    raw = json.dumps({"model": model, "messages": payload}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _text_of(content: Any) -> str:
+    # Gemini içerik parçası bazen {"type": "text", "text": ...} sözlüklerinden oluşan liste olarak gelir
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content or "")
+
+
+class CachedLLM:
+    """
+    Chat modelinin invoke çağrısını kalıcı önbellekle saran katman.
+
+    Ajanlarımız temperature=0 ile çalıştığı için aynı girdiye aynı cevap beklenir; aynı mesaj listesi
+    tekrar gelirse model çağrılmadan kayıtlı cevap döner. Sarılan model ChatGoogleGenerativeAI olabileceği
+    gibi testler için langchain_core'un sahte (FakeListChatModel vb.) modelleri de olabilir.
+    enabled=False ile ajan bazında önbellek tamamen atlanır.
+
+    validate: invoke/stream'e verilirse cevap metnini alır; False dönerse (örn. ajan JSON'u çözemedi) cevap
+    önbelleğe yazılmaz ve önbellekte böyle bir cevap varsa silinip model tekrar çağrılır. Böylece bozuk bir
+    cevap TTL boyunca tekrar tekrar dönmez.
+    """
+
+    def __init__(self, llm: Any, namespace: str, cache: Optional[TTLCache] = None, enabled: bool = True):
+        self.llm = llm
+        self.namespace = namespace
+        self.enabled = enabled
+        self.cache = (cache or get_llm_cache()) if enabled else None
+        self.model = model_name_of(llm)
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def invoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], bool]] = None,
+               **kwargs) -> BaseMessage:
+        with span("llm.invoke", namespace=self.namespace, model=self.model, cache_hit=False):
+            return self._invoke(messages, validate, **kwargs)
+
+    def _invoke(self, messages: List[BaseMessage], validate: Optional[Callable[[str], bool]] = None,
+                **kwargs) -> BaseMessage:
+        if self.cache is None:
+            return self._call(messages, **kwargs)
+
+        key = messages_key(self.model, messages)
+        cached = self._get_valid(key, validate)
+        if cached is not None:
+            self.hits += 1
+            self.saved_seconds += cached.get("latency", 0.0)
+            prompt_tokens = count_message_tokens(messages)
+            record_usage(prompt_tokens, 0, cached=True)
+            current_span().set(cache_hit=True, prompt_tokens=prompt_tokens, completion_tokens=0)
+            return AIMessage(content=cached["content"])
+
+        self.misses += 1
+        started = time.perf_counter()
+        response = self._call(messages, **kwargs)
+        latency = time.perf_counter() - started
+
+        self._store(key, response.content, latency, validate)
+        return response
+
+    def _get_valid(self, key: str, validate: Optional[Callable[[str], bool]]) -> Optional[Dict[str, Any]]:
+        """Önbellekteki cevap; validate'ten geçmeyen (eskiden yazılmış bozuk) cevap silinir ve None döner."""
+        cached = self.cache.get(key)
+        if cached is not None and validate is not None and not validate(_text_of(cached["content"])):
+            print(f"UYARI: {self.namespace} önbelleğindeki geçersiz LLM cevabı silindi.")
+            self.cache.delete(key)
+            return None
+        return cached
+
+    def _store(self, key: str, content: Any, latency: float, validate: Optional[Callable[[str], bool]]):
+        if validate is not None and not validate(_text_of(content)):
+            print(f"UYARI: {self.namespace} LLM cevabı geçersiz, önbelleğe yazılmadı.")
+            return
+        self.cache.set(key, {"content": content, "latency": latency, "model": self.model})
+
+    def stream(self, messages: List[BaseMessage], timings: Optional[Dict[str, Any]] = None,
+               validate: Optional[Callable[[str], bool]] = None, **kwargs) -> Iterator[str]:
+        """
+        Cevabı metin parçaları halinde, geldikçe verir. Önbellekte varsa tamamı tek parça döner.
+        Tamamlanan cevap (validate'ten geçerse) invoke ile aynı anahtarla önbelleğe yazılır.
+        timings: Verilirse doldurulur -> {"ttft": ilk parçaya kadar sn, "total": toplam sn, "cached": bool}
+        """
+        timings = timings if timings is not None else {}
+        wall_start = time.time()
+        started = time.perf_counter()
+        key = messages_key(self.model, messages) if self.cache is not None else None
+
+        cached = self._get_valid(key, validate) if key is not None else None
+        if cached is not None:
+            self.hits += 1
+            self.saved_seconds += cached.get("latency", 0.0)
+            prompt_tokens = count_message_tokens(messages)
+            record_usage(prompt_tokens, 0, cached=True)
+            timings.update(ttft=time.perf_counter() - started, total=time.perf_counter() - started, cached=True)
+            # Generator yield'ler arasında context tutamadığı için span sonradan kaydedilir
+            record_span("llm.stream", wall_start, timings["total"], namespace=self.namespace, model=self.model,
+                        cache_hit=True, ttft=timings["ttft"], prompt_tokens=prompt_tokens, completion_tokens=0)
+            yield _text_of(cached["content"])
+            return
+
+        if key is not None:
+            self.misses += 1
+        full = None
+        for chunk in self.llm.stream(messages, **kwargs):
+            full = chunk if full is None else full + chunk
+            text = _text_of(chunk.content)
+            if not text:
+                continue
+            if "ttft" not in timings:
+                timings["ttft"] = time.perf_counter() - started
+            yield text
+        latency = time.perf_counter() - started
+        timings.update(total=latency, cached=False)
+        timings.setdefault("ttft", latency)
+        print(f"DEBUG: {self.namespace} LLM akışı: ilk token {timings['ttft']:.2f} sn, toplam {latency:.2f} sn")
+
+        if full is None:
+            record_span("llm.stream", wall_start, latency, namespace=self.namespace, model=self.model,
+                        cache_hit=False, ttft=timings["ttft"])
+            return
+        usage = usage_from_response(full, messages)
+        record_usage(usage["prompt_tokens"], usage["completion_tokens"])
+        record_span("llm.stream", wall_start, latency, namespace=self.namespace, model=self.model, cache_hit=False,
+                    ttft=timings["ttft"], prompt_tokens=usage["prompt_tokens"],
+                    completion_tokens=usage["completion_tokens"])
+        if key is not None:
+            self._store(key, full.content, latency, validate)
+
+    def _call(self, messages: List[BaseMessage], **kwargs) -> BaseMessage:
+        """Modeli çağırır ve token kullanımını aktif node'un sayacına yazar."""
+        response = self.llm.invoke(messages, **kwargs)
+        usage = usage_from_response(response, messages)
+        record_usage(usage["prompt_tokens"], usage["completion_tokens"])
+        current_span().set(prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "model": self.model,
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3)
+        }
@@ -1,26 +1,260 @@
 import yfinance as yf
 import pandas as pd
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from src.tools.cache import TTLCache
+from src.tools.indicators import IndicatorSet
+from src.tools.price_store import PriceStore, period_start, slice_window
+from src.tools.tracing import current_span, frame_bytes, span
+
+# Temel veriler için varsayılan önbellek süresi (saniye)
+FUNDAMENTAL_TTL = 24 * 3600
+
+_default_fundamental_cache: Optional[TTLCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_fundamental_cache() -> TTLCache:
+    """Süreç genelinde paylaşılan temel veri önbelleği (hit/miss sayaçları tüm loader'lar için ortak)."""
+    global _default_fundamental_cache
+    with _default_cache_lock:
+        if _default_fundamental_cache is None:
+            _default_fundamental_cache = TTLCache("fundamentals", ttl=FUNDAMENTAL_TTL)
+        return _default_fundamental_cache
+
 
 class MarketDataLoader:
-    def __init__(self):
+    def __init__(self, store: Optional[PriceStore] = None, use_store: bool = True,
+                 fundamental_cache: Optional[TTLCache] = None, use_cache: bool = True):
         """
         Borsa verilerini çekmek için wrapper sınıf.
+        Fiyat verisi yerel Parquet deposu (PriceStore) üzerinden servis edilir;
+        ağdan sadece eksik barlar çekilir. use_store=False ile her seferinde tam indirme yapılır.
+        Temel veriler TTL'li önbellekten gelir; use_cache=False ile her seferinde ağa gidilir.
         """
-        pass
+        self.store = (store or PriceStore()) if use_store else None
+        self.fundamental_cache = (fundamental_cache or get_fundamental_cache()) if use_cache else None
 
-    def get_stock_price_history(self, ticker: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+    def get_stock_price_history(self, ticker: str, period: str = "1y", interval: str = "1d", force_refresh: bool = False) -> pd.DataFrame:
         """
         Geçmiş fiyat verilerini çeker (OHLCV).
         Teknik analiz ajanı bunu kullanacak.
+        force_refresh=True diskteki kaydı yok sayıp tüm periyodu yeniden indirir.
+        """
+        with span("market_data.price_history", ticker=ticker, period=period, interval=interval, cache_hit=False) as sp:
+            df = self._load_price_history(ticker, period, interval, force_refresh)
+            if sp:
+                sp.set(rows=len(df), bytes=frame_bytes(df))
+            return df
+
+    def _load_price_history(self, ticker: str, period: str, interval: str, force_refresh: bool) -> pd.DataFrame:
+        if self.store is None:
+            return self._download_history(ticker, period=period, interval=interval)
+
+        start = period_start(period)
+        cached, meta = self.store.read(ticker, interval)
+
+        if cached is None or cached.empty or force_refresh or not self.store.covers(meta, start):
+            df = self._download_history(ticker, period=period, interval=interval)
+            if not df.empty:
+                self.store.write(ticker, interval, df, start)
+            return df
+
+        if self.store.is_fresh(meta, interval):
+            print(f"DEBUG: {ticker} fiyat verisi diskten okundu.")
+            current_span().set(cache_hit=True)
+            return slice_window(cached, start)
+
+        # Sadece son kayıttan sonraki barları çek.
+        new_bars = self._download_history(ticker, interval=interval, start=self._overlap_start(cached))
+        return self._merge_new_bars(ticker, period, interval, cached, meta, new_bars)
+
+    def get_many(self, tickers: List[str], period: str = "3mo", interval: str = "1d", chunk_size: int = 50, force_refresh: bool = False, threads: Union[bool, int] = True,
+                 stale: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
         """
+        Birden çok hisse için fiyat verisini toplu (chunk'lı) indirir.
+        Diskte taze olanlar ağa hiç gitmez; eskimiş olanlar tek bir toplu istekle güncellenir.
+        threads: yf.download'ın paralel HTTP isteği sınırı (True = yfinance varsayılanı).
+        stale: Verilirse doldurulur -> {ticker: neden}. Yeni barları indirilemeyen hisseler için diskteki
+        (eski) veri frames'te döner ve depo eski kalır (bir sonraki çağrı tekrar dener); bunlar failed'a girmez.
+
+        Returns:
+            (frames, failed): {ticker: DataFrame} ve {ticker: hata nedeni}
+        """
+        with span("market_data.get_many", tickers=len(tickers), period=period, interval=interval) as sp:
+            stale = stale if stale is not None else {}
+            frames, failed = self._get_many(tickers, period, interval, chunk_size, force_refresh, threads, stale)
+            if sp:
+                sp.set(returned=len(frames), failed=len(failed), stale=len(stale),
+                       rows=sum(len(df) for df in frames.values()),
+                       bytes=sum(frame_bytes(df) for df in frames.values()))
+            return frames, failed
+
+    def _get_many(self, tickers: List[str], period: str, interval: str, chunk_size: int, force_refresh: bool,
+                  threads: Union[bool, int], stale: Dict[str, str]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        frames: Dict[str, pd.DataFrame] = {}
+        failed: Dict[str, str] = {}
+        start = period_start(period)
+
+        full_download = []
+        incremental = []
+        for ticker in dict.fromkeys(tickers):  # Sırayı koruyarak tekilleştir
+            if self.store is None or force_refresh:
+                full_download.append(ticker)
+                continue
+            cached, meta = self.store.read(ticker, interval)
+            if cached is None or cached.empty or not self.store.covers(meta, start):
+                full_download.append(ticker)
+            elif self.store.is_fresh(meta, interval):
+                frames[ticker] = slice_window(cached, start)
+            else:
+                incremental.append((ticker, cached, meta))
+
+        if frames:
+            print(f"DEBUG: {len(frames)} hissenin fiyat verisi diskten okundu.")
+        current_span().set(cache_hits=len(frames), full_download=len(full_download), incremental=len(incremental))
+
+        # 1. Hiç kaydı olmayanlar: tüm periyodu toplu indir
+        for i in range(0, len(full_download), chunk_size):
+            chunk = full_download[i:i + chunk_size]
+            downloaded = self._download_many(chunk, interval, period=period, threads=threads)
+            for ticker in chunk:
+                df = downloaded.get(ticker)
+                if df is None or df.empty:
+                    failed[ticker] = "Veri bulunamadı (geçersiz/işlem görmeyen sembol olabilir)."
+                    continue
+                if self.store is not None:
+                    self.store.write(ticker, interval, df, start)
+                frames[ticker] = df
+
+        # 2. Eskimiş olanlar: chunk içindeki en eski son-bardan itibaren toplu indir, sonra birleştir
+        for i in range(0, len(incremental), chunk_size):
+            chunk = incremental[i:i + chunk_size]
+            batch_start = min(self._overlap_start(cached) for _, cached, _ in chunk)
+            downloaded = self._download_many([ticker for ticker, _, _ in chunk], interval, start=batch_start, threads=threads)
+            for ticker, cached, meta in chunk:
+                new_bars = downloaded.get(ticker)
+                if new_bars is None or new_bars.empty:
+                    # İstek son iki barı kapsar; başarılı indirme boş dönmez. Eldeki eski veri döner,
+                    # depo taze işaretlenmez (bir sonraki çağrı tekrar dener).
+                    stale[ticker] = "Yeni barlar indirilemedi (toplu istek başarısız veya hisse cevapta yok)."
+                    frames[ticker] = slice_window(cached, start)
+                    continue
+                new_bars = new_bars[new_bars.index >= self._overlap_start(cached)]
+                frames[ticker] = self._merge_new_bars(ticker, period, interval, cached, meta, new_bars)
+
+        if stale:
+            print(f"UYARI: {len(stale)} hisse için yeni barlar alınamadı, diskteki (eski) veri kullanılıyor: {', '.join(stale)}")
+        if failed:
+            print(f"UYARI: {len(failed)} hisse için veri alınamadı: {', '.join(failed)}")
+
+        # Çağıranın verdiği sırayı koru
+        ordered = {ticker: frames[ticker] for ticker in dict.fromkeys(tickers) if ticker in frames}
+        return ordered, failed
+
+    def is_cached(self, ticker: str, period: str = "1y", interval: str = "1d") -> bool:
+        """İstenen pencere diskte taze olarak var mı? (ağa gitmeden servis edilebilir mi)"""
+        if self.store is None:
+            return False
+        meta = self.store.read_meta(ticker, interval)
+        return self.store.covers(meta, period_start(period)) and self.store.is_fresh(meta, interval)
+
+    def _merge_new_bars(self, ticker: str, period: str, interval: str, cached: pd.DataFrame, meta: Dict, new_bars: pd.DataFrame) -> pd.DataFrame:
+        """Yeni barları saklanan seriye ekler, diske yazar ve istenen pencereyi döndürür."""
+        start = period_start(period)
+
+        if new_bars.empty:
+            # İstek son iki barı da kapsadığı için başarılı bir indirme boş dönmez; boş = indirme hatası.
+            # Depo taze işaretlenmez (bir sonraki çağrı tekrar dener), eldeki eski veri döndürülür.
+            print(f"UYARI: {ticker} için yeni barlar alınamadı, diskteki (eski) veri kullanılıyor.")
+            return slice_window(cached, start)
+
+        if self._is_adjusted(cached, new_bars):
+            print(f"DEBUG: {ticker} için fiyat düzeltmesi tespit edildi, tüm geçmiş yeniden çekiliyor...")
+            return self.get_stock_price_history(ticker, period=period, interval=interval, force_refresh=True)
+
+        merged = pd.concat([cached, new_bars])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        covered_from = meta.get("covered_from", "max")
+        self.store.write(ticker, interval, merged, None if covered_from == "max" else pd.Timestamp(covered_from))
+        return slice_window(merged, start)
+
+    @staticmethod
+    def _overlap_start(cached: pd.DataFrame) -> pd.Timestamp:
+        """
+        Artımlı indirmenin başlangıcı. Son iki barı tekrar istiyoruz: son bar seans içinde eksik olabilir,
+        bir önceki (kapanmış) bar ise temettü/bölünme düzeltmesi olup olmadığını kontrol etmemizi sağlar.
+        """
+        return cached.index[-2] if len(cached) > 1 else cached.index[-1]
+
+    def _download_many(self, tickers: List[str], interval: str, period: Optional[str] = None, start=None, threads: Union[bool, int] = True) -> Dict[str, pd.DataFrame]:
+        """Tek bir yf.download çağrısıyla birden çok hisseyi indirir ve hisse başına frame'lere böler."""
+        with span("market_data.download_many", tickers=len(tickers), interval=interval, incremental=start is not None) as sp:
+            frames = self._download_many_raw(tickers, interval, period, start, threads)
+            if sp:
+                sp.set(returned=len(frames), rows=sum(len(df) for df in frames.values()),
+                       bytes=sum(frame_bytes(df) for df in frames.values()))
+            return frames
+
+    def _download_many_raw(self, tickers: List[str], interval: str, period: Optional[str], start,
+                           threads: Union[bool, int]) -> Dict[str, pd.DataFrame]:
+        print(f"DEBUG: {len(tickers)} hisse için toplu fiyat verisi çekiliyor...")
+        try:
+            raw = yf.download(
+                tickers,
+                period=None if start is not None else period,
+                start=start.to_pydatetime() if start is not None else None,
+                interval=interval,
+                group_by="ticker",
+                auto_adjust=True,
+                actions=True,       # Ticker.history ile aynı kolonlar (Dividends, Stock Splits)
+                ignore_tz=False,    # Saklanan seriyle aynı (timezone'lu) index
+                threads=threads,
+                progress=False
+            )
+        except Exception as e:
+            print(f"HATA: Toplu fiyat verisi çekilemedi -> {e}")
+            return {}
+
+        if raw is None or raw.empty:
+            return {}
+
+        frames = {}
+        for ticker in tickers:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[ticker]
+            else:
+                df = raw
+            # Farklı işlem günleri yüzünden hizalamadan gelen boş satırları at
+            df = df.dropna(how="all", subset=[c for c in ("Open", "High", "Low", "Close") if c in df.columns])
+            df.columns.name = None
+            frames[ticker] = df
+        return frames
+
+    def _download_history(self, ticker: str, period: Optional[str] = None, interval: str = "1d", start=None) -> pd.DataFrame:
+        """yfinance'ten ham OHLCV indirir. Hata durumunda boş DataFrame döner."""
+        with span("market_data.download", ticker=ticker, interval=interval, incremental=start is not None) as sp:
+            df = self._download_history_raw(ticker, period, interval, start)
+            if sp:
+                sp.set(rows=len(df), bytes=frame_bytes(df))
+            return df
+
+    def _download_history_raw(self, ticker: str, period: Optional[str], interval: str, start) -> pd.DataFrame:
         print(f"DEBUG: {ticker} için fiyat verisi çekiliyor...")
         try:
             stock = yf.Ticker(ticker)
             # auto_adjust=True temettü/bölünme düzeltmelerini yapar, önemlidir.
-            df = stock.history(period=period, interval=interval, auto_adjust=True)
+            if start is not None:
+                df = stock.history(start=start.to_pydatetime(), interval=interval, auto_adjust=True)
+            else:
+                df = stock.history(period=period, interval=interval, auto_adjust=True)
             
-            if df.empty:
+            if df.empty and start is None:
                 raise ValueError(f"{ticker} için veri bulunamadı.")
             
             return df
@@ -28,11 +262,66 @@ class MarketDataLoader:
             print(f"HATA: Fiyat verisi çekilemedi -> {e}")
             return pd.DataFrame()
 
-    def get_fundamental_info(self, ticker: str) -> Dict[str, Any]:
+    @staticmethod
+    def _is_adjusted(cached: pd.DataFrame, new_bars: pd.DataFrame) -> bool:
+        """Örtüşen kapanmış barın fiyatı değiştiyse geçmiş yeniden düzeltilmiştir (temettü/bölünme)."""
+        if len(cached) < 2:
+            return False
+        check_ts = cached.index[-2]
+        if check_ts not in new_bars.index:
+            return False
+        old_close = cached.at[check_ts, "Close"]
+        new_close = new_bars.at[check_ts, "Close"]
+        return abs(new_close - old_close) > 1e-4 * abs(old_close)
+
+    def get_fundamental_info(self, ticker: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Temel analiz verilerini (P/E, Market Cap, Sektör vb.) çeker.
         Fundamental ajanı bunu kullanacak.
+        Sonuç TTL'li kalıcı önbellekte tutulur (veri en fazla günde bir değişir).
+        """
+        with span("market_data.fundamentals", ticker=ticker, cache_hit=False) as sp:
+            if self.fundamental_cache is not None and not force_refresh:
+                cached = self.fundamental_cache.get(ticker)
+                if cached is not None:
+                    print(f"DEBUG: {ticker} temel verileri önbellekten okundu.")
+                    sp.set(cache_hit=True)
+                    return cached
+
+            key_metrics = self._fetch_fundamental_info(ticker)
+            if key_metrics and self.fundamental_cache is not None:
+                self.fundamental_cache.set(ticker, key_metrics)
+            return key_metrics
+
+    def prefetch_fundamentals(self, tickers: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        Bir hisse listesi için temel verileri önbelleğe alır.
+        Önbellekte olanlar tek sorguda okunur; eksikler paralel olarak çekilir.
         """
+        tickers = list(dict.fromkeys(tickers))
+        with span("market_data.prefetch_fundamentals", tickers=len(tickers)) as sp:
+            results = self.fundamental_cache.get_many(tickers) if self.fundamental_cache is not None else {}
+            missing = [ticker for ticker in tickers if ticker not in results]
+            sp.set(cache_hits=len(results), fetched=len(missing))
+
+            if missing:
+                print(f"DEBUG: {len(missing)} hisse için temel veriler paralel çekiliyor...")
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    for ticker, key_metrics in zip(missing, pool.map(self._fetch_fundamental_info, missing)):
+                        if not key_metrics:
+                            continue
+                        if self.fundamental_cache is not None:
+                            self.fundamental_cache.set(ticker, key_metrics)
+                        results[ticker] = key_metrics
+
+        return {ticker: results[ticker] for ticker in tickers if ticker in results}
+
+    def _fetch_fundamental_info(self, ticker: str) -> Dict[str, Any]:
+        """yfinance'ten ham info'yu çekip kritik metriklere filtreler. Hata durumunda boş dict."""
+        with span("market_data.fetch_fundamentals", ticker=ticker):
+            return self._fetch_fundamental_info_raw(ticker)
+
+    def _fetch_fundamental_info_raw(self, ticker: str) -> Dict[str, Any]:
         print(f"DEBUG: {ticker} için temel veriler çekiliyor...")
         try:
             stock = yf.Ticker(ticker)
@@ -61,6 +350,42 @@ class MarketDataLoader:
             print(f"HATA: Temel veriler çekilemedi -> {e}")
             return {}
 
+class MarketDataContext:
+    """
+    Tek bir analiz koşusu (run) boyunca kullanılan piyasa verisi bağlamı.
+    Fiyat verisi ilk ihtiyaç duyulduğunda bir kez çekilir; Teknik, Quant ve grafik
+    aynı DataFrame nesnesini kopyalamadan okur. Paralel node'lar için thread-safe'tir.
+    """
+    def __init__(self, ticker: str, period: str = "1y", interval: str = "1d", loader: Optional[MarketDataLoader] = None,
+                 price_history: Optional[pd.DataFrame] = None):
+        """price_history: Çağıranın önbelleğinde zaten bulunan frame; verilirse loader'a hiç gidilmez."""
+        self.ticker = ticker
+        self.period = period
+        self.interval = interval
+        self.loader = loader or MarketDataLoader()
+        self._lock = threading.Lock()
+        self._price_history: Optional[pd.DataFrame] = price_history
+
+    def get_price_history(self) -> pd.DataFrame:
+        """
+        Paylaşılan OHLCV verisini döndürür. Okuyanlar bu DataFrame'i DEĞİŞTİRMEMELİDİR.
+        """
+        with self._lock:
+            if self._price_history is None:
+                self._price_history = self.loader.get_stock_price_history(
+                    self.ticker, period=self.period, interval=self.interval
+                )
+            return self._price_history
+
+    @property
+    def indicators(self) -> IndicatorSet:
+        """
+        Paylaşılan frame üzerindeki önbellekli indikatörler (RSI, SMA, ATR).
+        Seriler grafik gibi tüketicilere tekrar hesaplanmadan döner; Teknik Analist ve Quant son değerleri
+        (latest) hissenin artımlı IndicatorEngine durumundan okur.
+        """
+        return IndicatorSet(self.get_price_history(), ticker=self.ticker, interval=self.interval)
+
 # Test Bloğu (Sadece bu dosyayı çalıştırırsan burası çalışır)
 if __name__ == "__main__":
     loader = MarketDataLoader()
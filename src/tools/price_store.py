@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Interval başına tazelik süresi (saniye). Süre dolmadıysa veri ağa gitmeden diskten döner.
+DEFAULT_TTL = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 3600,
+    "1h": 3600,
+    "1d": 3600,          # Gün içinde son bar değişir, saatte bir tazele
+    "5d": 6 * 3600,
+    "1wk": 6 * 3600,
+    "1mo": 24 * 3600,
+    "3mo": 24 * 3600,
+}
+
+_META_KEY = b"trademind"
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_start(period: str, now: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """
+    yfinance 'period' ifadesini (1mo, 3mo, 1y, ytd, max ...) UTC başlangıç zamanına çevirir.
+    'max' için None döner (tüm geçmiş).
+    """
+    now = now or pd.Timestamp.now(tz="UTC")
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Geçersiz period: {period}")
+
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return now - pd.DateOffset(days=amount)
+    if unit == "wk":
+        return now - pd.DateOffset(weeks=amount)
+    if unit == "mo":
+        return now - pd.DateOffset(months=amount)
+    return now - pd.DateOffset(years=amount)
+
+
+def slice_window(df: pd.DataFrame, start: Optional[pd.Timestamp]) -> pd.DataFrame:
+    """Saklanan seriden istenen pencereyi (start ve sonrası) döndürür."""
+    if start is None or df.empty:
+        return df
+    if df.index.tz is None:
+        start = start.tz_convert(None)
+    return df[df.index >= start]
+
+
+class PriceStore:
+    """
+    Ticker ve interval bazında OHLCV verisini Parquet dosyalarında tutan yerel depo.
+
+    Dosya düzeni: {root}/{interval}/{ticker}.parquet
+    Her dosyanın şema metadatasında son çekim zamanı (fetched_at) ve verinin hangi tarihten
+    itibaren eksiksiz olduğu (covered_from) saklanır.
+    """
+
+    def __init__(self, root: str = "data/ohlcv", ttl: Optional[Dict[str, int]] = None):
+        self.root = root
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str, interval: str) -> str:
+        safe_ticker = ticker.replace(os.sep, "_")
+        return os.path.join(self.root, interval, f"{safe_ticker}.parquet")
+
+    def read(self, ticker: str, interval: str) -> Tuple[Optional[pd.DataFrame], Dict]:
+        """Saklanan frame'i ve metadatasını döndürür. Kayıt yoksa (None, {})."""
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None, {}
+        try:
+            table = pq.read_table(path)
+        except Exception as e:
+            print(f"HATA: {path} okunamadı, yeniden indirilecek -> {e}")
+            return None, {}
+
+        raw_meta = (table.schema.metadata or {}).get(_META_KEY)
+        meta = json.loads(raw_meta) if raw_meta else {}
+        return table.to_pandas(), meta
+
+    def read_meta(self, ticker: str, interval: str) -> Dict:
+        """Sadece metadatayı okur (veriyi yüklemeden). Kayıt yoksa {}."""
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return {}
+        try:
+            raw_meta = (pq.read_schema(path).metadata or {}).get(_META_KEY)
+        except Exception:
+            return {}
+        return json.loads(raw_meta) if raw_meta else {}
+
+    def write(self, ticker: str, interval: str, df: pd.DataFrame, covered_from: Optional[pd.Timestamp]):
+        """Frame'i atomik olarak (geçici dosya + rename) diske yazar."""
+        path = self._path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        meta = {
+            "fetched_at": time.time(),
+            "covered_from": "max" if covered_from is None else covered_from.isoformat(),
+        }
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode()})
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+
+    def is_fresh(self, meta: Dict, interval: str) -> bool:
+        fetched_at = meta.get("fetched_at")
+        if fetched_at is None:
+            return False
+        return (time.time() - fetched_at) < self.ttl.get(interval, DEFAULT_TTL["1d"])
+
+    @staticmethod
+    def covers(meta: Dict, start: Optional[pd.Timestamp]) -> bool:
+        """Saklanan veri istenen başlangıç tarihinden itibaren eksiksiz mi?"""
+        covered_from = meta.get("covered_from")
+        if covered_from is None:
+            return False
+        if covered_from == "max":
+            return True
+        if start is None:
+            return False
+        return pd.Timestamp(covered_from) <= start
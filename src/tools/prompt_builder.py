@@ -0,0 +1,95 @@
+import json
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.tools.tokens import count_tokens, truncate_to_tokens
+
+# Ondalıklı sayılar prompt'ta bu kadar basamağa yuvarlanır (model için fazlası gürültü ve token israfı)
+FLOAT_DIGITS = 4
+
+
+def compact_value(value: Any) -> Any:
+    """
+    LLM'e gidecek değerleri sadeleştirir: float'lar yuvarlanır, NaN/None ve boş alanlar atılır,
+    numpy/pandas skalerleri düz Python tiplerine çevrilir.
+    """
+    if hasattr(value, "item") and not isinstance(value, (list, dict, str)):
+        try:
+            value = value.item()
+        except (TypeError, ValueError):
+            pass
+
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return None
+        return round(value, FLOAT_DIGITS)
+    if isinstance(value, dict):
+        compacted = {str(k): compact_value(v) for k, v in value.items()}
+        return {k: v for k, v in compacted.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [v for v in (compact_value(v) for v in value) if v not in (None, "", [], {})]
+    return value
+
+
+def compact_json(value: Any) -> str:
+    """Girintisiz, boşluksuz JSON (indent=2'ye göre belirgin şekilde daha az token)."""
+    return json.dumps(compact_value(value), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _format_field(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return compact_json(value)
+    return str(value)
+
+
+class PromptBuilder:
+    """
+    Ajan çıktılarını token bütçeli, kompakt bölümler halinde prompt metnine dönüştürür.
+
+    Her bölüm (örn. bir analistin raporu) kendi token bütçesine sahiptir; bütçeyi aşan bölüm kırpılır.
+    Bölüm içinde aynı alan iki kez yazılmaz ve boş alanlar atlanır.
+    """
+
+    def __init__(self):
+        self.sections: List[str] = []
+        self.section_tokens: Dict[str, int] = {}
+
+    def add_text(self, text: str):
+        self.sections.append(text)
+        return self
+
+    def add_section(self, title: str, data: Optional[Dict[str, Any]], fields: Dict[str, str],
+                    budget: int, extra_key: Optional[str] = None, exclude: Iterable[str] = ()):
+        """
+        title: Bölüm başlığı.
+        data: Ajanın çıktı sözlüğü.
+        fields: Prompt'taki etiket -> data anahtarı (sırasıyla yazılır).
+        budget: Bölümün token bütçesi.
+        extra_key: Verilirse data'nın yukarıda yazılmamış kalan alanları bu etiketle tek satırda eklenir.
+        exclude: extra_key satırına hiç yazılmayacak anahtarlar.
+        """
+        data = data or {}
+        lines = [f"--- {title} ---"]
+        used = set(exclude)
+        for label, key in fields.items():
+            value = compact_value(data.get(key))
+            used.add(key)
+            if value in (None, "", [], {}):
+                continue
+            lines.append(f"{label}: {_format_field(value)}")
+
+        if extra_key is not None:
+            rest = compact_value({k: v for k, v in data.items() if k not in used})
+            if rest:
+                lines.append(f"{extra_key}: {compact_json(rest)}")
+
+        if len(lines) == 1:
+            lines.append("N/A")
+
+        text = truncate_to_tokens("\n".join(lines), budget)
+        self.section_tokens[title] = count_tokens(text)
+        self.sections.append(text)
+        return self
+
+    def build(self) -> str:
+        return "\n\n".join(self.sections)
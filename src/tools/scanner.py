@@ -1,10 +1,21 @@
-import yfinance as yf
-import pandas_ta as ta
+import heapq
+import numpy as np
 import pandas as pd
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.tools.market_data import MarketDataLoader
+from src.tools.indicators import atr, build_panel, rsi, sma
+from src.tools.tracing import span
 
 class MarketScanner:
-    def __init__(self):
+    def __init__(self, loader: Optional[MarketDataLoader] = None):
+        self.loader = loader or MarketDataLoader()
+        # Son taramada verisi alınamayan / skorlanamayan hisseler ve nedenleri
+        self.failed: Dict[str, str] = {}
+        # Akış halindeki taramada işlenen hisse sayısı (ilerleme göstergesi için)
+        self.scanned = 0
+
         # BIST 30 Majors + Growth/Tech/Energy Stocks
         self.tickers = [
             "THYAO.IS", "ASELS.IS", "GARAN.IS", "AKBNK.IS", "TUPRS.IS", 
@@ -23,95 +34,165 @@ class MarketScanner:
         """
         Scans the market for Growth/Breakout opportunities.
         """
-        scores = []
         print(f"Scanning {len(self.tickers)} stocks for Growth Opportunities...")
-        
-        for ticker in self.tickers:
-            try:
-                # Download last 1 month for speed (Breakout focus)
-                # Need enough for RSI(14) and Vol MA(20). 1mo is ~22 days, barely enough.
-                # Let's use "3mo" to be safe for 20-day MA and RSI calc stability.
-                df = yf.download(ticker, period="3mo", progress=False)
-                
-                if df.empty or len(df) < 25:
-                    continue
-
-                # Flatten MultiIndex
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.get_level_values(0)
-
-                # Indicators
-                # RSI 14
-                df['RSI'] = ta.rsi(df['Close'], length=14)
-                # Volume MA 20
-                df['Vol_MA20'] = ta.sma(df['Volume'], length=20)
-                # ATR 14
-                df['ATR'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
-                
-                # Check for NaNs in last row
-                if df.iloc[-1][['RSI', 'Vol_MA20', 'ATR']].isnull().any():
-                    continue
-
-                last_close = df['Close'].iloc[-1]
-                last_rsi = df['RSI'].iloc[-1]
-                last_vol = df['Volume'].iloc[-1]
-                last_vol_ma = df['Vol_MA20'].iloc[-1]
-                last_atr = df['ATR'].iloc[-1]
-                
-                # Price Performance (5 days)
-                # Check if we have enough data for 5 days ago
-                if len(df) >= 6:
-                    price_5d_ago = df['Close'].iloc[-6]
-                    perf_5d = ((last_close - price_5d_ago) / price_5d_ago) * 100
-                else:
-                    perf_5d = 0
-
-                # --- GROWTH SCORING LOGIC ---
-                score = 0
-                
-                # 1. Volume Breakout (+3)
-                # Today's volume > 1.5x Average Volume
-                if last_vol > (1.5 * last_vol_ma):
-                    score += 3
-                
-                # 2. Momentum (+2)
-                # RSI between 50 and 70 (Strong but not Overbought)
-                if 50 < last_rsi < 70:
-                    score += 2
-                    
-                # 3. Price Performance (+1)
-                # Up > 3% in last 5 days
-                if perf_5d > 3.0:
-                    score += 1
-                    
-                # 4. Volatility / ATR (+1)
-                # Normalized ATR (ATR/Price) > 2% implies good volatility for trading
-                atr_pct = (last_atr / last_close) * 100
-                if atr_pct > 2.0:
-                    score += 1
-
-                scores.append({
-                    "ticker": ticker,
-                    "score": score,
-                    "rsi": last_rsi,
-                    "vol_ratio": round(last_vol / last_vol_ma, 1) if last_vol_ma > 0 else 0,
-                    "perf_5d": round(perf_5d, 1)
-                })
-
-            except Exception as e:
-                pass # Skip errors silently for speed
-
-        # Sort by Score (Descending)
-        scores.sort(key=lambda x: x["score"], reverse=True)
-        
+
+        leaderboard = []
+        with span("scanner.scan", tickers=len(self.tickers)) as sp:
+            for _, leaderboard in self.iter_scan(top_k=5):
+                pass
+            sp.set(scanned=self.scanned, failed=len(self.failed))
+
+        if self.failed:
+            print(f"Atlanan hisseler ({len(self.failed)}): {', '.join(self.failed)}")
+
         print("\n--- TOP GROWTH PICKS ---")
-        for s in scores[:5]:
+        for s in leaderboard:
             print(f"{s['ticker']}: Score {s['score']} (RSI: {s['rsi']:.1f}, Vol Ratio: {s['vol_ratio']}x)")
 
         # Return top 3 tickers
-        top_3 = [s["ticker"] for s in scores[:3]]
+        top_3 = [s["ticker"] for s in leaderboard[:3]]
         return top_3
 
+    def iter_scan(self, top_k: int = 3, chunk_size: int = 8, max_workers: int = 4) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """
+        Taramayı akış halinde yapar: her skorlanan hisse hazır olur olmaz
+        (sonuç, güncel top-k listesi) olarak döner.
+
+        - Diskte taze verisi olan hisseler önce, ağa gitmeden skorlanır (ilk sonuç anında gelir).
+        - Kalanlar chunk_size'lık gruplar halinde indirilir; her grupta en fazla max_workers paralel HTTP isteği yapılır.
+        - Bir sonraki grup, mevcut grubun sonuçları tüketilirken arka planda indirilir.
+        Top-k listesi skor (azalan) ve tarama sırasına göre sıralıdır; tam sıralamayla aynı sonucu verir.
+        """
+        self.failed = {}
+        self.scanned = 0
+        order = {ticker: i for i, ticker in enumerate(self.tickers)}
+        heap: List[Tuple[int, int, str, Dict]] = []  # (skor, -sıra, ...) min-heap; en zayıf lider en üstte
+
+        cached = [t for t in self.tickers if self.loader.is_cached(t, period="3mo")]
+        cached_set = set(cached)
+        remote = [t for t in self.tickers if t not in cached_set]
+        # Diskten okuma ucuz olduğu için daha büyük gruplar; ağ grupları küçük tutulur ki sonuçlar erken aksın
+        chunks = [cached[i:i + 50] for i in range(0, len(cached), 50)]
+        chunks += [remote[i:i + chunk_size] for i in range(0, len(remote), chunk_size)]
+
+        def fetch(chunk):
+            return self.loader.get_many(chunk, period="3mo", chunk_size=len(chunk), threads=max_workers)
+
+        # yf.download global durum tuttuğu için aynı anda tek grup indirilir (bir sonraki grup önceden getirilir)
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            pending = prefetcher.submit(fetch, chunks[0]) if chunks else None
+            for i, chunk in enumerate(chunks):
+                try:
+                    frames, failed = pending.result()
+                except Exception as e:
+                    frames, failed = {}, {ticker: f"İndirme hatası: {e}" for ticker in chunk}
+                pending = prefetcher.submit(fetch, chunks[i + 1]) if i + 1 < len(chunks) else None
+
+                self.failed.update(failed)
+                scored = self.score_frames(frames)
+                self.scanned += len(chunk)
+
+                for result in scored:
+                    entry = (result["score"], -order[result["ticker"]], result["ticker"], result)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+
+                    leaderboard = [e[3] for e in sorted(heap, key=lambda e: e[:2], reverse=True)]
+                    yield result, leaderboard
+
+    def score_frames(self, frames: Dict[str, pd.DataFrame]) -> List[Dict]:
+        """
+        Tüm hisseleri tek bir vektörel geçişte skorlar (bar x hisse paneli).
+        Sonuçlar eski hisse-hisse döngüsüyle birebir aynıdır; giriş sırası korunur.
+        """
+        usable = {}
+        required = {"High", "Low", "Close", "Volume"}
+        for ticker, df in frames.items():
+            if df.empty or len(df) < 25:
+                continue
+            missing = required.difference(df.columns)
+            if missing:
+                self.failed[ticker] = f"Eksik kolonlar: {', '.join(sorted(missing))}"
+                continue
+            usable[ticker] = df
+
+        if not usable:
+            return []
+
+        with span("scanner.score_frames", tickers=len(usable)):
+            return self._score_usable(usable)
+
+    def _score_usable(self, usable: Dict[str, pd.DataFrame]) -> List[Dict]:
+        growth = growth_score_panel(build_panel(usable, columns=("High", "Low", "Close", "Volume")))
+        # Son satır (güncel durum), hisse sırasıyla numpy dizileri olarak
+        last = {name: values.to_numpy()[-1] for name, values in growth.items()}
+
+        # Check for NaNs in last row
+        valid = ~(np.isnan(last["rsi"]) | np.isnan(last["vol_ma"]) | np.isnan(last["atr"]))
+
+        scores = []
+        for j, ticker in enumerate(usable):
+            if not valid[j]:
+                continue
+            last_vol = last["volume"][j]
+            last_vol_ma = last["vol_ma"][j]
+            scores.append({
+                "ticker": ticker,
+                "score": int(last["score"][j]),
+                "rsi": last["rsi"][j],
+                "vol_ratio": round(last_vol / last_vol_ma, 1) if last_vol_ma > 0 else 0,
+                "perf_5d": round(last["perf_5d"][j], 1)
+            })
+        return scores
+
+
+def growth_score_panel(panel: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Growth skorunu her bar ve her hisse için hesaplar (bar x hisse matrisleri).
+    Tarayıcı sadece son satırı kullanır; backtest tüm geçmişi kullanabilir.
+    """
+    close = panel["Close"]
+    volume = panel["Volume"]
+
+    # Indicators
+    # RSI 14
+    rsi_values = rsi(close, length=14)
+    # Volume MA 20
+    vol_ma = sma(volume, length=20)
+    # ATR 14
+    atr_values = atr(panel["High"], panel["Low"], close, length=14)
+
+    # Price Performance (5 days)
+    price_5d_ago = close.shift(5)
+    perf_5d = ((close - price_5d_ago) / price_5d_ago) * 100
+
+    # Normalized ATR (ATR/Price) > 2% implies good volatility for trading
+    atr_pct = (atr_values / close) * 100
+
+    # --- GROWTH SCORING LOGIC ---
+    # 1. Volume Breakout (+3): Today's volume > 1.5x Average Volume
+    # 2. Momentum (+2): RSI between 50 and 70 (Strong but not Overbought)
+    # 3. Price Performance (+1): Up > 3% in last 5 days
+    # 4. Volatility / ATR (+1)
+    score = (
+        3 * (volume > (1.5 * vol_ma)).astype(int)
+        + 2 * ((rsi_values > 50) & (rsi_values < 70)).astype(int)
+        + (perf_5d > 3.0).astype(int)
+        + (atr_pct > 2.0).astype(int)
+    )
+
+    return {
+        "score": score,
+        "rsi": rsi_values,
+        "volume": volume,
+        "vol_ma": vol_ma,
+        "atr": atr_values,
+        "perf_5d": perf_5d,
+        "atr_pct": atr_pct
+    }
+
 if __name__ == "__main__":
     scanner = MarketScanner()
     top_stocks = scanner.scan_market()
@@ -0,0 +1,124 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Gemini'nin kendi tokenizer'ı yerel olarak yok; cl100k_base bütçe ve raporlama için yeterince yakın bir ölçüdür.
+# tiktoken kurulu değilse (veya kodlama dosyası indirilemiyorsa) karakter tabanlı yaklaşık sayım kullanılır.
+ENCODING_NAME = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+_encoding: Any = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding() -> Any:
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                print(f"UYARI: tiktoken kullanılamıyor, yaklaşık token sayımı yapılacak -> {e}")
+                _encoding = None
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Metnin token sayısı (tiktoken yoksa ~4 karakter = 1 token)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Any]) -> int:
+    """Chat mesaj listesinin toplam içerik token sayısı."""
+    return sum(count_tokens(_text_of(m.content)) for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " …[kısaltıldı]") -> str:
+    """Metni en fazla max_tokens token olacak şekilde sondan kırpar."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # İşaret metni de bütçeye dahil
+    keep = max(max_tokens - count_tokens(marker), 0)
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:keep * CHARS_PER_TOKEN] + marker
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + marker
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(str(x) for x in content)
+    return str(content or "")
+
+
+# --- Node bazında token muhasebesi ---
+# Her graf node'u kendi token_scope'u içinde çalışır; CachedLLM her çağrıyı aktif scope'a yazar.
+# contextvars sayesinde paralel node'ların (ayrı thread'ler) sayaçları birbirine karışmaz.
+
+_current_usage: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("token_usage", default=None)
+
+
+def new_usage() -> Dict[str, Any]:
+    return {"calls": 0, "cached_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0}
+
+
+@contextmanager
+def token_scope() -> Iterator[Dict[str, Any]]:
+    """Blok içindeki LLM çağrılarının token sayımlarını toplayan sayaç sözlüğünü verir."""
+    usage = new_usage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def record_usage(prompt_tokens: int, completion_tokens: int, cached: bool = False):
+    """Aktif scope'a bir LLM çağrısı ekler (scope yoksa sessizce geçer)."""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage["calls"] += 1
+    if cached:
+        # Önbellekten dönen cevap kota harcamaz; sadece kazanılan token'ı göstermek için ayrı tutulur
+        usage["cached_calls"] += 1
+        usage["cached_prompt_tokens"] += prompt_tokens
+        return
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+
+
+def usage_from_response(response: Any, messages: List[Any]) -> Dict[str, int]:
+    """
+    Modelin bildirdiği usage_metadata varsa onu, yoksa yerel sayımı kullanır.
+    Dönüş: {"prompt_tokens": ..., "completion_tokens": ...}
+    """
+    metadata = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = metadata.get("input_tokens")
+    completion_tokens = metadata.get("output_tokens")
+    if prompt_tokens is None:
+        prompt_tokens = count_message_tokens(messages)
+    if completion_tokens is None:
+        completion_tokens = count_tokens(_text_of(getattr(response, "content", "")))
+    return {"prompt_tokens": int(prompt_tokens), "completion_tokens": int(completion_tokens)}
+
+
+def summarize_usage(token_usage: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Node bazındaki sayaçları koşu toplamına çevirir."""
+    total = new_usage()
+    for usage in (token_usage or {}).values():
+        for key in total:
+            total[key] += usage.get(key, 0)
+    return total
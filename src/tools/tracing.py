@@ -0,0 +1,264 @@
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+# Hafif izleme (tracing): graf node'ları, veri çekme, LLM ve arama çağrıları etrafında zaman aralıkları (span).
+#
+# Kapalıyken (varsayılan) span() sadece paylaşılan boş bir nesne döndürür; sıcak yola maliyeti yok denecek kadar azdır.
+# Açmak için: TRADEMIND_TRACE=<klasör> ortam değişkeni (1/true -> "traces") veya CLI'da --trace.
+# Her span bittiğinde <klasör>/trace-<zaman>-<pid>.jsonl dosyasına bir satır yazılır; süreç kapanırken aynı
+# span'ler Chrome trace-event formatında (.trace.json) dışa aktarılır (chrome://tracing veya ui.perfetto.dev).
+
+TRACE_ENV = "TRADEMIND_TRACE"
+DEFAULT_TRACE_DIR = "traces"
+# Chrome dışa aktarımı için bellekte tutulan en fazla span (JSONL dosyası sınırsızdır)
+MAX_BUFFERED_SPANS = 200_000
+
+
+class Span:
+    """Tek bir zaman aralığı. Özellikler set() ile eklenir; bitişte kaydedilir."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "duration", "thread", "attrs")
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __bool__(self):
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """İzleme kapalıyken dönen span. Yanlış (falsy) değerlidir: pahalı özellikler `if span:` ile atlanabilir."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        return self
+
+    def __bool__(self):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Biten span'leri JSONL dosyasına yazar ve Chrome dışa aktarımı için bellekte tutar. Thread-safe'tir."""
+
+    def __init__(self, path: Optional[str] = None, max_spans: int = MAX_BUFFERED_SPANS):
+        self.path = path
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def finish(self, span: Span):
+        record = span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str) if self._file else None
+        with self._lock:
+            self.spans.append(record)
+            if self._file:
+                self._file.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    def export_jsonl(self, path: str):
+        with self._lock:
+            records = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def export_chrome(self, path: str):
+        """Chrome trace-event formatı ("X" = süresi olan olay; zamanlar mikrosaniye)."""
+        with self._lock:
+            records = list(self.spans)
+        pid = os.getpid()
+        events = [
+            {
+                "name": r["name"],
+                "cat": r["name"].split(".", 1)[0],
+                "ph": "X",
+                "ts": r["start"] * 1e6,
+                "dur": r["duration"] * 1e6,
+                "pid": pid,
+                "tid": r["thread"],
+                "args": r["attrs"],
+            }
+            for r in records
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False, default=str)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+_tracer: Optional[Tracer] = None
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def enable(directory: str = DEFAULT_TRACE_DIR) -> Tracer:
+    """İzlemeyi açar. Süreç kapanırken Chrome formatı JSONL dosyasının yanına yazılır."""
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    stem = os.path.join(directory, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    _tracer = Tracer(stem + ".jsonl")
+    atexit.register(_export_on_exit, _tracer, stem + ".trace.json")
+    print(f"DEBUG: İzleme açık -> {stem}.jsonl")
+    return _tracer
+
+
+def enable_in_memory(max_spans: int = MAX_BUFFERED_SPANS) -> Tracer:
+    """Dosyaya yazmadan izler (testler / benchmark'lar span'leri doğrudan okur)."""
+    global _tracer
+    _tracer = Tracer(None, max_spans)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    if _tracer is not None:
+        _tracer.flush()
+    _tracer = None
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def _export_on_exit(tracer: Tracer, chrome_path: str):
+    try:
+        tracer.flush()
+        tracer.export_chrome(chrome_path)
+        tracer.close()
+        print(f"DEBUG: İzleme kaydı yazıldı -> {chrome_path}")
+    except Exception as e:
+        print(f"UYARI: İzleme kaydı yazılamadı -> {e}")
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Any]:
+    """
+    Blok süresini ölçen span. İzleme kapalıyken NOOP_SPAN verir.
+    Örnek: with span("llm.invoke", model=m) as sp: ...; sp.set(prompt_tokens=n)
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, tracer.next_id(), parent.span_id if parent else None, attrs)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = repr(e)
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        tracer.finish(current)
+
+
+def current_span() -> Any:
+    """Aktif span (yoksa veya izleme kapalıysa NOOP_SPAN); iç fonksiyonlar dıştaki span'e özellik ekler."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+def record_span(name: str, start: float, duration: float, **attrs):
+    """
+    Sonradan kaydedilen span (örn. generator içinde, yield'ler arasında context tutulamayan akışlar).
+    start: time.time() cinsinden başlangıç.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+    parent = _current_span.get()
+    record = Span(name, tracer.next_id(), parent.span_id if parent else None, attrs)
+    record.start = start
+    record.duration = duration
+    tracer.finish(record)
+
+
+def traced(name: str, **static_attrs) -> Callable:
+    """Fonksiyonu span ile saran dekoratör."""
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with span(name, **static_attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def frame_bytes(df: Any) -> int:
+    """DataFrame'in bellek boyutu (span özelliği için; derin sayım yapılmaz)."""
+    try:
+        return int(df.memory_usage(index=True, deep=False).sum())
+    except Exception:
+        return 0
+
+
+def _configure_from_env():
+    value = os.environ.get(TRACE_ENV, "").strip()
+    if not value or value.lower() in ("0", "false", "no"):
+        return
+    enable(DEFAULT_TRACE_DIR if value.lower() in ("1", "true", "yes") else value)
+
+
+_configure_from_env()